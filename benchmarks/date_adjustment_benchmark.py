@@ -0,0 +1,318 @@
+"""
+Benchmark of the date_adjustment sub-functions on synthetic data.
+
+The sub-functions are run in the order date_adjustment runs them, with each engine in a fresh process, and each is
+timed separately. As in date_adjustment, rows are set aside once they are error flagged, so each sub-function is
+only passed the rows that survived the ones before it. For each sub-function the rows passed in, the time taken and
+the rows per second are reported, along with the peak memory allocated while it ran if --trace-memory is given
+(which slows the run down). A full date_adjustment run is timed as well, and the peak resident set size (RSS) of
+the process is reported for each engine.
+
+The results can be saved with --output and compared against saved results with --compare, which exits with status 1
+if the rows per second of any sub-function have fallen by more than --tolerance.
+
+The row engine runs at a few milliseconds per row, so keep --rows modest when benchmarking it.
+
+Usage (from the repository root, with sml_small installed, Linux or macOS only):
+
+    poetry run python benchmarks/date_adjustment_benchmark.py --rows 10000 --output results.json
+    poetry run python benchmarks/date_adjustment_benchmark.py --rows 10000 --compare results.json
+
+For Copyright information, please see LICENCE.
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from synthetic_data import (
+    COLUMNS,
+    generate_contributors,
+    generate_trading_weights,
+    target_columns,
+)
+
+from sml_small.date_adjustment import (
+    TradingWeights,
+    _ActiveRows,
+    _date_adjustment_dtypes,
+    _set_dtypes,
+    average_weekly_subfunction,
+    date_adjustment,
+    date_adjustment_subfunction,
+    generate_average_weekly_questions,
+    midpoint_subfunction,
+    missing_value_subfunction,
+    primary_wrangler_subfunction,
+    secondary_wrangler_subfunction,
+)
+
+ENGINES = ["row", "vectorized"]
+
+
+def _peak_rss_mb() -> float:
+    """
+    :return: The peak RSS of this process so far, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _stages(trading_weights: TradingWeights, questions: list, engine: str) -> list:
+    """
+    :param trading_weights: The synthetic trading weights.
+    :param questions: The names of the target columns.
+    :param engine: The engine to run the sub-functions with.
+    :return: The name and a function of the dataframe for each sub-function, in the order date_adjustment runs
+            them.
+    """
+    c = COLUMNS
+    dtype_dict = _date_adjustment_dtypes(**COLUMNS)
+    return [
+        (
+            "missing_value",
+            lambda df: missing_value_subfunction(df, questions, c["da_error_flag_col"]),
+        ),
+        ("set_dtypes", lambda df: _set_dtypes(df, dtype_dict, questions)),
+        (
+            "primary_wrangler",
+            lambda df: primary_wrangler_subfunction(
+                df,
+                trading_weights,
+                questions,
+                c["contributor_returned_start_date_col"],
+                c["contributor_returned_end_date_col"],
+                c["expected_start_date_col"],
+                c["expected_end_date_col"],
+                c["domain_col"],
+                c["equal_weighted_col"],
+                c["da_error_flag_col"],
+                c["trading_domain_col"],
+                c["trading_date_col"],
+                c["trading_weights_col"],
+                engine=engine,
+            ),
+        ),
+        (
+            "midpoint",
+            lambda df: midpoint_subfunction(
+                df,
+                trading_weights,
+                questions,
+                c["domain_col"],
+                c["expected_start_date_col"],
+                c["expected_end_date_col"],
+                c["contributor_returned_start_date_col"],
+                c["contributor_returned_end_date_col"],
+                c["set_to_mid_point_col"],
+                c["equal_weighted_col"],
+                c["use_calendar_days_col"],
+                c["trading_date_col"],
+                c["trading_period_start_col"],
+                c["trading_period_end_col"],
+                c["trading_weights_col"],
+                c["trading_domain_col"],
+                c["da_error_flag_col"],
+                engine=engine,
+            ),
+        ),
+        (
+            "secondary_wrangler",
+            lambda df: secondary_wrangler_subfunction(
+                df,
+                trading_weights,
+                questions,
+                c["contributor_returned_start_date_col"],
+                c["contributor_returned_end_date_col"],
+                c["expected_start_date_col"],
+                c["expected_end_date_col"],
+                c["domain_col"],
+                c["equal_weighted_col"],
+                c["set_to_mid_point_col"],
+                c["short_period_parameter_col"],
+                c["long_period_parameter_col"],
+                c["da_error_flag_col"],
+                c["trading_date_col"],
+                c["trading_domain_col"],
+                c["trading_weights_col"],
+                engine=engine,
+            ),
+        ),
+        (
+            "date_adjustment",
+            lambda df: date_adjustment_subfunction(
+                df, questions, c["da_error_flag_col"], engine=engine
+            ),
+        ),
+        (
+            "average_weekly",
+            lambda df: average_weekly_subfunction(
+                df,
+                generate_average_weekly_questions("A", questions),
+                c["da_error_flag_col"],
+                engine=engine,
+            ),
+        ),
+    ]
+
+
+def run_engine(engine: str, args: argparse.Namespace) -> dict:
+    """
+    Runs the benchmark for one engine, to be called in a fresh process.
+
+    :param engine: One of ENGINES.
+    :param args: The command line arguments.
+    :return: The results for each sub-function and the full run, by name, and the peak RSS in MB.
+    """
+    questions = target_columns(args.questions)
+    trading_weights = generate_trading_weights(args.domains, args.calendar_days)
+    contributors = generate_contributors(
+        args.rows,
+        args.domains,
+        args.calendar_days,
+        args.questions,
+        equal_weighted_share=args.equal_weighted,
+        midpoint_share=args.midpoint,
+        trimmed_share=args.trimmed,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+    results = {}
+    start = time.perf_counter()
+    compiled_weights = TradingWeights(
+        trading_weights,
+        COLUMNS["trading_date_col"],
+        COLUMNS["trading_weights_col"],
+        COLUMNS["trading_domain_col"],
+        COLUMNS["trading_period_start_col"],
+        COLUMNS["trading_period_end_col"],
+    )
+    results["trading_weights"] = _result(
+        len(trading_weights), time.perf_counter() - start, None
+    )
+
+    if args.trace_memory:
+        tracemalloc.start()
+    df = contributors.copy()
+    active_rows = _ActiveRows(len(df), COLUMNS["da_error_flag_col"])
+    for name, stage in _stages(compiled_weights, questions, engine):
+        rows = len(df)
+        if args.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        df = stage(df)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        results[name] = _result(rows, seconds, peak)
+        df = active_rows.set_aside_flagged(df)
+    if args.trace_memory:
+        tracemalloc.stop()
+
+    # The synthetic data mixes the mid-point and equal weighted options between rows, which date_adjustment only
+    # allows with ignore_multi_aw_param_error.
+    start = time.perf_counter()
+    date_adjustment(
+        contributors.copy(),
+        trading_weights,
+        questions,
+        **COLUMNS,
+        ignore_multi_aw_param_error=True,
+        engine=engine,
+    )
+    results["total"] = _result(args.rows, time.perf_counter() - start, None)
+    return {"stages": results, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _result(rows: int, seconds: float, peak_bytes: int) -> dict:
+    """
+    :param rows: The number of rows processed.
+    :param seconds: The time taken.
+    :param peak_bytes: The peak memory allocated, None if not traced.
+    :return: The result of a stage.
+    """
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else float("inf"),
+        "peak_mb": None if peak_bytes is None else peak_bytes / (1024 * 1024),
+    }
+
+
+def _regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    :param results: The results of this run, by engine.
+    :param baseline: Saved results to compare against, by engine.
+    :param tolerance: The fall in rows per second allowed, as a share of the baseline.
+    :return: A description of each stage whose rows per second fell by more than the tolerance.
+    """
+    regressions = []
+    for engine, engine_results in results.items():
+        baseline_stages = baseline.get(engine, {}).get("stages", {})
+        for name, result in engine_results["stages"].items():
+            if name not in baseline_stages:
+                continue
+            expected = baseline_stages[name]["rows_per_second"]
+            if result["rows_per_second"] < expected * (1 - tolerance):
+                regressions.append(
+                    f"{engine} {name}: {result['rows_per_second']:,.0f} rows/s, "
+                    f"baseline {expected:,.0f} rows/s"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--domains", type=int, default=20)
+    parser.add_argument("--calendar-days", type=int, default=730)
+    parser.add_argument("--questions", type=int, default=2)
+    parser.add_argument("--equal-weighted", type=float, default=0.1)
+    parser.add_argument("--midpoint", type=float, default=0.2)
+    parser.add_argument("--trimmed", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--output", help="Save the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare with results saved by --output.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = {}
+    for engine in args.engines:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            results[engine] = executor.submit(run_engine, engine, args).result()
+
+        print(f"\nengine: {engine}, peak RSS {results[engine]['peak_rss_mb']:.1f} MB")
+        print(f"{'stage':<20}{'rows':>10}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}")
+        for name, result in results[engine]["stages"].items():
+            peak = "" if result["peak_mb"] is None else f"{result['peak_mb']:.1f}"
+            print(
+                f"{name:<20}{result['rows']:>10}{result['seconds']:>10.3f}"
+                f"{result['rows_per_second']:>14,.0f}{peak:>10}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = _regressions(
+                results, json.load(baseline_file), args.tolerance
+            )
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
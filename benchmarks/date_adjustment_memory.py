@@ -0,0 +1,92 @@
+"""
+Peak memory benchmark for the engines of date_adjustment.
+
+Each case is run on the same synthetic data in a fresh process, and the peak resident set size (RSS) of that
+process is reported, along with its peak once the data had been generated:
+
+    row:        date_adjustment with engine="row", where each stage is a DataFrame.apply call that builds a new
+                dataframe from the one before.
+    vectorized: date_adjustment with engine="vectorized", where the stages write their columns into one working
+                set of column arrays owned by date_adjustment.
+
+The row engine takes a few milliseconds per row, so use --cases and --rows to run it on fewer rows (1,000,000 rows
+take over an hour).
+
+Usage (from the repository root, with sml_small installed, Linux or macOS only):
+
+    poetry run python benchmarks/date_adjustment_memory.py --rows 1000000 --cases vectorized
+
+For Copyright information, please see LICENCE.
+"""
+
+import argparse
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from synthetic_data import (
+    COLUMNS,
+    generate_contributors,
+    generate_trading_weights,
+    target_columns,
+)
+
+from sml_small.date_adjustment import date_adjustment
+
+CASES = ["row", "vectorized"]
+
+
+def _peak_rss_mb() -> float:
+    """
+    :return: The peak RSS of this process so far, in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_case(case: str, rows: int, domains: int, calendar_days: int) -> tuple:
+    """
+    Runs one case, to be called in a fresh process.
+
+    :param case: One of CASES.
+    :param rows: The number of contributors.
+    :param domains: The number of domains.
+    :param calendar_days: The number of days in the trading weights calendar.
+    :return: The peak RSS in MB once the data had been generated, and at the end of the run.
+    """
+    questions = target_columns(2)
+    trading_weights = generate_trading_weights(domains, calendar_days)
+    contributors = generate_contributors(rows, domains, calendar_days, len(questions))
+    data_peak = _peak_rss_mb()
+
+    date_adjustment(
+        contributors,
+        trading_weights,
+        questions,
+        **COLUMNS,
+        engine=case,
+    )
+    return data_peak, _peak_rss_mb()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--domains", type=int, default=20)
+    parser.add_argument("--calendar-days", type=int, default=730)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    args = parser.parse_args()
+
+    print(f"{'case':<12}{'data peak MB':>14}{'run peak MB':>14}")
+    for case in args.cases:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            data_peak, run_peak = executor.submit(
+                run_case, case, args.rows, args.domains, args.calendar_days
+            ).result()
+        print(f"{case:<12}{data_peak:>14.1f}{run_peak:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
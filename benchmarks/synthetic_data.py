@@ -0,0 +1,158 @@
+"""
+Synthetic contributor and trading weights data for the date_adjustment benchmarks.
+
+For Copyright information, please see LICENCE.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Column names used in the synthetic data, passed to date_adjustment by the benchmarks.
+COLUMNS = {
+    "contributor_returned_start_date_col": "contributors_returned_period_start_date",
+    "contributor_returned_end_date_col": "contributors_returned_period_end_date",
+    "expected_start_date_col": "expected_period_start_date",
+    "expected_end_date_col": "expected_period_end_date",
+    "domain_col": "domain_SIC_code",
+    "short_period_parameter_col": "short_period_parameter",
+    "long_period_parameter_col": "long_period_parameter",
+    "equal_weighted_col": "set_to_equal_weighted",
+    "set_to_mid_point_col": "set_to_mid_point",
+    "use_calendar_days_col": "use_calendar_days",
+    "average_weekly_col": "average_weekly",
+    "da_error_flag_col": "date_adjustment_error_flag",
+    "trading_date_col": "date",
+    "trading_weights_col": "weight",
+    "trading_domain_col": "domain",
+    "trading_period_start_col": "period_start",
+    "trading_period_end_col": "period_end",
+}
+
+
+def target_columns(questions: int) -> list:
+    """
+    :param questions: The number of target columns.
+    :return: The names of the target columns.
+    """
+    return ["Q" + str(20 + number) for number in range(questions)]
+
+
+def generate_trading_weights(
+    domains: int, calendar_days: int, first_date: str = "2023-01-01"
+) -> pd.DataFrame:
+    """
+    :param domains: The number of domains.
+    :param calendar_days: The number of days in the calendar of each domain.
+    :param first_date: The first date of the calendar.
+    :return: Trading weights with a weight of 1 on weekdays and 0 at weekends, and calendar month trading periods.
+    """
+    dates = pd.date_range(first_date, periods=calendar_days, freq="D")
+    weights = np.where(dates.dayofweek < 5, 1.0, 0.0)
+    months = dates.to_period("M")
+    return pd.DataFrame(
+        {
+            COLUMNS["trading_domain_col"]: np.repeat(
+                [str(1000 + domain) for domain in range(domains)], calendar_days
+            ),
+            COLUMNS["trading_date_col"]: np.tile(dates, domains),
+            COLUMNS["trading_weights_col"]: np.tile(weights, domains),
+            COLUMNS["trading_period_start_col"]: np.tile(
+                months.start_time.normalize(), domains
+            ),
+            COLUMNS["trading_period_end_col"]: np.tile(
+                months.end_time.normalize(), domains
+            ),
+        }
+    )
+
+
+# The data faults introduced by generate_contributors, by the error code they are expected to produce.
+FAULTS = ["E01", "E02", "E14", "E15"]
+
+
+def generate_contributors(
+    rows: int,
+    domains: int,
+    calendar_days: int,
+    questions: int = 2,
+    equal_weighted_share: float = 0.0,
+    midpoint_share: float = 0.0,
+    trimmed_share: float = 0.0,
+    error_rate: float = 0.0,
+    first_date: str = "2023-01-01",
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    :param rows: The number of contributors.
+    :param domains: The number of domains the contributors are spread over.
+    :param calendar_days: The number of days in the trading weights calendar the periods must fall within.
+    :param questions: The number of target columns.
+    :param equal_weighted_share: The share of contributors set to equal weighted. If not 0 or 1, date_adjustment
+            must be run with ignore_multi_aw_param_error, as for midpoint_share.
+    :param midpoint_share: The share of contributors set to mid-point ("Y" or "YT").
+    :param trimmed_share: The share of the mid-point contributors set to "YT" rather than "Y".
+    :param error_rate: The share of contributors given one of the FAULTS, spread evenly over them.
+    :param first_date: The first date of the trading weights calendar.
+    :param seed: Seed for the random number generator.
+    :return: Contributors expected to return a calendar month, each returning a period of 2 to 6 weeks starting
+            within a week of the expected period.
+    """
+    generator = np.random.default_rng(seed)
+    first_date = np.datetime64(first_date, "D")
+    first_month = first_date.astype("datetime64[M]")
+    last_month = (first_date + calendar_days).astype("datetime64[M]") - 2
+
+    expected_months = (
+        first_month
+        + 1
+        + generator.integers(0, max(1, (last_month - first_month).astype(int)), rows)
+    )
+    expected_start = expected_months.astype("datetime64[D]")
+    expected_end = (expected_months + 1).astype("datetime64[D]") - 1
+    returned_start = expected_start + generator.integers(-7, 8, rows)
+    returned_end = returned_start + generator.integers(14, 43, rows)
+
+    # The first row is left without a fault, as it holds the average weekly parameter.
+    faulty = np.flatnonzero(generator.random(rows) < error_rate)
+    faulty = faulty[faulty > 0]
+    faults = np.asarray(FAULTS)[np.arange(len(faulty)) % len(FAULTS)]
+    end_before_start = faulty[faults == "E02"]
+    returned_end[end_before_start] = returned_start[end_before_start] - 1
+
+    midpoint = generator.random(rows) < midpoint_share
+    trimmed = midpoint & (generator.random(rows) < trimmed_share)
+    set_to_mid_point = np.where(trimmed, "YT", np.where(midpoint, "Y", "N"))
+    equal_weighted = np.where(generator.random(rows) < equal_weighted_share, "Y", "N")
+
+    contributors = pd.DataFrame(
+        {
+            COLUMNS["contributor_returned_start_date_col"]: returned_start.astype(
+                "datetime64[ns]"
+            ),
+            COLUMNS["contributor_returned_end_date_col"]: returned_end.astype(
+                "datetime64[ns]"
+            ),
+            COLUMNS["expected_start_date_col"]: expected_start.astype("datetime64[ns]"),
+            COLUMNS["expected_end_date_col"]: expected_end.astype("datetime64[ns]"),
+            COLUMNS["domain_col"]: pd.Series(
+                (1000 + generator.integers(0, domains, rows)).astype(str),
+                dtype="string",
+            ),
+            COLUMNS["short_period_parameter_col"]: 27,
+            COLUMNS["long_period_parameter_col"]: 35,
+            COLUMNS["equal_weighted_col"]: equal_weighted,
+            COLUMNS["set_to_mid_point_col"]: set_to_mid_point,
+            COLUMNS["use_calendar_days_col"]: "N",
+            COLUMNS["average_weekly_col"]: "A",
+        }
+    )
+    for col in target_columns(questions):
+        contributors[col] = generator.uniform(0, 10000, rows).round(2)
+
+    for fault, col in [
+        ("E01", target_columns(questions)[0]),
+        ("E14", COLUMNS["expected_start_date_col"]),
+        ("E15", COLUMNS["expected_end_date_col"]),
+    ]:
+        contributors.loc[faulty[faults == fault], col] = None
+    return contributors
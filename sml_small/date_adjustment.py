@@ -2,14 +2,157 @@
 For Copyright information, please see LICENCE.
 """
 
+import hashlib
+import json
+import os
+import sqlite3
 import sys
+import time
 from calendar import monthrange
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import timedelta
-from typing import List, Union
+from enum import Enum
+from typing import Callable, Iterable, Iterator, List, Union
 
 import numpy as np
 import pandas as pd
 
+# Columns that are zeroed, where they exist, when a row is error flagged.
+_ERROR_ZEROED_COLUMNS = [
+    "number_of_days_in_contributors_returned_period",
+    "sum_of_trading_day_weights_over_contributors_returned_period",
+    "sum_of_trading_day_weights_over_actual_returned_period",
+]
+
+# The intermediate columns date_adjustment can add to its output, besides the error flag column and the columns named
+# after the target columns. See _added_columns.
+_INTERMEDIATE_COLUMNS = [
+    "sum_of_trading_day_weights_over_contributors_returned_period",
+    "number_of_days_in_contributors_returned_period",
+    "midpoint_date",
+    "date_change_in_return_period_flag",
+    "actual_period_start_date",
+    "actual_period_end_date",
+    "number_of_days_in_actual_returned_period",
+    "date_adjustment_length_flag",
+    "sum_of_trading_day_weights_over_actual_returned_period",
+]
+
+
+class ErrorCode(Enum):
+    """
+    Enum of the error flags that date_adjustment places in the error flag column, so that callers can map the codes
+    found in their output to a description, e.g. ErrorCode["E03"].description.
+
+    Each member holds the number of the code, its description and whether raising it on a row nullifies the outputs
+    already calculated for that row.
+    """
+
+    E00 = (0, "Average Weekly parameter is invalid.", False)
+    E01 = (
+        1,
+        "The value to be date adjusted is missing from one of the target columns.",
+        False,
+    )
+    E02 = (
+        2,
+        "The contributor returned end date is earlier than the contributor returned start date.",
+        True,
+    )
+    E03 = (
+        3,
+        "A required record for calculating weight m is missing from the trading weights table.",
+        True,
+    )
+    E04 = (
+        4,
+        "A required trading weight for calculating weight m is null or blank.",
+        True,
+    )
+    E05 = (
+        5,
+        "A required trading weight for calculating weight m has a negative value.",
+        True,
+    )
+    E06 = (
+        6,
+        "A required record for calculating weight n is missing from or duplicated in the trading weights table.",
+        True,
+    )
+    E07 = (
+        7,
+        "A required trading weight for calculating weight n is null or blank.",
+        True,
+    )
+    E08 = (
+        8,
+        "A required trading weight for calculating weight n has a negative value.",
+        True,
+    )
+    E09 = (9, "Contributors return does not cover any of expected period.", True)
+    E10 = (
+        10,
+        "The sum of trading day weights over contributors returned period is zero.",
+        True,
+    )
+    E11 = (
+        11,
+        "The sum of trading day weights over actual returned period is zero.",
+        True,
+    )
+    E12 = (
+        12,
+        "A required record for calculating midpoint date is missing from the trading weights table.",
+        True,
+    )
+    E13 = (
+        13,
+        "A required record for setting APS and APE by midpoint is missing from or duplicated in the trading weights "
+        "table.",
+        True,
+    )
+    E14 = (14, "Expected period start date is missing or an invalid date.", True)
+    E15 = (15, "Expected period end date is missing or an invalid date.", True)
+
+    def __init__(self, number: int, description: str, nullifies_outputs: bool):
+        self.number = number
+        self.description = description
+        self.nullifies_outputs = nullifies_outputs
+
+    @property
+    def code(self) -> str:
+        """
+        :return: The code as written to the error flag column, e.g. "E03".
+        """
+        return self.name
+
+    @property
+    def zeroed_columns(self) -> List:
+        """
+        :return: The columns set to 0, where they exist, when this code is raised on a row.
+        """
+        return list(_ERROR_ZEROED_COLUMNS) if self.nullifies_outputs else []
+
+    def nulled_columns(self, target_columns: List) -> List:
+        """
+        :param target_columns: The names of the columns to be date_adjusted.
+        :return: The output columns set to nan, where they exist, when this code is raised on a row.
+        """
+        if not self.nullifies_outputs:
+            return []
+        return [
+            prefix + col
+            for col in target_columns
+            for prefix in ["date_adjusted_", "average_weekly_"]
+        ]
+
+
+# Lookups of the error code registry, built once for the membership checks done on every row and column.
+_ERROR_CODES = frozenset(error_code.code for error_code in ErrorCode)
+_ERROR_CODES_BY_NUMBER = list(ErrorCode)
+_ERROR_CODE_NUMBERS = {error_code.code: error_code.number for error_code in ErrorCode}
+
 
 def date_adjustment(
     input_dataframe: pd.DataFrame,
@@ -33,6 +176,11 @@ def date_adjustment(
     trading_period_start_col: str,
     trading_period_end_col: str,
     ignore_multi_aw_param_error=False,
+    engine: str = "row",
+    n_jobs: int = 1,
+    instrumentation: Callable[["StageRecord"], None] = None,
+    period_cache: "PeriodCache" = None,
+    output_columns: List = None,
 ) -> pd.DataFrame:
     """
         **Description**:
@@ -48,13 +196,18 @@ def date_adjustment(
         6. date_adjustment_subfunction.
         7. average_weekly_subfunction.
 
-        All calculations are done on a row by row basis. Full documentation can be found in
-        the README.md file in the docs directory.
+        By default all calculations are done on a row by row basis. With engine="vectorized" the
+        sub-functions are instead run column-wise over all rows at once, giving the same output.
+        With n_jobs greater than 1 the data is split by domain, as rows only use the trading weights of their
+        own domain, and the parts are processed in parallel worker processes.
+        Full documentation can be found in the README.md file in the docs directory.
     ----
         **Parameters**
 
         :param  input_dataframe: The dataframe containing the data to be processed plus processing options.
-        :param  trading_weights: The trading day weight reference data required for processing.
+        :param  trading_weights: The trading day weight reference data required for processing, as a DataFrame or a
+        TradingWeights object built with the same trading column names, which saves validating and indexing it
+        again on each call.
         :param  target_columns: The names of the columns in input_dataframe to be date_adjusted.
         :param  contributor_returned_start_date_col: Name of the column holding the contributors
         returned period start date.
@@ -81,15 +234,37 @@ def date_adjustment(
         :param  trading_period_end_col: Name of the column holding the trading period end date in the trading_weights
                 DataFrame.
         :param  ignore_multi_aw_param_error: Used in testing only. Leave blank so it defaults to False.
+        :param  engine: "row" (default) to process the data row by row, or "vectorized" to process all rows
+                column-wise.
+        :param  n_jobs: The number of worker processes to use, 1 (default) to process the data in this process
+                or -1 to use one per CPU.
+        :param  instrumentation: Optional function called with a StageRecord of the wall time, rows in and out and
+                error codes given by each sub-function run, e.g. a DateAdjustmentStats object. With n_jobs > 1
+                each worker process records its own partition of the data, and the records are passed on once all
+                the partitions are done.
+        :param  period_cache: Optional PeriodCache in which the results of the primary wrangler, midpoint and
+                secondary wrangler sub-functions are looked up for each period signature before they are
+                calculated, and stored once they have been. Only the period signatures not found are run through
+                the sub-functions. Can only be used with the vectorized engine.
+        :param  output_columns: Optional list of the columns added by the method to include in the output, e.g.
+                ["date_adjusted_Q20", "date_adjustment_length_flag"]. The columns of the input data and the error
+                flag column are always included. Defaults to all the columns added. The vectorized engine holds
+                the other intermediate results as arrays and never adds them to the output.
 
         :raises TypeError: If the input dataframe is not a DataFrame.
-        :raises TypeError: If the trading weights reference data is not a DataFrame.
+        :raises TypeError: If the trading weights reference data is not a DataFrame or TradingWeights.
         :raises TypeError: If the target columns parameter is not a List.
         :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe or the
                 trading weights dataframe as appropriate.
         :raises KeyError: If columns referenced in target_columns parameter cannot be found in the input dataframe.
         :raises ValueError: If mixed values found in the input dataframe for equal_weighted_col, set_to_mid_point_col or
                 average_weekly_col.
+        :raises ValueError: If the engine parameter is not recognised.
+        :raises ValueError: If the n_jobs parameter is not a positive integer or -1.
+        :raises TypeError: If the period_cache parameter is not a PeriodCache.
+        :raises ValueError: If the period_cache parameter is passed with the row engine.
+        :raises TypeError: If the output_columns parameter is not a List.
+        :raises ValueError: If output_columns holds a column the method does not add.
 
         :returns: The input data with the method output appended as extra columns as necessary
 
@@ -121,6 +296,8 @@ def date_adjustment(
             * E14: Expected period start date is missing or an invalid date.
             * E15: Expected period end date is missing or an invalid date.
 
+            The codes and their descriptions are also available from the ErrorCode enum.
+
             ** NOTE: **
             These are NOT exceptions and do not cause the method to fail. Once an error flag
             has been placed on a row of data, no further processing is done to that row,
@@ -150,29 +327,25 @@ def date_adjustment(
 
     """
 
-    # Initialise dtypes for input columns
-    dtype_dict = {
-        contributor_returned_start_date_col: "datetime64[ns]",
-        contributor_returned_end_date_col: "datetime64[ns]",
-        expected_start_date_col: "datetime64[ns]",
-        expected_end_date_col: "datetime64[ns]",
-        "actual_period_start_date": "datetime64[ns]",
-        "actual_period_end_date": "datetime64[ns]",
-        equal_weighted_col: "object",
-        domain_col: "object",
-        set_to_mid_point_col: "object",
-        use_calendar_days_col: "object",
-        short_period_parameter_col: "int64",
-        long_period_parameter_col: "int64",
-        average_weekly_col: "object",
-        da_error_flag_col: "object",
-        trading_date_col: "datetime64[ns]",
-        trading_weights_col: "object",
-        trading_domain_col: "object",
-        trading_period_start_col: "datetime64[ns]",
-        trading_period_end_col: "datetime64[ns]",
-        "domain_col_list": [domain_col, trading_domain_col],
-    }
+    dtype_dict = _date_adjustment_dtypes(
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        average_weekly_col,
+        da_error_flag_col,
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    )
 
     # Basic validation
     # noinspection PyProtectedMember,PyUnresolvedReferences
@@ -183,513 +356,4281 @@ def date_adjustment(
         trading_weights=trading_weights,
         target_columns=target_columns,
     )
+    _engine_validation(this_place, engine)
+    _n_jobs_validation(this_place, n_jobs)
+    _period_cache_validation(this_place, period_cache, engine)
+    _output_columns_validation(this_place, output_columns, target_columns)
 
-    # Check df dtypes and change where necessary
-    # noinspection PyTypeChecker
-    input_dataframe = _set_dtypes(input_dataframe, dtype_dict, target_columns)
+    trading_weights, weights_index = _prepare_trading_weights(
+        this_place,
+        trading_weights,
+        dtype_dict,
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    )
 
-    # Validate required columns in input_dataframe
-    required_columns = [
+    return _adjust_dataframe(
+        this_place,
+        input_dataframe,
+        trading_weights,
+        weights_index,
+        dtype_dict,
+        target_columns,
         contributor_returned_start_date_col,
         contributor_returned_end_date_col,
-        contributor_returned_end_date_col,
         expected_start_date_col,
         expected_end_date_col,
-        equal_weighted_col,
         domain_col,
-        set_to_mid_point_col,
-        use_calendar_days_col,
         short_period_parameter_col,
         long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
         average_weekly_col,
-    ]
-    for col_name in target_columns:
-        required_columns.append(col_name)
-    _required_column_validation(
-        this_place, "input_dataframe", input_dataframe, required_columns
-    )
-
-    # Validate required columns are in trading_weights dataframe
-    required_columns = [
-        trading_weights_col,
+        da_error_flag_col,
         trading_date_col,
+        trading_weights_col,
         trading_domain_col,
         trading_period_start_col,
         trading_period_end_col,
-    ]
-    _required_column_validation(
-        this_place, "trading_weights", trading_weights, required_columns
+        ignore_multi_aw_param_error,
+        engine,
+        n_jobs=os.cpu_count() if n_jobs == -1 else n_jobs,
+        instrumentation=instrumentation,
+        period_cache=period_cache,
+        output_columns=output_columns,
     )
 
-    # Ensure only one average_weekly_param value present
-    check_list = list(input_dataframe[average_weekly_col].unique())
-    if not ignore_multi_aw_param_error:
-        if len(check_list) != 1:
-            # Initiate fast fail with AW error flag in error flag column
-            df_aw_param_error = input_dataframe
-            df_aw_param_error[da_error_flag_col] = "E00"
-            return df_aw_param_error
-
-    # Ensure only one set_to_mid_point_col value present
-    check_list = list(input_dataframe[set_to_mid_point_col].unique())
-    if not ignore_multi_aw_param_error:
-        if len(check_list) != 1:
-            msg = (
-                f"the use mid-point method parameter from {set_to_mid_point_col} "
-                f"has more than one unique value set in the input dataframe."
-            )
-            raise ValueError(msg)
 
-    # Ensure only one equal_weighted_col value present
-    check_list = list(input_dataframe[equal_weighted_col].unique())
-    if not ignore_multi_aw_param_error:
-        if len(check_list) != 1:
-            msg = (
-                f"the use equal weights parameter from {equal_weighted_col} "
-                f"has more than one unique value set in the input dataframe."
-            )
-            raise ValueError(msg)
+def date_adjustment_chunks(
+    input_chunks: Iterable[pd.DataFrame],
+    trading_weights: pd.DataFrame,
+    target_columns: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    average_weekly_col: str,
+    da_error_flag_col: str,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+    ignore_multi_aw_param_error=False,
+    engine: str = "row",
+    instrumentation: Callable[["StageRecord"], None] = None,
+    period_cache: "PeriodCache" = None,
+    output_columns: List = None,
+) -> Iterator[pd.DataFrame]:
+    """
+        **Description**:
 
-    # Check cols for reserved names (ones that method adds later) to prevent overwrite.
-    cols = list(input_dataframe.columns)
-    reserved = [
-        "midpoint",
-        "actual_period_start_date",
-        "actual_period_end_date",
-        "date_change_in_return_period_flag",
-        "number_of_days_in_contributors_returned_period"
-        "sum_of_trading_day_weights_over_actual_returned_period",
-        "sum_of_trading_day_weights_over_contributors_returned_period",
-    ]
-    for col in cols:
-        if col in reserved:
-            msg = (
-                f"Reserved column name of {col} found in input dataframe column names."
-            )
-            raise ValueError(msg)
+        Streaming form of date_adjustment, for input data too large to be held in memory at once. Each chunk of
+        the input data (e.g. from pd.read_csv(..., chunksize=...)) is processed as date_adjustment would process
+        it and yielded in turn. The trading weights are validated and indexed once, when this function is called,
+        and reused for every chunk.
 
-    # Initialise 'average_weekly_questions_list' to hold list of questions that will
-    # use average weekly functionality
-    average_weekly_param = input_dataframe.loc[0][average_weekly_col]
-    average_weekly_questions_list = generate_average_weekly_questions(
-        average_weekly_param, target_columns
-    )
-    # indirectly validate contents of average_weekly parameter
-    if not isinstance(average_weekly_questions_list, list):
-        # Initiate fast fail with AW error flag in error flag column
-        df_aw_param_error = input_dataframe
-        df_aw_param_error[da_error_flag_col] = "E00"
-        return df_aw_param_error
+        The average weekly, set to mid-point and equal weighted parameters must hold the same value in every
+        chunk. The first chunk found to hold a second value is given the E00 error flag (average weekly) or raises
+        a ValueError (set to mid-point, equal weighted) as date_adjustment would for the whole input, but any
+        earlier chunks will already have been yielded.
+    ----
+        **Parameters**
 
-    # Send dataframe through missing value subfunction
-    df_stage_one = missing_value_subfunction(
-        input_dataframe, target_columns, da_error_flag_col
-    )
+        :param  input_chunks: Iterable of dataframes holding the data to be processed plus processing options.
+        :param  trading_weights: The trading day weight reference data required for processing, as a DataFrame or a
+        TradingWeights object built with the same trading column names, which saves validating and indexing it
+        again on each call.
 
-    # Check df_stage_one dtypes and change where necessary
-    # noinspection PyTypeChecker
-    df_stage_one = _set_dtypes(df_stage_one, dtype_dict, target_columns)
+        The remaining parameters are as described for date_adjustment.
 
-    # Check trading_weights dtypes and change where necessary
-    trading_weights = _set_dtypes(trading_weights, dtype_dict)
+        :raises TypeError: If the trading weights reference data is not a DataFrame or TradingWeights.
+        :raises TypeError: If the target columns parameter is not a List.
+        :raises KeyError: If required columns referenced in the parameters cannot be found in the trading weights
+                dataframe.
+        :raises ValueError: If the engine parameter is not recognised.
 
-    # If all rows error flagged, output dataframe as is.
-    if df_stage_one[da_error_flag_col].notnull().values.all():
-        return df_stage_one
+        Errors in the data of a chunk are raised as for date_adjustment, when that chunk is reached.
 
-    df_stage_two = primary_wrangler_subfunction(
-        df_stage_one,
-        trading_weights,
-        target_columns,
+        :returns: An iterator of the processed chunks, in the order they were supplied.
+    """
+    dtype_dict = _date_adjustment_dtypes(
         contributor_returned_start_date_col,
         contributor_returned_end_date_col,
         expected_start_date_col,
         expected_end_date_col,
         domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
         equal_weighted_col,
-        da_error_flag_col,
-        trading_domain_col,
-        trading_date_col,
-        trading_weights_col,
-    )
-
-    # If all rows error flagged, output dataframe as is.
-    if df_stage_two[da_error_flag_col].notnull().values.all():
-        return df_stage_two
-
-    # Send dataframe through midpoint method
-    df_stage_three = midpoint_subfunction(
-        df_stage_two,
-        trading_weights,
-        target_columns,
-        domain_col,
-        expected_start_date_col,
-        expected_end_date_col,
-        contributor_returned_start_date_col,
-        contributor_returned_end_date_col,
         set_to_mid_point_col,
-        equal_weighted_col,
         use_calendar_days_col,
+        average_weekly_col,
+        da_error_flag_col,
         trading_date_col,
-        trading_period_start_col,
-        trading_period_end_col,
         trading_weights_col,
         trading_domain_col,
-        da_error_flag_col,
+        trading_period_start_col,
+        trading_period_end_col,
     )
 
-    # If all rows error flagged, output dataframe as is.
-    if df_stage_three[da_error_flag_col].notnull().values.all():
-        return df_stage_three
+    # Basic validation of the inputs shared by all chunks, each chunk is validated when it is reached.
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+    if not isinstance(trading_weights, (pd.DataFrame, TradingWeights)):
+        msg = 'Param "trading_weights" for function ' + this_place + " "
+        msg += "should be of type DataFrame or TradingWeights, not "
+        msg += str(type(trading_weights)) + "."
+        raise TypeError(msg)
+    if not isinstance(target_columns, list):
+        msg = 'Param "target_columns" for function ' + this_place + " "
+        msg += "should be of type List, not " + str(type(target_columns)) + "."
+        raise TypeError(msg)
+    _engine_validation(this_place, engine)
+    _period_cache_validation(this_place, period_cache, engine)
+    _output_columns_validation(this_place, output_columns, target_columns)
 
-    # Send dataframe through secondary wrangler
-    df_stage_four = secondary_wrangler_subfunction(
-        df_stage_three,
+    trading_weights, weights_index = _prepare_trading_weights(
+        this_place,
         trading_weights,
-        target_columns,
-        contributor_returned_start_date_col,
-        contributor_returned_end_date_col,
-        expected_start_date_col,
-        expected_end_date_col,
-        domain_col,
-        equal_weighted_col,
-        set_to_mid_point_col,
-        short_period_parameter_col,
-        long_period_parameter_col,
-        da_error_flag_col,
+        dtype_dict,
         trading_date_col,
-        trading_domain_col,
         trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
     )
 
-    # If all rows error flagged, output dataframe as is.
-    if df_stage_four[da_error_flag_col].notnull().values.all():
-        return df_stage_four
-
-    # Send dataframe through date adjustment method.
-    df_stage_five = date_adjustment_subfunction(
-        df_stage_four, target_columns, da_error_flag_col
-    )
-
-    # If all rows error flagged, output dataframe as is.
-    if df_stage_five[da_error_flag_col].notnull().values.all():
-        return df_stage_five
-
-    # Send dataframe through average weekly method.
-    df_stage_six = average_weekly_subfunction(
-        df_stage_five, average_weekly_questions_list, da_error_flag_col
+    # Values of the single valued parameters found in the chunks processed so far.
+    seen_parameter_values = {}
+
+    return (
+        _adjust_dataframe(
+            this_place,
+            input_dataframe,
+            trading_weights,
+            weights_index,
+            dtype_dict,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine,
+            seen_parameter_values,
+            instrumentation=instrumentation,
+            period_cache=period_cache,
+            output_columns=output_columns,
+        )
+        for input_dataframe in input_chunks
     )
 
-    output_dataframe = df_stage_six.copy()
-
-    return output_dataframe
 
-
-# -------------------------------------------------------------------------------------------------------------
-# SECTION: GENERATE AVERAGE WEEKLY QUESTION LIST SUB-FUNCTION
-# -------------------------------------------------------------------------------------------------------------
-
-
-def generate_average_weekly_questions(
-    average_weekly: str, target_columns: List
+def date_adjustment_incremental(
+    previous_output: pd.DataFrame,
+    changed_dataframe: pd.DataFrame,
+    reference_col: str,
+    trading_weights: pd.DataFrame,
+    target_columns: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    average_weekly_col: str,
+    da_error_flag_col: str,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+    ignore_multi_aw_param_error=False,
+    engine: str = "row",
+    n_jobs: int = 1,
+    instrumentation: Callable[["StageRecord"], None] = None,
+    period_cache: "PeriodCache" = None,
+    output_columns: List = None,
+) -> pd.DataFrame:
+    """
+        **Description**:
+
+        Incremental form of date_adjustment, for adding late or corrected returns to an earlier output without
+        processing every contributor again. Each row is date adjusted independently of the others, so only the
+        rows of changed_dataframe are processed, as date_adjustment would process them. The rows of
+        previous_output for the other contributors, with the weight sums and adjusted values already found for
+        them, are kept as they are.
+
+        A row of changed_dataframe replaces the row of previous_output with the same reference, in its position,
+        and a row with a new reference is added to the end. The trading weights must be those previous_output was
+        produced with, otherwise the whole input must be processed again with date_adjustment.
+
+        The average weekly parameter must hold the same value as in previous_output, otherwise the rows of
+        changed_dataframe are given the E00 error flag as date_adjustment would for the whole input. The set to
+        mid-point and equal weighted parameters are only checked within changed_dataframe, as date_adjustment
+        can change their values in its output.
+    ----
+        **Parameters**
+
+        :param  previous_output: The output of an earlier run of date_adjustment (or of this function).
+        :param  changed_dataframe: The new and changed rows of input data, as they would be passed to
+                date_adjustment.
+        :param  reference_col: Name of the column, in both previous_output and changed_dataframe, holding the
+                reference that identifies each contributor.
+
+        The remaining parameters are as described for date_adjustment.
+
+        :raises TypeError: If previous_output or changed_dataframe is not a DataFrame.
+        :raises KeyError: If reference_col cannot be found in previous_output or changed_dataframe.
+        :raises ValueError: If a reference is found on more than one row of previous_output or changed_dataframe.
+
+        Errors in changed_dataframe and the other parameters are raised as for date_adjustment.
+
+        :returns: previous_output with the rows of changed_dataframe processed and merged in. Index labels are
+                those of the dataframe each row came from.
+    """
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+    if not isinstance(previous_output, pd.DataFrame):
+        msg = 'Param "previous_output" for function ' + this_place + " "
+        msg += "should be of type DataFrame, not " + str(type(previous_output)) + "."
+        raise TypeError(msg)
+    _basic_input_validation(
+        this_place,
+        input_dataframe=changed_dataframe,
+        trading_weights=trading_weights,
+        target_columns=target_columns,
+    )
+    _engine_validation(this_place, engine)
+    _n_jobs_validation(this_place, n_jobs)
+    _period_cache_validation(this_place, period_cache, engine)
+    _output_columns_validation(this_place, output_columns, target_columns)
+    for df_name, dataframe in [
+        ("previous_output", previous_output),
+        ("changed_dataframe", changed_dataframe),
+    ]:
+        _required_column_validation(this_place, df_name, dataframe, [reference_col])
+        if dataframe[reference_col].duplicated().any():
+            msg = (
+                f"{df_name} holds more than one row for a reference in {reference_col}."
+            )
+            raise ValueError(msg)
+
+    dtype_dict = _date_adjustment_dtypes(
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        average_weekly_col,
+        da_error_flag_col,
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    )
+    trading_weights, weights_index = _prepare_trading_weights(
+        this_place,
+        trading_weights,
+        dtype_dict,
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    )
+
+    # The changed rows are checked against the average weekly parameter of the earlier run, as for a later chunk
+    # in date_adjustment_chunks.
+    seen_parameter_values = {}
+    if average_weekly_col in previous_output.columns:
+        _unique_parameter_values(
+            previous_output, average_weekly_col, seen_parameter_values
+        )
+
+    changed_output = _adjust_dataframe(
+        this_place,
+        changed_dataframe,
+        trading_weights,
+        weights_index,
+        dtype_dict,
+        target_columns,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        average_weekly_col,
+        da_error_flag_col,
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+        ignore_multi_aw_param_error,
+        engine,
+        seen_parameter_values,
+        n_jobs=os.cpu_count() if n_jobs == -1 else n_jobs,
+        instrumentation=instrumentation,
+        period_cache=period_cache,
+        output_columns=output_columns,
+    )
+    return _merge_changed_rows(previous_output, changed_output, reference_col)
+
+
+def _merge_changed_rows(
+    previous_output: pd.DataFrame, changed_output: pd.DataFrame, reference_col: str
+) -> pd.DataFrame:
+    """
+    :param previous_output: The output of an earlier run.
+    :param changed_output: The output for the new and changed rows.
+    :param reference_col: Name of the column holding the reference that identifies each row.
+    :return: previous_output with each row of changed_output in place of the row with the same reference, or at
+            the end if there is none, and the columns of both.
+    """
+    previous_references = pd.Index(previous_output[reference_col])
+    replaced_positions = previous_references.get_indexer(changed_output[reference_col])
+    new_rows = replaced_positions == -1
+    kept = np.ones(len(previous_output), dtype=bool)
+    kept[replaced_positions[~new_rows]] = False
+
+    # Each changed row is sorted into the position of the row it replaces, and new rows after all the others.
+    positions = np.concatenate(
+        [
+            np.flatnonzero(kept),
+            np.where(
+                new_rows,
+                len(previous_output) + np.cumsum(new_rows) - 1,
+                replaced_positions,
+            ),
+        ]
+    )
+    columns = previous_output.columns.append(
+        changed_output.columns.difference(previous_output.columns, sort=False)
+    )
+    merged_output = pd.concat([previous_output[kept], changed_output])[columns]
+    return merged_output.take(np.argsort(positions, kind="stable"))
+
+
+def _date_adjustment_dtypes(
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    average_weekly_col: str,
+    da_error_flag_col: str,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+) -> dict:
+    """
+    :return: The dtypes of the input and trading weights columns, for use with _set_dtypes.
+    """
+    dtype_dict = _input_dtypes(
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        average_weekly_col,
+    )
+    dtype_dict.update(
+        {
+            "actual_period_start_date": "datetime64[ns]",
+            "actual_period_end_date": "datetime64[ns]",
+            da_error_flag_col: "object",
+        }
+    )
+    dtype_dict.update(
+        _trading_weights_dtypes(
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+        )
+    )
+    dtype_dict["domain_col_list"] = [domain_col, trading_domain_col]
+    return dtype_dict
+
+
+def _input_dtypes(
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    average_weekly_col: str,
+) -> dict:
+    """
+    :return: The dtypes of the input columns, for use with _set_dtypes.
+    """
+    return {
+        contributor_returned_start_date_col: "datetime64[ns]",
+        contributor_returned_end_date_col: "datetime64[ns]",
+        expected_start_date_col: "datetime64[ns]",
+        expected_end_date_col: "datetime64[ns]",
+        domain_col: "object",
+        short_period_parameter_col: "int64",
+        long_period_parameter_col: "int64",
+        equal_weighted_col: "object",
+        set_to_mid_point_col: "object",
+        use_calendar_days_col: "object",
+        average_weekly_col: "object",
+        "domain_col_list": [domain_col],
+    }
+
+
+def _trading_weights_dtypes(
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+) -> dict:
+    """
+    :return: The dtypes of the trading weights columns, for use with _set_dtypes.
+    """
+    return {
+        trading_date_col: "datetime64[ns]",
+        trading_weights_col: "object",
+        trading_domain_col: "object",
+        trading_period_start_col: "datetime64[ns]",
+        trading_period_end_col: "datetime64[ns]",
+        "domain_col_list": [trading_domain_col],
+    }
+
+
+def _prepare_trading_weights(
+    this_place: str,
+    trading_weights: pd.DataFrame,
+    dtype_dict: dict,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+) -> tuple:
+    """
+    Validates the trading weights, sets their dtypes and builds the index used by all the sub-functions. If given a
+    TradingWeights object this has already been done, and its contents are returned.
+
+    :param this_place: Name of the calling function, for error messages.
+    :param trading_weights: The trading day weight reference data required for processing, as a DataFrame or
+            TradingWeights.
+    :param dtype_dict: The dtypes of the columns, from _date_adjustment_dtypes.
+    :param trading_date_col: Name of the column holding the dates in trading_weights.
+    :param trading_weights_col: Name of the column holding the weights in trading_weights.
+    :param trading_domain_col: Name of the column holding the domain in trading_weights.
+    :param trading_period_start_col: Name of the column holding the trading period start date in trading_weights.
+    :param trading_period_end_col: Name of the column holding the trading period end date in trading_weights.
+
+    :raises KeyError: If required columns cannot be found in trading_weights.
+    :raises ValueError: If trading_weights is a TradingWeights object built with other column names.
+
+    :return: The trading weights with their dtypes set, and the index of them.
+    """
+    if isinstance(trading_weights, TradingWeights):
+        return _unpack_trading_weights(
+            this_place,
+            trading_weights,
+            None,
+            trading_date_col=trading_date_col,
+            trading_weights_col=trading_weights_col,
+            trading_domain_col=trading_domain_col,
+            trading_period_start_col=trading_period_start_col,
+            trading_period_end_col=trading_period_end_col,
+        )
+
+    # Validate required columns are in trading_weights dataframe
+    required_columns = [
+        trading_weights_col,
+        trading_date_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    ]
+    _required_column_validation(
+        this_place, "trading_weights", trading_weights, required_columns
+    )
+
+    # Check trading_weights dtypes and change where necessary
+    trading_weights = _set_dtypes(trading_weights, dtype_dict)
+
+    # Within the method the domains are held as categories, so that they are matched by code.
+    trading_weights = trading_weights.copy(deep=False)
+    trading_weights[trading_domain_col] = trading_weights[trading_domain_col].astype(
+        "category"
+    )
+
+    # Build the trading weights index once, for use by all the sub-functions.
+    weights_index = _TradingWeightsIndex(
+        trading_weights,
+        trading_domain_col,
+        trading_date_col,
+        trading_weights_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    )
+    return trading_weights, weights_index
+
+
+def _unique_parameter_values(
+    input_dataframe: pd.DataFrame, col_name: str, seen_parameter_values: dict = None
+) -> List:
+    """
+    :param input_dataframe: The dataframe containing the data to be processed plus processing options.
+    :param col_name: Name of a column that should hold one value.
+    :param seen_parameter_values: The values found in earlier chunks of the same run, by column name, updated in
+            place. None if the data is not being processed in chunks.
+    :return: The unique values of the column, including those found in earlier chunks.
+    """
+    values = list(input_dataframe[col_name].unique())
+    if seen_parameter_values is None:
+        return values
+    previous_values = seen_parameter_values.get(col_name, [])
+    values = previous_values + [x for x in values if x not in previous_values]
+    seen_parameter_values[col_name] = values
+    return values
+
+
+def _adjust_dataframe(
+    this_place: str,
+    input_dataframe: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    weights_index: "_TradingWeightsIndex",
+    dtype_dict: dict,
+    target_columns: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    average_weekly_col: str,
+    da_error_flag_col: str,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+    ignore_multi_aw_param_error: bool,
+    engine: str,
+    seen_parameter_values: dict = None,
+    n_jobs: int = 1,
+    instrumentation: Callable[["StageRecord"], None] = None,
+    period_cache: "PeriodCache" = None,
+    output_columns: List = None,
+) -> pd.DataFrame:
+    """
+    Validates one dataframe of input data and steps it through the sub-functions, for date_adjustment and
+    date_adjustment_chunks. The trading weights must already have been through _prepare_trading_weights.
+
+    :param this_place: Name of the calling function, for error messages.
+    :param input_dataframe: The dataframe containing the data to be processed plus processing options.
+    :param trading_weights: The trading day weight reference data, with dtypes set.
+    :param weights_index: Index of trading_weights, including trading periods.
+    :param dtype_dict: The dtypes of the columns, from _date_adjustment_dtypes.
+    :param seen_parameter_values: The single valued parameter values found in earlier chunks, updated in place. None
+            if the data is not being processed in chunks.
+    :param n_jobs: The number of worker processes to run the sub-functions in, 1 to run them in this process.
+    :param instrumentation: Optional function called with a StageRecord of each sub-function run.
+    :param period_cache: Optional PeriodCache of the period level results of earlier runs, for the vectorized engine.
+    :param output_columns: The columns added by the method to include in the output, None for all of them.
+
+    The remaining parameters are as described for date_adjustment.
+
+    :return: The input data with the method output appended as extra columns as necessary.
+    """
+    _basic_input_validation(this_place, input_dataframe=input_dataframe)
+
+    # Check df dtypes and change where necessary
+    # noinspection PyTypeChecker
+    input_dataframe = _set_dtypes(input_dataframe, dtype_dict, target_columns)
+
+    # Validate required columns in input_dataframe
+    required_columns = [
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        equal_weighted_col,
+        domain_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        average_weekly_col,
+    ]
+    for col_name in target_columns:
+        required_columns.append(col_name)
+    _required_column_validation(
+        this_place, "input_dataframe", input_dataframe, required_columns
+    )
+
+    # Ensure only one average_weekly_param value present
+    check_list = _unique_parameter_values(
+        input_dataframe, average_weekly_col, seen_parameter_values
+    )
+    if not ignore_multi_aw_param_error:
+        if len(check_list) != 1:
+            # Initiate fast fail with AW error flag in error flag column
+            df_aw_param_error = input_dataframe
+            df_aw_param_error[da_error_flag_col] = ErrorCode.E00.code
+            return df_aw_param_error
+
+    # Ensure only one set_to_mid_point_col value present
+    check_list = _unique_parameter_values(
+        input_dataframe, set_to_mid_point_col, seen_parameter_values
+    )
+    if not ignore_multi_aw_param_error:
+        if len(check_list) != 1:
+            msg = (
+                f"the use mid-point method parameter from {set_to_mid_point_col} "
+                f"has more than one unique value set in the input dataframe."
+            )
+            raise ValueError(msg)
+
+    # Ensure only one equal_weighted_col value present
+    check_list = _unique_parameter_values(
+        input_dataframe, equal_weighted_col, seen_parameter_values
+    )
+    if not ignore_multi_aw_param_error:
+        if len(check_list) != 1:
+            msg = (
+                f"the use equal weights parameter from {equal_weighted_col} "
+                f"has more than one unique value set in the input dataframe."
+            )
+            raise ValueError(msg)
+
+    # Check cols for reserved names (ones that method adds later) to prevent overwrite.
+    cols = list(input_dataframe.columns)
+    reserved = [
+        "midpoint",
+        "actual_period_start_date",
+        "actual_period_end_date",
+        "date_change_in_return_period_flag",
+        "number_of_days_in_contributors_returned_period"
+        "sum_of_trading_day_weights_over_actual_returned_period",
+        "sum_of_trading_day_weights_over_contributors_returned_period",
+    ]
+    for col in cols:
+        if col in reserved:
+            msg = (
+                f"Reserved column name of {col} found in input dataframe column names."
+            )
+            raise ValueError(msg)
+
+    # Initialise 'average_weekly_questions_list' to hold list of questions that will
+    # use average weekly functionality
+    average_weekly_param = input_dataframe.iloc[0][average_weekly_col]
+    average_weekly_questions_list = generate_average_weekly_questions(
+        average_weekly_param, target_columns
+    )
+    # indirectly validate contents of average_weekly parameter
+    if not isinstance(average_weekly_questions_list, list):
+        # Initiate fast fail with AW error flag in error flag column
+        df_aw_param_error = input_dataframe
+        df_aw_param_error[da_error_flag_col] = ErrorCode.E00.code
+        return df_aw_param_error
+
+    # Within the method the input domains share the category codes of the trading weights domains, and the options
+    # are categoricals. This is done on a shallow copy, and the output columns have the dtypes set above.
+    input_dataframe = input_dataframe.copy(deep=False)
+    input_dataframe[domain_col] = _shared_domain_categories(
+        input_dataframe[domain_col], trading_weights[trading_domain_col]
+    )
+    for col_name in [equal_weighted_col, set_to_mid_point_col, use_calendar_days_col]:
+        input_dataframe[col_name] = input_dataframe[col_name].astype("category")
+
+    sub_function_args = {
+        "dtype_dict": dtype_dict,
+        "target_columns": target_columns,
+        "average_weekly_questions_list": average_weekly_questions_list,
+        "contributor_returned_start_date_col": contributor_returned_start_date_col,
+        "contributor_returned_end_date_col": contributor_returned_end_date_col,
+        "expected_start_date_col": expected_start_date_col,
+        "expected_end_date_col": expected_end_date_col,
+        "domain_col": domain_col,
+        "short_period_parameter_col": short_period_parameter_col,
+        "long_period_parameter_col": long_period_parameter_col,
+        "equal_weighted_col": equal_weighted_col,
+        "set_to_mid_point_col": set_to_mid_point_col,
+        "use_calendar_days_col": use_calendar_days_col,
+        "da_error_flag_col": da_error_flag_col,
+        "trading_date_col": trading_date_col,
+        "trading_weights_col": trading_weights_col,
+        "trading_domain_col": trading_domain_col,
+        "trading_period_start_col": trading_period_start_col,
+        "trading_period_end_col": trading_period_end_col,
+        "engine": engine,
+        "period_cache": period_cache,
+        "output_columns": output_columns,
+    }
+    if n_jobs != 1:
+        return _run_sub_functions_by_domain(
+            n_jobs, input_dataframe, trading_weights, sub_function_args, instrumentation
+        )
+    return _run_sub_functions(
+        input_dataframe,
+        trading_weights,
+        weights_index,
+        **sub_function_args,
+        instrumentation=instrumentation,
+    )
+
+
+def _run_sub_functions(
+    input_dataframe: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    weights_index: "_TradingWeightsIndex",
+    dtype_dict: dict,
+    target_columns: List,
+    average_weekly_questions_list: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    da_error_flag_col: str,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+    engine: str,
+    instrumentation: Callable[["StageRecord"], None] = None,
+    period_cache: "PeriodCache" = None,
+    output_columns: List = None,
+) -> pd.DataFrame:
+    """
+    Steps input data that has passed the checks in _adjust_dataframe through the sub-functions.
+
+    :param input_dataframe: The validated input data.
+    :param trading_weights: The trading day weight reference data, with dtypes set.
+    :param weights_index: Index of trading_weights, including trading periods.
+    :param dtype_dict: The dtypes of the columns, from _date_adjustment_dtypes.
+    :param average_weekly_questions_list: The names of the columns to be processed by the average weekly method.
+    :param instrumentation: Optional function called with a StageRecord of each sub-function run.
+    :param period_cache: Optional PeriodCache of the period level results of earlier runs, for the vectorized engine.
+    :param output_columns: The columns added by the method to include in the output, None for all of them.
+
+    The remaining parameters are as described for date_adjustment.
+
+    :return: The input data with the method output appended as extra columns as necessary.
+    """
+    stage_recorder = _StageRecorder(instrumentation, da_error_flag_col)
+    if engine == "vectorized":
+        return _date_adjustment_vectorized(
+            input_dataframe,
+            weights_index,
+            target_columns,
+            average_weekly_questions_list,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            da_error_flag_col,
+            dtype_dict,
+            stage_recorder,
+            period_cache,
+            output_columns,
+        )
+
+    # The row engine adds its intermediate results to the rows as it goes, so those not requested are dropped
+    # from its output.
+    output_dataframe = _run_row_sub_functions(
+        input_dataframe,
+        trading_weights,
+        weights_index,
+        dtype_dict,
+        target_columns,
+        average_weekly_questions_list,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        da_error_flag_col,
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+        stage_recorder,
+    )
+    return _drop_unrequested_columns(
+        output_dataframe, input_dataframe.columns, target_columns, output_columns
+    )
+
+
+def _run_row_sub_functions(
+    input_dataframe: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    weights_index: "_TradingWeightsIndex",
+    dtype_dict: dict,
+    target_columns: List,
+    average_weekly_questions_list: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    da_error_flag_col: str,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+    stage_recorder: "_StageRecorder",
+) -> pd.DataFrame:
+    """
+    Steps validated input data through the row by row sub-functions, for _run_sub_functions.
+
+    :param stage_recorder: Records each stage run.
+
+    The remaining parameters are as described for _run_sub_functions.
+
+    :return: The input data with the method output appended as extra columns as necessary.
+    """
+    # Check the target columns for missing values, as missing_value_subfunction does. The columns have already
+    # been validated, and only whole columns are replaced, so a shallow copy of the input will do.
+    stage_recorder.start(input_dataframe)
+    df_stage_one = input_dataframe.copy(deep=False)
+    missing_values = _missing_value_flags(
+        df_stage_one, target_columns, da_error_flag_col
+    )
+    stage_recorder.stop("missing_value", df_stage_one, missing_values=missing_values)
+
+    # Check df_stage_one dtypes and change where necessary
+    # noinspection PyTypeChecker
+    df_stage_one = _set_dtypes(df_stage_one, dtype_dict, target_columns)
+
+    # Rows are set aside as they are error flagged, so each stage only processes the rows still active.
+    active_rows = _ActiveRows(len(df_stage_one), da_error_flag_col)
+    df_stage_one = active_rows.set_aside_flagged(df_stage_one)
+
+    # If all rows error flagged, output dataframe as is.
+    if active_rows.finished(df_stage_one):
+        return active_rows.reassemble(df_stage_one)
+
+    stage_recorder.start(df_stage_one)
+    df_stage_two = primary_wrangler_subfunction(
+        df_stage_one,
+        trading_weights,
+        target_columns,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        equal_weighted_col,
+        da_error_flag_col,
+        trading_domain_col,
+        trading_date_col,
+        trading_weights_col,
+        weights_index=weights_index,
+    )
+    stage_recorder.stop("primary_wrangler", df_stage_two)
+
+    df_stage_two = active_rows.set_aside_flagged(df_stage_two)
+
+    # If all rows error flagged, output dataframe as is.
+    if active_rows.finished(df_stage_two):
+        return active_rows.reassemble(df_stage_two)
+
+    # Send dataframe through midpoint method
+    stage_recorder.start(df_stage_two)
+    df_stage_three = midpoint_subfunction(
+        df_stage_two,
+        trading_weights,
+        target_columns,
+        domain_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        set_to_mid_point_col,
+        equal_weighted_col,
+        use_calendar_days_col,
+        trading_date_col,
+        trading_period_start_col,
+        trading_period_end_col,
+        trading_weights_col,
+        trading_domain_col,
+        da_error_flag_col,
+        weights_index=weights_index,
+    )
+    stage_recorder.stop("midpoint", df_stage_three)
+
+    df_stage_three = active_rows.set_aside_flagged(df_stage_three)
+
+    # If all rows error flagged, output dataframe as is.
+    if active_rows.finished(df_stage_three):
+        return active_rows.reassemble(df_stage_three)
+
+    # Send dataframe through secondary wrangler
+    stage_recorder.start(df_stage_three)
+    df_stage_four = secondary_wrangler_subfunction(
+        df_stage_three,
+        trading_weights,
+        target_columns,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        da_error_flag_col,
+        trading_date_col,
+        trading_domain_col,
+        trading_weights_col,
+        weights_index=weights_index,
+    )
+    stage_recorder.stop("secondary_wrangler", df_stage_four)
+
+    df_stage_four = active_rows.set_aside_flagged(df_stage_four)
+
+    # If all rows error flagged, output dataframe as is.
+    if active_rows.finished(df_stage_four):
+        return active_rows.reassemble(df_stage_four)
+
+    # Send dataframe through date adjustment method.
+    stage_recorder.start(df_stage_four)
+    df_stage_five = date_adjustment_subfunction(
+        df_stage_four, target_columns, da_error_flag_col
+    )
+    stage_recorder.stop("date_adjustment", df_stage_five)
+
+    df_stage_five = active_rows.set_aside_flagged(df_stage_five)
+
+    # If all rows error flagged, output dataframe as is.
+    if active_rows.finished(df_stage_five):
+        return active_rows.reassemble(df_stage_five)
+
+    # Send dataframe through average weekly method.
+    stage_recorder.start(df_stage_five)
+    df_stage_six = average_weekly_subfunction(
+        df_stage_five, average_weekly_questions_list, da_error_flag_col
+    )
+    stage_recorder.stop("average_weekly", df_stage_six)
+
+    return active_rows.reassemble(df_stage_six)
+
+
+class _ActiveRows:
+    """
+    Index of the rows still being processed by the row by row sub-functions. Rows are set aside as they are error
+    flagged, so that each sub-function only processes the rows that survived the ones before it, and the output is
+    reassembled once at the end.
+    """
+
+    def __init__(self, length: int, da_error_flag_col: str):
+        """
+        :param length: The number of rows in the data being processed.
+        :param da_error_flag_col: Name of the error flag column.
+        """
+        self.da_error_flag_col = da_error_flag_col
+        self.positions = np.arange(length)
+        self.set_aside = []
+        self.set_aside_positions = []
+        self.columns = None
+
+    def set_aside_flagged(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param dataframe: The active rows, as output by the last sub-function.
+        :return: The rows of dataframe without an error code, the others being set aside.
+        """
+        dataframe = self._order_columns(dataframe)
+        flagged = dataframe[self.da_error_flag_col].isin(_ERROR_CODES).to_numpy()
+        if flagged.any():
+            self.set_aside.append(dataframe.take(np.flatnonzero(flagged)))
+            self.set_aside_positions.append(self.positions[flagged])
+            self.positions = self.positions[~flagged]
+            dataframe = dataframe.take(np.flatnonzero(~flagged))
+        return dataframe
+
+    def _order_columns(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param dataframe: The active rows, as output by the last sub-function.
+        :return: dataframe with its columns in the order DataFrame.apply would have given, had the rows set aside
+                been passed to the sub-function. Those rows would have lacked the columns it added, which sorts all
+                the columns by name.
+        """
+        if (
+            self.set_aside
+            and self.columns is not None
+            and not dataframe.columns.isin(self.columns).all()
+        ):
+            dataframe = dataframe[sorted(dataframe.columns)]
+        self.columns = dataframe.columns
+        return dataframe
+
+    def finished(self, dataframe: pd.DataFrame) -> bool:
+        """
+        :param dataframe: The active rows.
+        :return: True if there are no rows left to process.
+        """
+        return dataframe[self.da_error_flag_col].notnull().values.all()
+
+    def reassemble(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param dataframe: The active rows, as output by the last sub-function run.
+        :return: The active rows and the rows set aside, in their original order, with the columns of dataframe.
+                Rows set aside before a column was created hold nulls in it.
+        """
+        if not self.set_aside:
+            return dataframe
+        dataframe = self._order_columns(dataframe)
+        frames = [frame for frame in self.set_aside + [dataframe] if len(frame)]
+        # A column all null in some of the frames is left out of them, to be filled in by concat, so that only the
+        # frames holding values decide its dtype.
+        holds_values = [frame.notna().any() for frame in frames]
+        held = pd.concat(holds_values, axis=1).any(axis=1)
+        frames = [
+            frame.loc[:, values | ~held[frame.columns]]
+            for frame, values in zip(frames, holds_values)
+        ]
+        output_dataframe = pd.concat(frames)
+        if not output_dataframe.columns.equals(dataframe.columns):
+            output_dataframe = output_dataframe.reindex(columns=dataframe.columns)
+        positions = np.concatenate(self.set_aside_positions + [self.positions])
+        return output_dataframe.take(np.argsort(positions, kind="stable"))
+
+
+def _added_columns(target_columns: List) -> List:
+    """
+    :param target_columns: The names of the columns to be date_adjusted.
+    :return: The names of the columns date_adjustment can add to its output, other than the error flag column.
+    """
+    return (
+        _INTERMEDIATE_COLUMNS
+        + ["date_adjusted_" + col for col in target_columns]
+        + ["average_weekly_" + col for col in target_columns]
+    )
+
+
+def _drop_unrequested_columns(
+    output_dataframe: pd.DataFrame,
+    input_columns: pd.Index,
+    target_columns: List,
+    output_columns: List,
+) -> pd.DataFrame:
+    """
+    :param output_dataframe: The output of the sub-functions.
+    :param input_columns: The columns of the input data, which are always kept.
+    :param target_columns: The names of the columns to be date_adjusted.
+    :param output_columns: The columns added by the method to keep, None to keep all of them.
+    :return: output_dataframe without the columns added by the method that are not in output_columns.
+    """
+    if output_columns is None:
+        return output_dataframe
+    unrequested = [
+        col
+        for col in _added_columns(target_columns)
+        if col in output_dataframe.columns
+        and col not in input_columns
+        and col not in output_columns
+    ]
+    return output_dataframe.drop(columns=unrequested)
+
+
+def _run_sub_functions_by_domain(
+    n_jobs: int,
+    input_dataframe: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    sub_function_args: dict,
+    instrumentation: Callable[["StageRecord"], None] = None,
+) -> pd.DataFrame:
+    """
+    Runs _run_sub_functions over partitions of the input data in a pool of worker processes. Each partition holds
+    whole domains and is sent with only the trading weights of those domains. Domains are shared out largest first,
+    each to the partition with the fewest rows so far.
+
+    :param n_jobs: The number of worker processes.
+    :param input_dataframe: The validated input data.
+    :param trading_weights: The trading day weight reference data, with dtypes set.
+    :param sub_function_args: The remaining arguments of _run_sub_functions, by name.
+    :param instrumentation: Optional function called with the StageRecords of each partition, once all the
+            partitions are done.
+
+    :return: The outputs of the partitions, in the row order of input_dataframe.
+    """
+    # The input domains share the category codes of the trading weights domains, so both are grouped by code.
+    input_domains = input_dataframe[sub_function_args["domain_col"]].cat.codes
+    weight_domains = trading_weights[sub_function_args["trading_domain_col"]].cat.codes
+    domain_rows = input_dataframe.groupby(input_domains.to_numpy(), sort=False).indices
+    domain_weights = trading_weights.groupby(
+        weight_domains.to_numpy(), sort=False
+    ).indices
+
+    partitions = [[] for _ in range(min(n_jobs, len(domain_rows)))]
+    partition_sizes = np.zeros(len(partitions), dtype="int64")
+    for domain, rows in sorted(domain_rows.items(), key=lambda item: -len(item[1])):
+        smallest = int(np.argmin(partition_sizes))
+        partitions[smallest].append(domain)
+        partition_sizes[smallest] += len(rows)
+
+    no_rows = np.array([], dtype="int64")
+    partition_rows = [
+        np.sort(np.concatenate([domain_rows[domain] for domain in domains]))
+        for domains in partitions
+    ]
+    partition_weights = [
+        np.sort(
+            np.concatenate([domain_weights.get(domain, no_rows) for domain in domains])
+        )
+        for domains in partitions
+    ]
+
+    with ProcessPoolExecutor(max_workers=len(partitions)) as executor:
+        outputs = []
+        for output, stage_records in executor.map(
+            _run_partition,
+            [input_dataframe.iloc[rows] for rows in partition_rows],
+            [trading_weights.iloc[rows] for rows in partition_weights],
+            [sub_function_args] * len(partitions),
+            [instrumentation is not None] * len(partitions),
+        ):
+            outputs.append(output)
+            for stage_record in stage_records:
+                instrumentation(stage_record)
+
+    # As in one process, the columns added once any row has an error code are sorted by name along with the columns
+    # before them, so only the columns at the end of every output in the same order are kept in their order.
+    columns = list(outputs[0].columns)
+    common_suffix = 0
+    while common_suffix < len(columns) and all(
+        len(output.columns) > common_suffix
+        and output.columns[-1 - common_suffix] == columns[-1 - common_suffix]
+        for output in outputs
+    ):
+        common_suffix += 1
+    appended_columns = columns[len(columns) - common_suffix :]
+    columns = (
+        sorted(
+            set(col_name for output in outputs for col_name in output.columns)
+            - set(appended_columns)
+        )
+        + appended_columns
+    )
+    output_dataframe = pd.concat(outputs)[columns]
+    original_order = np.argsort(np.concatenate(partition_rows), kind="stable")
+    return output_dataframe.iloc[original_order]
+
+
+def _run_partition(
+    input_dataframe: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    sub_function_args: dict,
+    record_stages: bool = False,
+) -> tuple:
+    """
+    Indexes the trading weights of one partition and runs _run_sub_functions on it, in a worker process.
+
+    :param input_dataframe: The rows of the partition.
+    :param trading_weights: The trading weights of the domains of the partition.
+    :param sub_function_args: The remaining arguments of _run_sub_functions, by name.
+    :param record_stages: If True, a StageRecord of each sub-function run is returned.
+
+    :return: The output of _run_sub_functions, and the list of StageRecords.
+    """
+    weights_index = _TradingWeightsIndex(
+        trading_weights,
+        sub_function_args["trading_domain_col"],
+        sub_function_args["trading_date_col"],
+        sub_function_args["trading_weights_col"],
+        sub_function_args["trading_period_start_col"],
+        sub_function_args["trading_period_end_col"],
+    )
+    stats = DateAdjustmentStats() if record_stages else None
+    output = _run_sub_functions(
+        input_dataframe,
+        trading_weights,
+        weights_index,
+        **sub_function_args,
+        instrumentation=stats,
+    )
+    return output, stats.records if record_stages else []
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: GENERATE AVERAGE WEEKLY QUESTION LIST SUB-FUNCTION
+# -------------------------------------------------------------------------------------------------------------
+
+
+def generate_average_weekly_questions(
+    average_weekly: str, target_columns: List
 ) -> Union[List, str]:
     """
-    Generates the reference list that controls the average_weekly method.
+    Generates the reference list that controls the average_weekly method.
+
+    :param String average_weekly: The average weekly parameter for the run. (Not the column name, the actual value.)
+    :param List[Strings] target_columns: The names of the columns in input_dataframe to be date_adjusted.
+
+    :raises TypeError: If the data held in column referenced by the target_columns_col parameter is not a list.
+
+    :returns: A list of validated columns to run the average_weekly method against.
+
+
+    """
+    # Validate target_columns is a list
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+    if not isinstance(target_columns, list):
+        msg = 'Param "target_columns" for function ' + this_place + " "
+        msg += "should be of type List, not " + str(type(target_columns)) + "."
+        raise TypeError(msg)
+
+    if average_weekly == "N":
+        average_weekly_questions_list = []
+    elif average_weekly == "A":
+        average_weekly_questions_list = target_columns.copy()
+    else:
+        average_weekly_questions_list = []
+        submitted_questions = _convert_question_string_to_list(average_weekly)
+        for column in target_columns:
+            if column in submitted_questions:
+                average_weekly_questions_list.append(column)
+                submitted_questions = [x for x in submitted_questions if x != column]
+        if submitted_questions:
+            return "ERROR: invalid average_weekly parameter contents."
+
+    return average_weekly_questions_list
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: MISSING VALUE SUB-FUNCTION
+# -------------------------------------------------------------------------------------------------------------=
+
+
+def missing_value_subfunction(
+    input_dataframe: pd.DataFrame, target_columns: List, da_error_flag_col: str
+) -> pd.DataFrame:
+    """
+    Checks the target columns for missing data.
+
+    :param input_dataframe: The dataframe containing the data to be processed plus processing options.
+    :param target_columns: The names of the columns in input_dataframe to be date_adjusted.
+    :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+
+    :raises TypeError: If the input dataframe is not a DataFrame.
+    :raises TypeError: If the target columns parameter is not a List.
+    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe.
+    :raises KeyError: If columns referenced in target_columns parameter cannot be found in the input dataframe.
+
+    :returns: Data with rows that have missing data in the target columns marked with an error flag.
+
+    """
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+
+    # noinspection PyProtectedMember
+    _basic_input_validation(
+        this_place, input_dataframe=input_dataframe, target_columns=target_columns
+    )
+
+    # Validate required columns in input_dataframe
+    _required_column_validation(
+        this_place, "input_dataframe", input_dataframe, target_columns
+    )
+
+    # Create working copy of input dataframe
+    working_dataframe = input_dataframe.copy()
+    _missing_value_flags(working_dataframe, target_columns, da_error_flag_col)
+    return working_dataframe
+
+
+def _missing_value_flags(
+    working_dataframe: pd.DataFrame, target_columns: List, da_error_flag_col: str
+) -> dict:
+    """
+    Column-wise check of the target columns for missing data, for missing_value_subfunction. Missing values, and
+    those given as ".", are set to NaN and their rows given E01.
+
+    :param working_dataframe: The data to be checked, updated in place by replacing whole columns only, so it may
+            be a shallow copy of data that must not change.
+    :param target_columns: The names of the columns in working_dataframe to be date_adjusted.
+    :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    :return: The number of rows missing a value in each target column, by column. A row missing values in more
+            than one column is counted in each.
+    """
+    missing_values = {}
+    any_missing = np.zeros(len(working_dataframe), dtype=bool)
+    for target_column in target_columns:
+        values = working_dataframe[target_column]
+        missing = values.isna().to_numpy(dtype=bool)
+        if not pd.api.types.is_numeric_dtype(values):
+            missing |= (values.astype(object) == ".").to_numpy(dtype=bool)
+        missing_values[target_column] = int(missing.sum())
+        if missing.any():
+            # Missing values are set to the NaN of the row by row check, rather than the null of an extension dtype.
+            if not isinstance(values.dtype, np.dtype):
+                values = values.astype(object)
+            values = values.mask(missing)
+            working_dataframe[target_column] = (
+                values.infer_objects() if values.dtype == object else values
+            )
+            any_missing |= missing
+
+    # The row by row check passed every row through DataFrame.apply, which holds the rows of a frame of numbers,
+    # counting the error flag column of NaN it added, as their common number dtype, and otherwise as objects, from
+    # which the dtypes of the columns are inferred again.
+    dtypes = [np.dtype("float64")] + [
+        dtype
+        for col_name, dtype in working_dataframe.dtypes.items()
+        if col_name != da_error_flag_col
+    ]
+    if all(isinstance(dtype, np.dtype) and dtype.kind in "iuf" for dtype in dtypes):
+        common_dtype = np.result_type(*dtypes)
+        for col_name in working_dataframe.columns.drop(
+            da_error_flag_col, errors="ignore"
+        ):
+            if working_dataframe[col_name].dtype != common_dtype:
+                working_dataframe[col_name] = working_dataframe[col_name].astype(
+                    common_dtype
+                )
+    else:
+        working_dataframe[da_error_flag_col] = np.nan
+        _inferred_dtypes(working_dataframe)
+
+    # The error flag column holds NaN until a row is flagged, as the row by row check left it.
+    if any_missing.any():
+        error_flags = np.full(len(working_dataframe), np.nan, dtype=object)
+        error_flags[any_missing] = ErrorCode.E01.code
+        working_dataframe[da_error_flag_col] = error_flags
+    else:
+        working_dataframe[da_error_flag_col] = np.nan
+    return missing_values
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: PRIMARY WRANGLER SUB-FUNCTION
+# -------------------------------------------------------------------------------------------------------------
+
+
+def primary_wrangler_subfunction(
+    df_stage_one: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    target_columns: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    equal_weighted_col: str,
+    da_error_flag_col: str,
+    trading_domain_col: str,
+    trading_date_col: str,
+    trading_weights_col: str,
+    engine: str = "row",
+    weights_index: "_TradingWeightsIndex" = None,
+) -> pd.DataFrame:
+    """
+    Prepares the data for further processing by the midpoint method if required.
+
+    :param df_stage_one: The dataframe containing the data as processed to this point.
+    :param trading_weights: The trading day weight reference data required for processing, as a DataFrame or a
+            TradingWeights object built with the same trading column names.
+    :param target_columns: The names of the columns in the input dataframe to be date_adjusted.
+    :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param expected_start_date_col: Name of the column holding the expected period start date in input_dataframe.
+    :param expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
+    :param domain_col: Name of the column holding the Domain in input_dataframe.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
+    :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    :param trading_date_col: Name of the column holding the dates in trading_weights.
+    :param trading_weights_col: Name of the column holding the weights in trading_weights.
+    :param trading_domain_col: Name of the column holding the domain in trading_weights.
+    :param engine: "row" (default) to process the data row by row, or "vectorized" to process all rows column-wise.
+    :param weights_index: Index of trading_weights built by the calling function, built here if needed and not
+            supplied.
+
+    :raises TypeError: If the input dataframe is not a DataFrame.
+    :raises TypeError: If the trading weights reference data is not a DataFrame or TradingWeights.
+    :raises TypeError: If the target columns parameter is not a List.
+    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe or the
+            trading weights dataframe as appropriate.
+    :raises KeyError: If columns referenced in target_columns parameter cannot be found in the input dataframe.
+    :raises ValueError: If the engine parameter is not recognised.
+
+    :return: A dataframe holding data and structure ready to be passed into the midpoint method sub-function.
+
+    """
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+
+    # Basic validation checks
+    # noinspection PyProtectedMember
+    _basic_input_validation(
+        this_place,
+        input_dataframe=df_stage_one,
+        trading_weights=trading_weights,
+        target_columns=target_columns,
+    )
+    trading_weights, weights_index = _unpack_trading_weights(
+        this_place,
+        trading_weights,
+        weights_index,
+        trading_date_col=trading_date_col,
+        trading_weights_col=trading_weights_col,
+        trading_domain_col=trading_domain_col,
+    )
+
+    # Validate required columns are in input dataframe
+    required_columns = [
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        da_error_flag_col,
+        equal_weighted_col,
+        expected_start_date_col,
+        expected_end_date_col,
+    ]
+    for col_name in target_columns:
+        required_columns.append(col_name)
+    _required_column_validation(
+        this_place, "df_stage_one", df_stage_one, required_columns
+    )
+
+    # Validate required columns are in trading_weights dataframe
+    required_columns = [trading_weights_col, trading_date_col, trading_domain_col]
+    _required_column_validation(
+        this_place, "trading_weights", trading_weights, required_columns
+    )
+
+    _engine_validation(this_place, engine)
+
+    working_dataframe = df_stage_one.copy()
+
+    if engine == "vectorized":
+        return _primary_wrangler_vectorized(
+            working_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            equal_weighted_col,
+            da_error_flag_col,
+            trading_domain_col,
+            trading_date_col,
+            trading_weights_col,
+            weights_index,
+        )
+
+    # Rule 3.1 & 3.2
+
+    def fix_dates(row):
+        #  Ensure we have the EPS and EPE dates and they are valid.
+        if pd.isnull(row[expected_start_date_col]):
+            row = _apply_error_flag(row, "E14", da_error_flag_col, target_columns)
+            return row
+        if pd.isnull(row[expected_end_date_col]):
+            row = _apply_error_flag(row, "E15", da_error_flag_col, target_columns)
+            return row
+
+        # Fix NaT start date
+        if pd.isna(row[contributor_returned_start_date_col]):
+            row[contributor_returned_start_date_col] = _DATE_PARSE_CACHE.parse_one(
+                row[expected_start_date_col]
+            )
+
+        # Fix NaT end date
+        if pd.isna(row[contributor_returned_end_date_col]):
+            row[contributor_returned_end_date_col] = _DATE_PARSE_CACHE.parse_one(
+                row[expected_end_date_col]
+            )
+
+        return row
+
+    working_dataframe = _run_apply(working_dataframe, fix_dates, da_error_flag_col)
+
+    # Rule 3.3, 3.4, 3.5, 3.6, 3.7
+
+    def preliminary_stages(row):
+        # Set defaults
+        row["sum_of_trading_day_weights_over_contributors_returned_period"] = 0
+        row["number_of_days_in_contributors_returned_period"] = 0
+
+        # Calculate actual or flags.
+        if (
+            row[contributor_returned_end_date_col]
+            < row[contributor_returned_start_date_col]
+        ):
+            row = _apply_error_flag(row, "E02", da_error_flag_col, target_columns)
+            return row
+        else:
+            row["number_of_days_in_contributors_returned_period"] = (
+                row[contributor_returned_end_date_col]
+                - row[contributor_returned_start_date_col]
+            ).days + 1
+
+            if row[equal_weighted_col] == "Y":
+                row["sum_of_trading_day_weights_over_contributors_returned_period"] = (
+                    row["number_of_days_in_contributors_returned_period"]
+                )
+
+            else:
+                flagged = 0
+                error_code_number = 0
+                mask = (
+                    (
+                        trading_weights[trading_date_col]
+                        >= row[contributor_returned_start_date_col]
+                    )
+                    & (
+                        trading_weights[trading_date_col]
+                        <= row[contributor_returned_end_date_col]
+                    )
+                    & (trading_weights[trading_domain_col] == row[domain_col])
+                )
+
+                filtered_weights = trading_weights.loc[mask]
+
+                if (
+                    len(filtered_weights.index)
+                    != row["number_of_days_in_contributors_returned_period"]
+                ):
+                    flagged = 1
+                    error_code_number = 3
+                else:
+                    for _idx, record in filtered_weights.iterrows():
+                        if isinstance(record[trading_weights_col], str):
+                            if not record[trading_weights_col].strip():
+                                flagged = 1
+                                error_code_number = 4
+                            else:
+                                if float(record[trading_weights_col]) < 0:
+                                    flagged = 1
+                                    error_code_number = 5
+                        else:
+                            if pd.isnull(record[trading_weights_col]):
+                                flagged = 1
+                                error_code_number = 4
+                            if record[trading_weights_col] < 0:
+                                flagged = 1
+                                error_code_number = 5
+                if flagged:
+                    row = _apply_error_flag(
+                        row,
+                        "E0" + str(error_code_number),
+                        da_error_flag_col,
+                        target_columns,
+                    )
+                else:
+                    row[
+                        "sum_of_trading_day_weights_over_contributors_returned_period"
+                    ] = filtered_weights[trading_weights_col].sum()
+            return row
+
+    df_stage_two = _run_apply(working_dataframe, preliminary_stages, da_error_flag_col)
+
+    return df_stage_two
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: MIDPOINT SUB-FUNCTION
+# -------------------------------------------------------------------------------------------------------------
+
+
+def midpoint_subfunction(
+    df_stage_two: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    target_columns: List,
+    domain_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    set_to_mid_point_col: str,
+    equal_weighted_col: str,
+    use_calendar_days_col: str,
+    trading_date_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    da_error_flag_col: str,
+    engine: str = "row",
+    weights_index: "_TradingWeightsIndex" = None,
+) -> pd.DataFrame:
+    """
+    Applies the midpoint method to the input data.
+
+    :param  df_stage_two: The dataframe containing the data as processed to this point.
+    :param  trading_weights: The trading day weight reference data required for processing, as a DataFrame or a
+            TradingWeights object built with the same trading column names.
+    :param  target_columns: The names of the columns in the input dataframe to be date_adjusted.
+    :param  domain_col: Name of the column holding the Domain in input_dataframe.
+    :param  set_to_mid_point_col: Name of the column holding the set to midpoint parameter.
+    :param  use_calendar_days_col: Name of the column holding the "use calendar days" option in input_dataframe.
+    :param  equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
+    :param  contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param  contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param  expected_start_date_col: Name of the column holding the expected period start date in input_dataframe.
+    :param  expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
+    :param  da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    :param  trading_date_col: Name of the column holding the dates in trading_weights.
+    :param  trading_weights_col: Name of the column holding the weights in the trading_weights DataFrame.
+    :param  trading_domain_col: Name of the column holding the domain in the trading_weights DataFrame.
+    :param  trading_period_start_col: Name of the column holding the trading period start date in the trading_weights
+            DataFrame.
+    :param  trading_period_end_col: Name of the column holding the trading period end date in the trading_weights
+            DataFrame.
+    :param  engine: "row" (default) to process the data row by row, or "vectorized" to process all rows
+            column-wise.
+    :param  weights_index: Index of trading_weights built by the calling function, built here if not supplied.
+
+    :raises TypeError: If the input dataframe is not a DataFrame.
+    :raises TypeError: If the target columns parameter is not a List.
+    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe.
+    :raises KeyError: If columns referenced in target_columns parameter cannot be found in the input dataframe.
+    :raises ValueError: If the engine parameter is not recognised.
+
+    :return: A dataframe holding data with the midpoint method applied.
+
+    """
+
+    # Basic validation checks
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+    _basic_input_validation(
+        this_place, input_dataframe=df_stage_two, target_columns=target_columns
+    )
+    trading_weights, weights_index = _unpack_trading_weights(
+        this_place,
+        trading_weights,
+        weights_index,
+        trading_date_col=trading_date_col,
+        trading_weights_col=trading_weights_col,
+        trading_domain_col=trading_domain_col,
+        trading_period_start_col=trading_period_start_col,
+        trading_period_end_col=trading_period_end_col,
+    )
+
+    # Validate required columns are in df_stage_two dataframe
+    required_columns = [
+        domain_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        set_to_mid_point_col,
+        equal_weighted_col,
+        use_calendar_days_col,
+        da_error_flag_col,
+    ]
+    _required_column_validation(
+        this_place, "df_stage_two", df_stage_two, required_columns
+    )
+
+    _engine_validation(this_place, engine)
+
+    working_dataframe = df_stage_two.copy()
+
+    if weights_index is None:
+        weights_index = _TradingWeightsIndex(
+            trading_weights,
+            trading_domain_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_period_start_col,
+            trading_period_end_col,
+        )
+
+    if engine == "vectorized":
+        return _midpoint_vectorized(
+            working_dataframe,
+            weights_index,
+            target_columns,
+            domain_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            set_to_mid_point_col,
+            equal_weighted_col,
+            use_calendar_days_col,
+            da_error_flag_col,
+        )
+
+    def mid_point_process(row):
+        # Rule 3.3, flow chart 11,9: If midpoint not Y or YT, set defaults of APx = EPx.
+        if row[set_to_mid_point_col] in ["Y", "YT"]:
+            if row[equal_weighted_col] == "Y":  # Flowchart 7a
+                row[set_to_mid_point_col] = "Y"
+            else:  # Flowchart 7b
+                # Set CRPS to earliest date >= CRPS with non-zero weight in same domain.
+                non_zero_after_crps = weights_index.next_positive_date(
+                    [row[domain_col]], [row[contributor_returned_start_date_col]]
+                )[0]
+
+                # set CRPS, error if there is no such date.
+                if not np.isnat(non_zero_after_crps):  # Flowchart 7c
+                    row[contributor_returned_start_date_col] = pd.Timestamp(
+                        non_zero_after_crps
+                    )
+                else:
+                    row = _apply_error_flag(
+                        row, "E12", da_error_flag_col, target_columns
+                    )
+                    return row
+
+                # CRPE = latest period <= CRPE with non-zero weight
+                non_zero_before_crpe = weights_index.previous_positive_date(
+                    [row[domain_col]], [row[contributor_returned_end_date_col]]
+                )[0]
+
+                # set CRPE, error if there is no such date.
+                # Not on flowchart, added in testing.
+                if not np.isnat(non_zero_before_crpe):
+                    row[contributor_returned_end_date_col] = pd.Timestamp(
+                        non_zero_before_crpe
+                    )
+                else:
+                    row = _apply_error_flag(
+                        row, "E12", da_error_flag_col, target_columns
+                    )
+                    return row
+
+            # Calculate midpoint  (Flowchart #8)
+            date_diff = (
+                row[contributor_returned_end_date_col]
+                - row[contributor_returned_start_date_col]
+            ).days + 1
+
+            additional_days = int(
+                (date_diff / 2) if date_diff % 2 == 0 else ((date_diff + 1) / 2)
+            )
+
+            # Subtracting 1 from additional days as methodology count the the start date
+            # as day one. (ie they add 20 to 10 and get 29! :)
+            midpoint_date = row[contributor_returned_start_date_col] + timedelta(
+                days=(additional_days - 1)
+            )
+
+            row["midpoint_date"] = midpoint_date
+            row["date_change_in_return_period_flag"] = ""
+
+            # Use midpoint date value
+            if not (
+                row[expected_start_date_col]
+                <= midpoint_date
+                <= row[expected_end_date_col]
+            ):
+                # Flowchart #10a
+                row["date_change_in_return_period_flag"] = "C"
+                if row[use_calendar_days_col] == "Y":
+                    # Flowchart #10b
+                    first_day = 1
+                    last_day = monthrange(midpoint_date.year, midpoint_date.month)[1]
+                    row["actual_period_start_date"] = pd.Timestamp(
+                        year=midpoint_date.year,
+                        month=midpoint_date.month,
+                        day=first_day,
+                    )
+                    row["actual_period_end_date"] = pd.Timestamp(
+                        year=midpoint_date.year, month=midpoint_date.month, day=last_day
+                    )
+                else:
+                    # Flowchart #10c
+                    period_starts, period_ends, multiplicity = (
+                        weights_index.trading_periods(
+                            np.array([row[domain_col]], dtype=object),
+                            np.array([midpoint_date], dtype="datetime64[ns]"),
+                        )
+                    )
+                    # Use midpoint date trading period dates.
+                    if multiplicity[0] == 1:  # Not on flowchart, added in testing.
+                        row["actual_period_start_date"] = period_starts[0]
+                        row["actual_period_end_date"] = period_ends[0]
+
+                    # Error if it doesnt exist (or theres a duplicate row). This is
+                    # normally picked up by E06 but in the case where a record had the
+                    # wrong trading period date, there will be one missing, and one
+                    # extra, which spoofs the tests for E06.
+                    else:
+                        row = _apply_error_flag(
+                            row, "E13", da_error_flag_col, target_columns
+                        )
+                        return row
+                return row  # From flowchart position 10b or 10c
+
+        # Flowchart #9
+        row["actual_period_start_date"] = row[expected_start_date_col]
+        row["actual_period_end_date"] = row[expected_end_date_col]
+        return row  # From flowchart position 9
+
+    df_stage_three = _run_apply(working_dataframe, mid_point_process, da_error_flag_col)
+
+    return df_stage_three
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: SECONDARY WRANGLER SUB-FUNCTION
+# -------------------------------------------------------------------------------------------------------------
+
+
+def secondary_wrangler_subfunction(
+    df_stage_three: pd.DataFrame,
+    trading_weights: pd.DataFrame,
+    target_columns: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    da_error_flag_col: str,
+    trading_date_col: str,
+    trading_domain_col: str,
+    trading_weights_col: str,
+    engine: str = "row",
+    weights_index: "_TradingWeightsIndex" = None,
+) -> pd.DataFrame:
+    """
+    Prepares the data for further processing by the date adjustment and average weekly methods as required.
+
+    :param df_stage_three: The dataframe containing the data as processed to this point.
+    :param trading_weights: The trading day weight reference data required for processing, as a DataFrame or a
+            TradingWeights object built with the same trading column names.
+    :param target_columns: The names of the columns in the input dataframe to be date_adjusted.
+    :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param expected_start_date_col: Name of the column holding the expected period start date in input_dataframe.
+    :param expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
+    :param domain_col: Name of the column holding the Domain in input_dataframe.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
+    :param short_period_parameter_col: Name of the column holding the "short period parameter" in input_dataframe.
+    :param long_period_parameter_col: Name of the column holding the "long period parameter" in input_dataframe.
+    :param set_to_mid_point_col: Name of the column holding the "Set to mid-point" option in input_dataframe.
+    :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    :param trading_date_col: Name of the column holding the dates in trading_weights.
+    :param trading_weights_col: Name of the column holding the weights in trading_weights.
+    :param trading_domain_col: Name of the column holding the domain in trading_weights.
+    :param engine: "row" (default) to process the data row by row, or "vectorized" to process all rows column-wise.
+    :param weights_index: Index of trading_weights built by the calling function, built here if not supplied.
+
+    :raises TypeError: If the input dataframe is not a DataFrame; If the trading weights reference data is not a
+            DataFrame; If the target columns parameter is not a List.
+    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe or the
+            trading weights dataframe as appropriate; If columns referenced in target_columns parameter cannot be
+            found in the input dataframe.
+    :raises ValueError: If the engine parameter is not recognised.
+
+    :return: A dataframe holding data and structure ready to be passed into the midpoint method sub-function.
+
+    """
+    # Basic validation
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+    _basic_input_validation(
+        this_place,
+        input_dataframe=df_stage_three,
+        trading_weights=trading_weights,
+        target_columns=target_columns,
+    )
+    trading_weights, weights_index = _unpack_trading_weights(
+        this_place,
+        trading_weights,
+        weights_index,
+        trading_date_col=trading_date_col,
+        trading_weights_col=trading_weights_col,
+        trading_domain_col=trading_domain_col,
+    )
+
+    # Validate required columns in input_dataframe
+    required_columns = [
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        set_to_mid_point_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        da_error_flag_col,
+        domain_col,
+    ]
+    _required_column_validation(
+        this_place, "df_stage_three", df_stage_three, required_columns
+    )
+
+    # Validate required columns are in trading_weights dataframe
+    required_columns = [trading_weights_col, trading_date_col, trading_domain_col]
+    _required_column_validation(
+        this_place, "trading_weights", trading_weights, required_columns
+    )
+
+    _engine_validation(this_place, engine)
+
+    working_df_1 = df_stage_three.copy()
+
+    if weights_index is None:
+        weights_index = _TradingWeightsIndex(
+            trading_weights, trading_domain_col, trading_date_col, trading_weights_col
+        )
+
+    if engine == "vectorized":
+        return _secondary_wrangler_vectorized(
+            working_df_1,
+            weights_index,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            da_error_flag_col,
+        )
+
+    # Rule 3.3, flow chart 12a: If midpoint not YT, set N to APE - APN,
+    #   else 12b: set N to trimmed APE - APN.
+    def mid_point_not_equal_yt(row):
+        if row[set_to_mid_point_col] != "YT":
+            row["number_of_days_in_actual_returned_period"] = (
+                row["actual_period_end_date"] - (row["actual_period_start_date"])
+            ).days + 1
+        else:
+            # Set APS to earliest date >= APS with non-zero weight in same domain.
+            # APS will be found as weights will always exist due to earlier checks.
+            aps = pd.Timestamp(
+                weights_index.next_positive_date(
+                    [row[domain_col]], [row["actual_period_start_date"]]
+                )[0]
+            )
+
+            # APE = latest period <= APE with non-zero weight
+            ape = pd.Timestamp(
+                weights_index.previous_positive_date(
+                    [row[domain_col]], [row["actual_period_end_date"]]
+                )[0]
+            )
+
+            # Set N using trimmed APS and APE.
+            row["number_of_days_in_actual_returned_period"] = (ape - aps).days + 1
+
+        return row
+
+    working_dataframe_2 = _run_apply(
+        working_df_1, mid_point_not_equal_yt, da_error_flag_col
+    )
+
+    # Rule 5.4,5.5, flow chart 19:
+    def short_and_long_parameter_validation(row):
+        # 5.4 If less than short period parameter, mark length flag as 'S'
+        if row["number_of_days_in_contributors_returned_period"] < int(
+            row[short_period_parameter_col]
+        ):
+            row["date_adjustment_length_flag"] = "S"
+        # 5.5 If greater than Long period parameter, mark length flag as 'L'
+        if row["number_of_days_in_contributors_returned_period"] > int(
+            row[long_period_parameter_col]
+        ):
+            row["date_adjustment_length_flag"] = "L"
+        # 5.4,5.5 If params wrong way round, output 'SL' to flag.
+        if int(row[short_period_parameter_col]) >= int(row[long_period_parameter_col]):
+            row["date_adjustment_length_flag"] = "SL"
+        return row
+
+    working_dataframe_3 = _run_apply(
+        working_dataframe_2, short_and_long_parameter_validation, da_error_flag_col
+    )
+
+    def create_weights_n(row):
+        if row[equal_weighted_col] == "Y":
+            row["sum_of_trading_day_weights_over_actual_returned_period"] = row[
+                "number_of_days_in_actual_returned_period"
+            ]
+        else:
+            flagged = 0
+            error_code_number = 0
+            mask = (
+                (trading_weights[trading_date_col] >= row["actual_period_start_date"])
+                & (trading_weights[trading_date_col] <= row["actual_period_end_date"])
+                & (trading_weights[trading_domain_col] == row[domain_col])
+            )
+            filtered_weights = trading_weights.loc[mask]
+
+            if (
+                len(filtered_weights.index)
+                != row["number_of_days_in_actual_returned_period"]
+            ):
+                flagged = 1
+                error_code_number = 6
+            else:
+                for _idx, record in filtered_weights.iterrows():
+                    if isinstance(record[trading_weights_col], str):
+                        if not record[trading_weights_col].strip():
+                            flagged = 1
+                            error_code_number = 7
+                        else:
+                            if float(record[trading_weights_col]) < 0:
+                                flagged = 1
+                                error_code_number = 8
+                    else:
+                        if pd.isnull(record[trading_weights_col]):
+                            flagged = 1
+                            error_code_number = 7
+                        if record[trading_weights_col] < 0:
+                            flagged = 1
+                            error_code_number = 8
+            if flagged:
+                row["sum_of_trading_day_weights_over_actual_returned_period"] = 0
+                row = _apply_error_flag(
+                    row,
+                    "E0" + str(error_code_number),
+                    da_error_flag_col,
+                    target_columns,
+                )
+
+            else:
+                row["sum_of_trading_day_weights_over_actual_returned_period"] = (
+                    filtered_weights[trading_weights_col].sum()
+                )
+        return row
+
+    working_dataframe_4 = _run_apply(
+        working_dataframe_3, create_weights_n, da_error_flag_col
+    )
+
+    def span_overlap_less_than_one_day(row):
+        latest_start = max(
+            row[expected_start_date_col], row[contributor_returned_start_date_col]
+        )
+        earliest_end = min(
+            row[expected_end_date_col], row[contributor_returned_end_date_col]
+        )
+        delta = (earliest_end - latest_start).days + 1
+        span = max(0, delta)
+
+        if row[set_to_mid_point_col] == "N":
+            if span < 1:
+                row = _apply_error_flag(row, "E09", da_error_flag_col, target_columns)
+        return row
+
+    df_stage_four = _run_apply(
+        working_dataframe_4, span_overlap_less_than_one_day, da_error_flag_col
+    )
+
+    return df_stage_four
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: DATE ADJUSTMENT SUB-FUNCTION
+# -------------------------------------------------------------------------------------------------------------
+
+
+def date_adjustment_subfunction(
+    df_stage_four: pd.DataFrame,
+    target_columns: List,
+    da_error_flag_col: str,
+    engine: str = "row",
+) -> pd.DataFrame:
+    """
+    Prepares the data for further processing by the date adjustment and average weekly methods as required.
+
+    :param df_stage_four: The dataframe containing the data as processed to this point.
+    :param target_columns: The names of the columns in the input dataframe to be date_adjusted.
+    :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    :param engine: "row" (default) to process the data row by row, or "vectorized" to adjust all rows and target
+            columns at once.
+
+    :raises TypeError: If the input dataframe is not a DataFrame; If the target columns parameter is not a List.
+    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe; If
+            columns referenced in target_columns parameter cannot be found in the input dataframe.
+    :raises ValueError: If the engine parameter is not recognised.
+
+    :return: A dataframe holding data with the date adjustment method applied.
+
+    """
+
+    # Basic validation
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+    _basic_input_validation(
+        this_place, input_dataframe=df_stage_four, target_columns=target_columns
+    )
+
+    # Validate required columns in input_dataframe
+    required_columns = [
+        "sum_of_trading_day_weights_over_contributors_returned_period",
+        "sum_of_trading_day_weights_over_actual_returned_period",
+    ]
+    _required_column_validation(
+        this_place, "df_stage_four", df_stage_four, required_columns
+    )
+
+    _engine_validation(this_place, engine)
+
+    if engine == "vectorized":
+        state = _ColumnarState(df_stage_four, da_error_flag_col, target_columns)
+        _date_adjustment_columns(state, target_columns)
+        return state.to_dataframe()
+
+    def da_method(row):
+        # SPP83 - AC 3
+        if row["sum_of_trading_day_weights_over_contributors_returned_period"] == 0:
+            row = _apply_error_flag(row, "E10", da_error_flag_col, target_columns)
+            return row
+
+        # SPP83 - AC 2
+        if row["sum_of_trading_day_weights_over_actual_returned_period"] == 0:
+            row = _apply_error_flag(row, "E11", da_error_flag_col, target_columns)
+            return row
+
+        # SPP83 - AC 3
+        for col in target_columns:
+            da_col_name = "date_adjusted_" + col
+            row[da_col_name] = row[col] * (
+                row["sum_of_trading_day_weights_over_actual_returned_period"]
+                / row["sum_of_trading_day_weights_over_contributors_returned_period"]
+            )
+        return row
+
+    df_stage_five = _run_apply(df_stage_four, da_method, da_error_flag_col)
+
+    return df_stage_five
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: AVERAGE WEEKLY SUB-FUNCTION
+# -------------------------------------------------------------------------------------------------------------
+
+
+def average_weekly_subfunction(
+    df_stage_five: pd.DataFrame,
+    average_weekly_questions_list: List,
+    da_error_flag_col: str,
+    engine: str = "row",
+) -> pd.DataFrame:
+    """
+    Applies the average weekly method to the input data.
+
+    :param  df_stage_five: The dataframe containing the data as processed to this point.
+    :param  average_weekly_questions_list: The names of the columns in the input dataframe to be processed by the
+            average weekly method.
+    :param  da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    :param  engine: "row" (default) to process the data row by row, or "vectorized" to process all rows and
+            questions at once.
+
+    :raises TypeError: If the input dataframe is not a DataFrame; If the average weekly questions list parameter is
+            not a List.
+    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe; If
+            columns referenced in average_weekly_questions_list parameter cannot be found in the input dataframe.
+    :raises ValueError: If the engine parameter is not recognised.
+
+    :return: A dataframe holding data with the average weekly method applied.
+
+    """
+
+    # Basic validation
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    this_place = sys._getframe().f_code.co_name
+    _basic_input_validation(
+        this_place,
+        input_dataframe=df_stage_five,
+        target_columns=average_weekly_questions_list,
+    )
+
+    # Validate required columns in input_dataframe
+    required_columns = average_weekly_questions_list.copy()
+    _required_column_validation(
+        this_place, "df_stage_five", df_stage_five, required_columns
+    )
+
+    _engine_validation(this_place, engine)
+
+    if engine == "vectorized":
+        state = _ColumnarState(
+            df_stage_five, da_error_flag_col, average_weekly_questions_list
+        )
+        _average_weekly_columns(state, average_weekly_questions_list)
+        return state.to_dataframe()
+
+    # Apply average weekly to average_weekly_questions_list, if any.
+
+    def set_average_weekly(row):
+        for base_col in average_weekly_questions_list:
+            source_col = "date_adjusted_" + base_col
+            new_col = "average_weekly_" + base_col
+            row[new_col] = (7 * row[source_col]) / row[
+                "number_of_days_in_actual_returned_period"
+            ]
+        return row
+
+    df_stage_six = _run_apply(df_stage_five, set_average_weekly, da_error_flag_col)
+
+    return df_stage_six
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: PARQUET INPUT AND OUTPUT
+# -------------------------------------------------------------------------------------------------------------
+
+# The flag columns added to the output by date_adjustment, other than the error flag column.
+_OUTPUT_FLAG_COLUMNS = [
+    "date_change_in_return_period_flag",
+    "date_adjustment_length_flag",
+]
+
+
+def read_date_adjustment_input_parquet(
+    path,
+    target_columns: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+    average_weekly_col: str,
+    other_columns: List = None,
+) -> pd.DataFrame:
+    """
+    Reads the input data for date_adjustment from a Parquet file, with the dtypes date_adjustment sets, so that
+    it has no conversions left to do. Only the columns named are read. Requires pyarrow.
+
+    :param path: The path of the Parquet file, or any other source accepted by pyarrow.parquet.read_table.
+    :param target_columns: The names of the columns to be date_adjusted, read as float64.
+    :param other_columns: The names of any other columns to read, such as reference columns, which are read as
+            stored.
+
+    The remaining parameters are as described for date_adjustment. Dates may be stored as dates, timestamps, or
+    YYYYMMDD strings or integers.
+
+    :raises ImportError: If pyarrow is not installed.
+
+    :return: The columns named that are in the file. Any of the required columns missing are reported by
+            date_adjustment.
+    """
+    dtype_dict = _input_dtypes(
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        average_weekly_col,
+    )
+    columns = [key for key in dtype_dict if key != "domain_col_list"]
+    return _read_parquet(
+        path,
+        columns + target_columns + (other_columns or []),
+        dtype_dict,
+        target_columns,
+    )
+
+
+def read_trading_weights_parquet(
+    path,
+    trading_date_col: str,
+    trading_weights_col: str,
+    trading_domain_col: str,
+    trading_period_start_col: str,
+    trading_period_end_col: str,
+) -> pd.DataFrame:
+    """
+    Reads trading day weight reference data from a Parquet file, with the dtypes date_adjustment sets. Only the
+    columns named are read. Requires pyarrow.
+
+    :param path: The path of the Parquet file, or any other source accepted by pyarrow.parquet.read_table.
+
+    The remaining parameters are as described for date_adjustment. Dates may be stored as dates, timestamps, or
+    YYYYMMDD strings or integers.
+
+    :raises ImportError: If pyarrow is not installed.
+
+    :return: The columns named that are in the file, ready to pass to date_adjustment or TradingWeights.
+    """
+    dtype_dict = _trading_weights_dtypes(
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    )
+    columns = [key for key in dtype_dict if key != "domain_col_list"]
+    return _read_parquet(path, columns, dtype_dict)
+
+
+def write_date_adjustment_parquet(
+    output_dataframe: pd.DataFrame,
+    path,
+    da_error_flag_col: str,
+    dictionary_columns: List = None,
+):
+    """
+    Writes the output of date_adjustment to a Parquet file, with the flag columns dictionary encoded, so that
+    they are stored once per distinct flag and read back as categoricals. Requires pyarrow.
+
+    :param output_dataframe: The output of date_adjustment.
+    :param path: The path of the Parquet file, or any other sink accepted by pyarrow.parquet.write_table.
+    :param da_error_flag_col: Name of the error flag column in output_dataframe.
+    :param dictionary_columns: The names of the columns to dictionary encode, by default the error flag column and
+            the other flag columns added by date_adjustment.
+
+    :raises ImportError: If pyarrow is not installed.
+    """
+    pa, pq = _import_pyarrow()
+    if dictionary_columns is None:
+        dictionary_columns = [da_error_flag_col] + _OUTPUT_FLAG_COLUMNS
+
+    table = pa.Table.from_pandas(output_dataframe, preserve_index=False)
+    for col in dictionary_columns:
+        position = table.schema.get_field_index(col)
+        if position == -1:
+            continue
+        values = table.column(position)
+        if pa.types.is_dictionary(values.type):
+            continue
+        # A flag column with no flags set holds only nulls, which are stored as strings.
+        if pa.types.is_null(values.type):
+            values = values.cast(pa.string())
+        table = table.set_column(position, col, values.dictionary_encode())
+    pq.write_table(table, path)
+
+
+def _import_pyarrow() -> tuple:
+    """
+    :raises ImportError: If pyarrow is not installed.
+
+    :return: The pyarrow and pyarrow.parquet modules.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ImportError(
+            "pyarrow is required to read and write Parquet files, install it with pip install sml_small[parquet]."
+        ) from err
+    return pyarrow, pyarrow.parquet
+
+
+def _read_parquet(
+    path, columns: List, dtype_dict: dict, target_columns=tuple()
+) -> pd.DataFrame:
+    """
+    :param path: The path of the Parquet file.
+    :param columns: The names of the columns to read, those not in the file are skipped.
+    :param dtype_dict: The dtypes to set on the columns, as for _set_dtypes.
+    :param target_columns: The names of the columns to be date_adjusted, read as float64.
+
+    :raises ImportError: If pyarrow is not installed.
+
+    :return: The columns read, with their dtypes set.
+    """
+    pa, pq = _import_pyarrow()
+    stored_columns = set(pq.read_schema(path).names)
+    table = pq.read_table(
+        path, columns=[col for col in dict.fromkeys(columns) if col in stored_columns]
+    )
+
+    # Dates stored as dates or timestamps and numeric targets are cast in Arrow, so that only values stored as
+    # strings (YYYYMMDD dates, or targets holding ".") are converted once in pandas.
+    for position, field in enumerate(table.schema):
+        if dtype_dict.get(field.name) == "datetime64[ns]" and (
+            pa.types.is_date(field.type) or pa.types.is_timestamp(field.type)
+        ):
+            cast_type = pa.timestamp("ns")
+        elif field.name in target_columns and (
+            pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        ):
+            cast_type = pa.float64()
+        else:
+            continue
+        table = table.set_column(
+            position, field.name, table.column(position).cast(cast_type)
+        )
+
+    return _DtypeSchema(dtype_dict, target_columns).coerce(table.to_pandas())
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: INSTRUMENTATION
+# -------------------------------------------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class StageRecord:
+    """
+    What happened in one sub-function run by date_adjustment.
+
+    stage: The sub-function, one of "missing_value", "primary_wrangler", "midpoint", "secondary_wrangler",
+            "date_adjustment" or "average_weekly", or "period_cache" for the look up of a PeriodCache.
+    seconds: The wall time it took.
+    rows_in: The number of rows without an error code passed to it.
+    rows_out: The number of those rows still without an error code afterwards.
+    error_codes: The number of rows given each error code by it, by code.
+    signatures: The number of distinct period signatures the rows in were processed as, for the period level
+            stages of the vectorized engine, or the number found in the cache for "period_cache", None otherwise.
+            Signatures found in the cache are not counted by the period level stages. See _PeriodSignatures.
+    missing_values: The number of rows missing a value in each target column, by column, for "missing_value",
+            None otherwise. A row missing values in more than one column is counted in each, so these can total more
+            than the rows given E01.
+    """
+
+    stage: str
+    seconds: float
+    rows_in: int
+    rows_out: int
+    error_codes: dict
+    signatures: int = None
+    missing_values: dict = None
+
+
+class DateAdjustmentStats:
+    """
+    Collects the StageRecords of date_adjustment runs, when passed as the instrumentation parameter.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record: StageRecord):
+        """
+        :param record: The record of a sub-function run.
+        """
+        self.records.append(record)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        :return: One row per stage, in the order they were first run, totalling the seconds, rows in and rows out
+                of all the records of the stage, with the number of rows given each error code in a column per
+                code. Where any stage was run on period signatures, the signatures are totalled too, along with the
+                dedup ratio of the rows in to the signatures they were processed as.
+        """
+        summary = {}
+        for record in self.records:
+            totals = summary.setdefault(
+                record.stage, {"seconds": 0.0, "rows_in": 0, "rows_out": 0}
+            )
+            totals["seconds"] += record.seconds
+            totals["rows_in"] += record.rows_in
+            totals["rows_out"] += record.rows_out
+            if record.signatures is not None:
+                totals["signatures"] = totals.get("signatures", 0) + record.signatures
+            for code, count in record.error_codes.items():
+                totals[code] = totals.get(code, 0) + count
+
+        summary_dataframe = pd.DataFrame.from_dict(summary, orient="index")
+        columns = ["seconds", "rows_in", "rows_out"]
+        if "signatures" in summary_dataframe:
+            summary_dataframe["signatures"] = summary_dataframe["signatures"].astype(
+                "Int64"
+            )
+            summary_dataframe["dedup_ratio"] = (
+                summary_dataframe["rows_in"] / summary_dataframe["signatures"]
+            ).astype("float64")
+            columns += ["signatures", "dedup_ratio"]
+        codes = [
+            code for code in _generate_error_code_list() if code in summary_dataframe
+        ]
+        summary_dataframe[codes] = summary_dataframe[codes].fillna(0).astype("int64")
+        return summary_dataframe.reindex(columns=columns + codes)
+
+    def missing_values(self) -> pd.Series:
+        """
+        :return: The number of rows missing a value in each target column, totalled over the records, by column in
+                the order the columns were first seen. A row missing values in more than one column is counted in
+                each.
+        """
+        totals = {}
+        for record in self.records:
+            for col, count in (record.missing_values or {}).items():
+                totals[col] = totals.get(col, 0) + count
+        return pd.Series(totals, dtype="int64", name="missing_values")
+
+
+class _StageRecorder:
+    """
+    Times the sub-functions of a date_adjustment run and passes a StageRecord of each to the instrumentation
+    function. Does nothing if there is no instrumentation function.
+    """
+
+    def __init__(
+        self, instrumentation: Callable[[StageRecord], None], da_error_flag_col: str
+    ):
+        """
+        :param instrumentation: The function to pass the StageRecords to, if any.
+        :param da_error_flag_col: Name of the error flag column.
+        """
+        self.instrumentation = instrumentation
+        self.da_error_flag_col = da_error_flag_col
+        self.start_time = None
+        self.error_code_counts = None
+
+    def start(self, data: Union[pd.DataFrame, "_ColumnarState"]):
+        """
+        :param data: The data about to be passed to a sub-function.
+        """
+        if self.instrumentation is None:
+            return
+        self.error_code_counts = self._error_code_counts(data)
+        self.start_time = time.perf_counter()
+
+    def stop(
+        self,
+        stage: str,
+        data: Union[pd.DataFrame, "_ColumnarState"],
+        signatures: int = None,
+        missing_values: dict = None,
+    ):
+        """
+        :param stage: The name of the sub-function.
+        :param data: The data output by the sub-function.
+        :param signatures: The number of period signatures the rows were processed as, if they were deduplicated.
+        :param missing_values: The number of rows missing a value in each target column, for the missing value
+                stage.
+        """
+        if self.instrumentation is None:
+            return
+        seconds = time.perf_counter() - self.start_time
+        error_code_counts = self._error_code_counts(data)
+        new_error_codes = np.maximum(error_code_counts - self.error_code_counts, 0)
+        self.instrumentation(
+            StageRecord(
+                stage=stage,
+                seconds=seconds,
+                rows_in=int(len(data) - self.error_code_counts.sum()),
+                rows_out=int(len(data) - error_code_counts.sum()),
+                error_codes={
+                    error_code.code: int(count)
+                    for error_code, count in zip(ErrorCode, new_error_codes)
+                    if count
+                },
+                signatures=signatures,
+                missing_values=missing_values,
+            )
+        )
+
+    def _error_code_counts(
+        self, data: Union[pd.DataFrame, "_ColumnarState"]
+    ) -> np.ndarray:
+        """
+        :param data: The data passed to or output by a sub-function.
+        :return: The number of rows with each error code, by error code number.
+        """
+        if isinstance(data, _ColumnarState):
+            numbers = data.error_codes.compressed()
+        elif self.da_error_flag_col in data.columns:
+            numbers = (
+                data[self.da_error_flag_col]
+                .map(_ERROR_CODE_NUMBERS)
+                .dropna()
+                .to_numpy(dtype="int64")
+            )
+        else:
+            numbers = np.array([], dtype="int64")
+        return np.bincount(numbers, minlength=len(ErrorCode))
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: PERIOD CACHE
+# -------------------------------------------------------------------------------------------------------------
+
+
+# Part of every PeriodCache key, to be changed whenever the period level stages change what they write.
+_PERIOD_CACHE_VERSION = 1
+
+
+class PeriodCache:
+    """
+    An on-disk cache, held in an SQLite database, of the period level results of date_adjustment: the columns
+    written and the error code given by the primary wrangler, midpoint and secondary wrangler sub-functions for each
+    period signature (see _PeriodSignatures). Entries are keyed by a hash of the period signature and the trading
+    weights and trading periods of its domain, so they are only used while those are unchanged. Once the cache
+    holds more than max_entries, the least recently used entries are evicted.
+
+    Pass to date_adjustment with engine="vectorized" as period_cache, so that repeated runs over the same periods
+    look up their results rather than calculating them again. The database is opened by each process that uses it,
+    so the cache can be used with n_jobs > 1.
+
+    Looking a signature up takes longer than calculating it, as the vectorized engine already runs the period level
+    stages once per signature, so the cache only saves time where those stages cost more than the lookup.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], max_entries: int = 1_000_000):
+        """
+        :param path: The SQLite database file, created if it does not exist.
+        :param max_entries: The number of entries above which the least recently used are evicted.
+
+        :raises ValueError: If max_entries is not a positive integer.
+        """
+        if (
+            isinstance(max_entries, bool)
+            or not isinstance(max_entries, int)
+            or max_entries < 1
+        ):
+            msg = 'Param "max_entries" for PeriodCache should be a positive integer, '
+            msg += "not " + str(max_entries) + "."
+            raise ValueError(msg)
+        self.path = os.fspath(path)
+        self.max_entries = max_entries
+        self._connection = None
+
+    def __getstate__(self) -> dict:
+        # The connection is not passed to worker processes, which open their own.
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    def __len__(self) -> int:
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM period_results"
+        ).fetchone()[0]
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        :return: The connection to the database, opened and the table created on first use.
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS period_results "
+                    "(key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used INTEGER NOT NULL)"
+                )
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS period_results_last_used "
+                    "ON period_results (last_used)"
+                )
+        return self._connection
+
+    def get(self, keys: List[str]) -> dict:
+        """
+        Looks up entries, marking those found as used.
+
+        :param keys: The keys of the entries.
+        :return: The results of the entries found, by key.
+        """
+        # The keys are looked up through a temporary table joined on key, which holds any number of them. The
+        # entries are marked as used before they are read, as a transaction that has read from the database cannot
+        # wait for another process to finish writing to it.
+        with self.connection:
+            self.connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS period_keys (key TEXT PRIMARY KEY)"
+            )
+            self.connection.execute("DELETE FROM period_keys")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO period_keys (key) VALUES (?)",
+                [(key,) for key in keys],
+            )
+            self.connection.execute(
+                "UPDATE period_results SET last_used = ? "
+                "WHERE key IN (SELECT key FROM period_keys)",
+                [time.time_ns()],
+            )
+            found = self.connection.execute(
+                "SELECT period_results.key, period_results.result FROM period_results "
+                "JOIN period_keys ON period_results.key = period_keys.key"
+            ).fetchall()
+        return {key: json.loads(result) for key, result in found}
+
+    def put(self, results: dict):
+        """
+        Adds or replaces entries, then evicts the least recently used entries if there are more than max_entries.
+
+        :param results: The results to store, by key, each of which must be serializable as JSON.
+        """
+        last_used = time.time_ns()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO period_results (key, result, last_used) VALUES (?, ?, ?)",
+                [
+                    (key, json.dumps(result), last_used)
+                    for key, result in results.items()
+                ],
+            )
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM period_results WHERE key IN (SELECT key FROM period_results "
+                    "ORDER BY last_used LIMIT ?)",
+                    [excess],
+                )
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM period_results")
+
+    def close(self):
+        """
+        Closes the connection to the database, which is reopened if the cache is used again.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# -------------------------------------------------------------------------------------------------------------
+# SECTION: TRADING WEIGHTS
+# -------------------------------------------------------------------------------------------------------------
+
+
+class TradingWeights:
+    """
+    Trading day weight reference data that has been validated, had its dtypes set and been indexed, ready to be
+    used by any number of date_adjustment runs.
 
-    :param String average_weekly: The average weekly parameter for the run. (Not the column name, the actual value.)
-    :param List[Strings] target_columns: The names of the columns in input_dataframe to be date_adjusted.
+    It can be passed to date_adjustment, date_adjustment_chunks and the sub-functions in place of the trading
+    weights DataFrame, with the same column name parameters it was built with. It can also be pickled, so that it
+    can be built once and loaded by other processes.
+    """
 
-    :raises TypeError: If the data held in column referenced by the target_columns_col parameter is not a list.
+    def __init__(
+        self,
+        trading_weights: pd.DataFrame,
+        trading_date_col: str,
+        trading_weights_col: str,
+        trading_domain_col: str,
+        trading_period_start_col: str,
+        trading_period_end_col: str,
+    ):
+        """
+        :param trading_weights: The trading day weight reference data.
+        :param trading_date_col: Name of the column holding the dates in trading_weights.
+        :param trading_weights_col: Name of the column holding the weights in trading_weights.
+        :param trading_domain_col: Name of the column holding the domain in trading_weights.
+        :param trading_period_start_col: Name of the column holding the trading period start date in
+                trading_weights.
+        :param trading_period_end_col: Name of the column holding the trading period end date in trading_weights.
 
-    :returns: A list of validated columns to run the average_weekly method against.
+        :raises TypeError: If the trading weights reference data is not a DataFrame.
+        :raises KeyError: If required columns cannot be found in trading_weights.
+        """
+        this_place = type(self).__name__
+        if not isinstance(trading_weights, pd.DataFrame):
+            msg = 'Param "trading_weights" for ' + this_place + " "
+            msg += (
+                "should be of type DataFrame, not " + str(type(trading_weights)) + "."
+            )
+            raise TypeError(msg)
+
+        self.column_names = {
+            "trading_date_col": trading_date_col,
+            "trading_weights_col": trading_weights_col,
+            "trading_domain_col": trading_domain_col,
+            "trading_period_start_col": trading_period_start_col,
+            "trading_period_end_col": trading_period_end_col,
+        }
+        self.dataframe, self.index = _prepare_trading_weights(
+            this_place,
+            trading_weights.copy(),
+            _trading_weights_dtypes(**self.column_names),
+            **self.column_names,
+        )
 
 
+def _unpack_trading_weights(
+    this_place: str,
+    trading_weights: Union[pd.DataFrame, TradingWeights],
+    weights_index: "_TradingWeightsIndex",
+    **column_names: str,
+) -> tuple:
     """
-    # Validate target_columns is a list
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    this_place = sys._getframe().f_code.co_name
-    if not isinstance(target_columns, list):
-        msg = 'Param "target_columns" for function ' + this_place + " "
-        msg += "should be of type List, not " + str(type(target_columns)) + "."
-        raise TypeError(msg)
+    :param this_place: Name of the calling function, for error messages.
+    :param trading_weights: The trading day weight reference data, as a DataFrame or TradingWeights.
+    :param weights_index: Index of trading_weights supplied by the calling function, if any.
+    :param column_names: The trading weights column name parameters passed to the calling function, by name.
 
-    if average_weekly == "N":
-        average_weekly_questions_list = []
-    elif average_weekly == "A":
-        average_weekly_questions_list = target_columns.copy()
-    else:
-        average_weekly_questions_list = []
-        submitted_questions = _convert_question_string_to_list(average_weekly)
-        for column in target_columns:
-            if column in submitted_questions:
-                average_weekly_questions_list.append(column)
-                submitted_questions = [x for x in submitted_questions if x != column]
-        if submitted_questions:
-            return "ERROR: invalid average_weekly parameter contents."
+    :raises ValueError: If trading_weights is a TradingWeights object built with other column names.
 
-    return average_weekly_questions_list
+    :return: The trading weights DataFrame and the index of it (None if not supplied or held in trading_weights).
+    """
+    if not isinstance(trading_weights, TradingWeights):
+        return trading_weights, weights_index
+
+    for param_name, col_name in column_names.items():
+        if trading_weights.column_names[param_name] != col_name:
+            msg = 'Param "' + param_name + '" for function ' + this_place + " "
+            msg += "is " + str(col_name) + ", but the TradingWeights object passed was "
+            msg += "built with " + str(trading_weights.column_names[param_name]) + "."
+            raise ValueError(msg)
+
+    if weights_index is None:
+        weights_index = trading_weights.index
+    return trading_weights.dataframe, weights_index
 
 
 # -------------------------------------------------------------------------------------------------------------
-# SECTION: MISSING VALUE SUB-FUNCTION
-# -------------------------------------------------------------------------------------------------------------=
+# SECTION: TRADING WEIGHTS INDEX
+# -------------------------------------------------------------------------------------------------------------
 
 
-def missing_value_subfunction(
-    input_dataframe: pd.DataFrame, target_columns: List, da_error_flag_col: str
-) -> pd.DataFrame:
+class _TradingWeightsIndex:
     """
-    Checks the target columns for missing data.
+    The trading weights sorted by domain and date, with running totals, so that the weights over any period of
+    a domain can be found with two binary searches instead of a scan of the whole trading weights table.
 
-    :param input_dataframe: The dataframe containing the data to be processed plus processing options.
-    :param target_columns: The names of the columns in input_dataframe to be date_adjusted.
-    :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    Trading weight records with a null domain or date can never be matched and are left out of the index.
+    """
 
-    :raises TypeError: If the input dataframe is not a DataFrame.
-    :raises TypeError: If the target columns parameter is not a List.
-    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe.
-    :raises KeyError: If columns referenced in target_columns parameter cannot be found in the input dataframe.
+    def __init__(
+        self,
+        trading_weights: pd.DataFrame,
+        trading_domain_col: str,
+        trading_date_col: str,
+        trading_weights_col: str,
+        trading_period_start_col: str = None,
+        trading_period_end_col: str = None,
+    ):
+        """
+        :param trading_weights: The trading day weight reference data.
+        :param trading_domain_col: Name of the column holding the domain in trading_weights.
+        :param trading_date_col: Name of the column holding the dates in trading_weights.
+        :param trading_weights_col: Name of the column holding the weights in trading_weights.
+        :param trading_period_start_col: Name of the column holding the trading period start date in trading_weights.
+                If not supplied (along with trading_period_end_col), trading periods cannot be looked up.
+        :param trading_period_end_col: Name of the column holding the trading period end date in trading_weights.
+        """
+        weight_domains = trading_weights[trading_domain_col]
+        weight_dates = trading_weights[trading_date_col].to_numpy(
+            dtype="datetime64[ns]"
+        )
+        usable = weight_domains.notna().to_numpy() & ~np.isnat(weight_dates)
 
-    :returns: Data with rows that have missing data in the target columns marked with an error flag.
+        if isinstance(weight_domains.dtype, pd.CategoricalDtype):
+            self.domains = weight_domains.cat.categories
+            domain_codes = weight_domains.cat.codes.to_numpy()[usable]
+        else:
+            domain_names = weight_domains[usable].astype(str)
+            self.domains = pd.Index(domain_names.unique())
+            domain_codes = self.domains.get_indexer(domain_names)
 
-    """
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    this_place = sys._getframe().f_code.co_name
+        keys = self._keys(domain_codes, weight_dates[usable])
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.dates = weight_dates[usable][order]
 
-    # noinspection PyProtectedMember
-    _basic_input_validation(
-        this_place, input_dataframe=input_dataframe, target_columns=target_columns
-    )
+        weight_values, weight_errors, unparsable = _trading_weight_values(
+            trading_weights[trading_weights_col]
+        )
+        weight_values = weight_values[usable][order]
+        self.weight_errors = weight_errors[usable][order]
 
-    # Validate required columns in input_dataframe
-    _required_column_validation(
-        this_place, "input_dataframe", input_dataframe, target_columns
-    )
+        # Whether the weights are whole numbers held as ints, which the row by row engine sums to an int.
+        self.integer_weights = (
+            pd.api.types.infer_dtype(trading_weights[trading_weights_col], skipna=True)
+            == "integer"
+        )
 
-    # Create working copy of input dataframe
-    working_dataframe = input_dataframe.copy()
+        # As in the row by row method, a weight that cannot be converted to a number only fails if a period uses it.
+        unparsable = unparsable[usable][order]
+        self.unparsable_positions = np.flatnonzero(unparsable)
+        self.unparsable_weights = trading_weights[trading_weights_col].to_numpy(
+            dtype=object
+        )[usable][order][unparsable]
+        self.unparsable = unparsable
+
+        # Trading days with a non-zero (positive) weight, used to trim periods.
+        positive = weight_values > 0
+        self.positive_keys = self.keys[positive]
+        self.positive_dates = self.dates[positive]
+
+        # Hash lookup of (domain, date) to the trading period of the first record for that date, and the number of
+        # records found for the date.
+        self.period_keys = None
+        if trading_period_start_col is not None and trading_period_end_col is not None:
+            unique_keys, first, multiplicity = np.unique(
+                self.keys, return_index=True, return_counts=True
+            )
+            self.period_keys = pd.Index(unique_keys)
+            self.period_multiplicity = multiplicity
+            for attribute, col_name in [
+                ("period_starts", trading_period_start_col),
+                ("period_ends", trading_period_end_col),
+            ]:
+                period_dates = trading_weights[col_name].to_numpy(
+                    dtype="datetime64[ns]"
+                )
+                setattr(self, attribute, period_dates[usable][order][first])
+
+        # Running totals restart at each domain to keep floating point error local to the domain.
+        sorted_codes = domain_codes[order]
+        domain_start = np.ones(len(sorted_codes), dtype=bool)
+        domain_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+        filled_values = np.nan_to_num(weight_values, nan=0.0)
+        self.running_total = (
+            pd.Series(filled_values).groupby(sorted_codes).cumsum().to_numpy()
+        )
+        self.total_before = np.where(domain_start, 0.0, np.roll(self.running_total, 1))
+
+        # Each invalid weight in sorted order, keyed by its table position and error code number, so that the
+        # largest key in a period is the last invalid weight in table order, which the row by row method picks.
+        self.invalid_positions = np.flatnonzero(self.weight_errors)
+        self.invalid_keys = np.append(
+            order[self.invalid_positions].astype("int64") * 8
+            + self.weight_errors[self.invalid_positions],
+            -1,
+        )
 
-    # Add the error flag column for future use and output.
-    working_dataframe[da_error_flag_col] = np.nan
+        # Content hashes of the domains, by index code, calculated as needed by domain_hashes.
+        self.content_hashes = {}
+
+    @staticmethod
+    def _keys(domain_codes: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """
+        Combines domain codes and dates into one sortable int64 key.
+
+        :param domain_codes: Integer code of each domain.
+        :param dates: datetime64 dates.
+        :return: Array of keys.
+        """
+        days = dates.astype("datetime64[D]").astype("int64")
+        return (domain_codes.astype("int64") << 32) + (days + (1 << 31))
+
+    def domain_codes(self, domains: np.ndarray) -> np.ndarray:
+        """
+        :param domains: Domain values from the input data.
+        :return: The index code of each domain, -1 where the domain has no trading weights.
+        """
+        if isinstance(domains, pd.Categorical):
+            # Only the categories are looked up. The codes of domains sharing the categories of the index are
+            # mapped to themselves.
+            if domains.categories.equals(self.domains):
+                return domains.codes.astype("int64")
+            category_codes = self.domains.get_indexer(domains.categories.astype(str))
+            return np.append(category_codes, -1)[domains.codes]
+        domains = pd.Series(domains, dtype="object")
+        domain_codes = self.domains.get_indexer(domains.astype(str))
+        domain_codes[domains.isna().to_numpy()] = -1
+        return domain_codes
+
+    def domain_hashes(self, domains: np.ndarray) -> np.ndarray:
+        """
+        :param domains: Domain values from the input data.
+        :return: A hash of the trading weights and trading periods of each domain, as a hex string, which only
+                changes if they do. Domains without trading weights share the hash of no trading weights.
+        """
+        domain_codes = self.domain_codes(domains)
+        for domain_code in np.unique(domain_codes):
+            if domain_code in self.content_hashes:
+                continue
+            content = hashlib.sha256(str(self.integer_weights).encode())
+            if domain_code >= 0:
+                bounds = [domain_code << 32, (domain_code + 1) << 32]
+                first, after_last = np.searchsorted(self.keys, bounds)
+                for values in [
+                    self.dates,
+                    self.running_total,
+                    self.weight_errors,
+                    self.unparsable,
+                ]:
+                    content.update(values[first:after_last].tobytes())
+                # The error code of a period is that of its last invalid weight in table order, so the order of the
+                # invalid weights within the domain is part of its content, though not their positions in the table.
+                invalid = (self.invalid_positions >= first) & (
+                    self.invalid_positions < after_last
+                )
+                content.update(np.argsort(self.invalid_keys[:-1][invalid]).tobytes())
+                unparsable = (self.unparsable_positions >= first) & (
+                    self.unparsable_positions < after_last
+                )
+                content.update(
+                    json.dumps(
+                        [str(weight) for weight in self.unparsable_weights[unparsable]]
+                    ).encode()
+                )
+                if self.period_keys is not None:
+                    first, after_last = np.searchsorted(self.period_keys, bounds)
+                    for values in [
+                        self.period_multiplicity,
+                        self.period_starts,
+                        self.period_ends,
+                    ]:
+                        content.update(values[first:after_last].tobytes())
+            self.content_hashes[domain_code] = content.hexdigest()
+        return np.array(
+            [self.content_hashes[domain_code] for domain_code in domain_codes],
+            dtype=object,
+        )
 
-    # Check and apply the error flag as appropriate
-    def check_for_null(row):
-        for target_column in target_columns:
-            if pd.isnull(row[target_column]) or row[target_column] == ".":
-                row[target_column] = np.nan
-                row[da_error_flag_col] = "E01"
-        return row
+    def period_bounds(
+        self, domains: np.ndarray, start_dates: np.ndarray, end_dates: np.ndarray
+    ) -> tuple:
+        """
+        :param domains: The domain of each period.
+        :param start_dates: The first date of each period.
+        :param end_dates: The last date of each period.
+        :return: The first position and one past the last position in the index of the records of each period.
+        """
+        domain_codes = self.domain_codes(domains)
+        start_dates = _datetime64_array(start_dates)
+        end_dates = _datetime64_array(end_dates)
+        findable = (domain_codes >= 0) & ~np.isnat(start_dates) & ~np.isnat(end_dates)
+
+        first = np.zeros(len(domain_codes), dtype="int64")
+        after_last = np.zeros(len(domain_codes), dtype="int64")
+        first[findable] = np.searchsorted(
+            self.keys,
+            self._keys(domain_codes[findable], start_dates[findable]),
+            side="left",
+        )
+        after_last[findable] = np.searchsorted(
+            self.keys,
+            self._keys(domain_codes[findable], end_dates[findable]),
+            side="right",
+        )
+        after_last = np.maximum(first, after_last)
+        return first, after_last
+
+    def next_positive_date(self, domains: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """
+        :param domains: The domain of each date.
+        :param dates: The dates to search from.
+        :return: The earliest date on or after each date with a non-zero weight in the same domain, NaT if none.
+        """
+        return self._positive_date(domains, dates, "left", 0)
+
+    def previous_positive_date(
+        self, domains: np.ndarray, dates: np.ndarray
+    ) -> np.ndarray:
+        """
+        :param domains: The domain of each date.
+        :param dates: The dates to search from.
+        :return: The latest date on or before each date with a non-zero weight in the same domain, NaT if none.
+        """
+        return self._positive_date(domains, dates, "right", -1)
+
+    def _positive_date(
+        self, domains: np.ndarray, dates: np.ndarray, side: str, offset: int
+    ) -> np.ndarray:
+        """
+        :param domains: The domain of each date.
+        :param dates: The dates to search from.
+        :param side: Side passed to searchsorted.
+        :param offset: Offset from the searchsorted position to the position of the date wanted.
+        :return: The positive weight dates found, NaT if none.
+        """
+        domain_codes = self.domain_codes(domains)
+        dates = _datetime64_array(dates)
+        found_dates = np.full(len(domain_codes), np.datetime64("NaT"), "datetime64[ns]")
+
+        findable = np.flatnonzero((domain_codes >= 0) & ~np.isnat(dates))
+        positions = (
+            np.searchsorted(
+                self.positive_keys,
+                self._keys(domain_codes[findable], dates[findable]),
+                side=side,
+            )
+            + offset
+        )
+        in_range = (positions >= 0) & (positions < len(self.positive_keys))
+        findable = findable[in_range]
+        positions = positions[in_range]
+
+        same_domain = (self.positive_keys[positions] >> 32) == domain_codes[findable]
+        found_dates[findable[same_domain]] = self.positive_dates[positions[same_domain]]
+        return found_dates
+
+    def trading_periods(self, domains: np.ndarray, dates: np.ndarray) -> tuple:
+        """
+        :param domains: The domain of each date.
+        :param dates: The dates to look up.
+        :return: Arrays holding the trading period start and end dates (NaT if not found) and the number of trading
+                weight records found for each date.
+        """
+        if self.period_keys is None:
+            raise KeyError(
+                "Trading periods were not included in the trading weights index."
+            )
 
-    df_stage_one = working_dataframe.apply(check_for_null, axis=1)
+        domain_codes = self.domain_codes(domains)
+        dates = _datetime64_array(dates)
+        period_starts = np.full(len(dates), np.datetime64("NaT"), "datetime64[ns]")
+        period_ends = period_starts.copy()
+        multiplicity = np.zeros(len(dates), dtype="int64")
 
-    return df_stage_one
+        findable = np.flatnonzero((domain_codes >= 0) & ~np.isnat(dates))
+        positions = self.period_keys.get_indexer(
+            self._keys(domain_codes[findable], dates[findable])
+        )
+        findable = findable[positions >= 0]
+        positions = positions[positions >= 0]
+
+        period_starts[findable] = self.period_starts[positions]
+        period_ends[findable] = self.period_ends[positions]
+        multiplicity[findable] = self.period_multiplicity[positions]
+        return period_starts, period_ends, multiplicity
+
+    def period_weights(
+        self,
+        domains: np.ndarray,
+        start_dates: np.ndarray,
+        end_dates: np.ndarray,
+        days_in_period: np.ndarray,
+    ) -> tuple:
+        """
+        :param domains: The domain of each period.
+        :param start_dates: The first date of each period.
+        :param end_dates: The last date of each period.
+        :param days_in_period: The number of days in each period.
+
+        :raises ValueError: If a period with a trading weight record for each of its days has a weight that cannot
+                be converted to a number, as the row by row method does.
+
+        :return: Arrays holding the number of trading weight records found, the sum of their weights and the error
+                code number (0 if none, 4 if null or blank, 5 if negative) of the last invalid weight in table order
+                for each period.
+        """
+        first, after_last = self.period_bounds(domains, start_dates, end_dates)
+        record_count = after_last - first
+        if len(self.unparsable_positions):
+            self._check_parsable(first, after_last, record_count == days_in_period)
+        found = record_count > 0
+        last = after_last[found] - 1
+
+        weight_total = np.zeros(len(first))
+        weight_total[found] = self.running_total[last] - self.total_before[first[found]]
+
+        weight_error = np.zeros(len(first), dtype="int8")
+        first_invalid = np.searchsorted(self.invalid_positions, first)
+        after_last_invalid = np.searchsorted(self.invalid_positions, after_last)
+        invalid = after_last_invalid > first_invalid
+        if invalid.any():
+            # The extra key at the end lets a period's bound fall after the last invalid weight.
+            bounds = np.column_stack(
+                [first_invalid[invalid], after_last_invalid[invalid]]
+            ).ravel()
+            last_invalid = np.maximum.reduceat(self.invalid_keys, bounds)[::2]
+            weight_error[invalid] = last_invalid % 8
+
+        return record_count, weight_total, weight_error
+
+    def _check_parsable(
+        self, first: np.ndarray, after_last: np.ndarray, complete: np.ndarray
+    ):
+        """
+        :param first: The first position in the index of the records of each period.
+        :param after_last: One past the last position in the index of the records of each period.
+        :param complete: Whether each period has a trading weight record for each of its days.
+
+        :raises ValueError: If a complete period has a weight that cannot be converted to a number.
+        """
+        first_unparsable = np.searchsorted(self.unparsable_positions, first[complete])
+        after_last_unparsable = np.searchsorted(
+            self.unparsable_positions, after_last[complete]
+        )
+        has_unparsable = np.flatnonzero(after_last_unparsable > first_unparsable)
+        if len(has_unparsable):
+            weight = self.unparsable_weights[first_unparsable[has_unparsable[0]]]
+            raise ValueError(f"could not convert string to float: {weight!r}")
 
 
 # -------------------------------------------------------------------------------------------------------------
-# SECTION: PRIMARY WRANGLER SUB-FUNCTION
+# SECTION: VECTORIZED ENGINE
 # -------------------------------------------------------------------------------------------------------------
 
 
-def primary_wrangler_subfunction(
-    df_stage_one: pd.DataFrame,
-    trading_weights: pd.DataFrame,
+class _ColumnarState:
+    """
+    The data being processed by the vectorized engine, held as one array per column, with the error code number of
+    each row held in a masked integer array (masked where the row has no error). Rows given an error code are simply
+    masked out of all later stages.
+
+    Columns are read from the dataframe supplied as needed, columns written to are held as arrays until
+    to_dataframe is called. The output has the columns, column order and dtypes that the DataFrame.apply calls of
+    the row by row engine give, so each group of columns added by one of those calls is marked with start_stage.
+    """
+
+    def __init__(
+        self,
+        dataframe: pd.DataFrame,
+        da_error_flag_col: str,
+        target_columns: List,
+        output_columns: List = None,
+    ):
+        """
+        :param dataframe: The data to be processed, which is not changed.
+        :param da_error_flag_col: Name of the error flag column, error codes already in it are kept.
+        :param target_columns: The names of the columns to be date_adjusted.
+        :param output_columns: The new columns to add to the output of to_dataframe, None for all of them.
+        """
+        self.dataframe = dataframe
+        self.da_error_flag_col = da_error_flag_col
+        self.target_columns = target_columns
+        self.output_columns = output_columns
+        self.columns = {}
+        self.column_order = list(dataframe.columns)
+        self.stage_columns = {}
+        self.written_rows = {}
+        self.stage_log = None
+        self.stages_started = 0
+        self.float_rows = {}
+        self.error_codes = np.ma.masked_all(len(dataframe), dtype="int8")
+        self.flag_values = None
+        if da_error_flag_col in dataframe.columns:
+            self.flag_values = dataframe[da_error_flag_col].to_numpy(dtype=object)
+            error_code_numbers = dataframe[da_error_flag_col].map(_ERROR_CODE_NUMBERS)
+            flagged = error_code_numbers.notna().to_numpy()
+            self.error_codes[flagged] = error_code_numbers[flagged].to_numpy(
+                dtype="int8"
+            )
+
+    def __len__(self) -> int:
+        return len(self.dataframe)
+
+    def __contains__(self, col_name: str) -> bool:
+        return col_name in self.columns or col_name in self.dataframe.columns
+
+    @property
+    def active(self) -> np.ndarray:
+        """
+        :return: Boolean mask of the rows without an error code, safe to be changed by the caller.
+        """
+        return np.ma.getmaskarray(self.error_codes).copy()
+
+    def all_flagged(self) -> bool:
+        """
+        :return: True if every row has an error code.
+        """
+        return not self.active.any()
+
+    def reset_error_flags(self):
+        """
+        Clears all error codes and the existing contents of the error flag column.
+        """
+        self.error_codes = np.ma.masked_all(len(self), dtype="int8")
+        self.flag_values = np.full(len(self), np.nan, dtype=object)
+        if self.da_error_flag_col not in self.column_order:
+            self.column_order.append(self.da_error_flag_col)
+
+    def start_stage(self):
+        """
+        Marks the start of the work that the row by row engine does in one DataFrame.apply call.
+        """
+        self._end_stage()
+        self.stages_started += 1
+
+    def _end_stage(self):
+        """
+        Adds the columns created since the stage started to the output columns. As with DataFrame.apply, they are
+        appended in the order they were created if every row gained all of them. Otherwise the rows are aligned on
+        the union of their columns, which sorts all the columns by name. A numeric column holding a float or a null
+        is float64 after the stage, so every value in it is read back as a float by later stages.
+
+        If stage_log is a list, the number of the stage and the rows written to in it, with the values of their
+        columns and whether they are held as ints, are appended to it, so that the stage can be replayed on another
+        state.
+        """
+        if self.stage_log is not None and self.written_rows:
+            self.stage_log.append(
+                (
+                    self.stages_started,
+                    {
+                        col_name: (
+                            rows,
+                            self.columns[col_name].copy(),
+                            (
+                                ~self.float_rows[col_name]
+                                if col_name in self.float_rows
+                                else True
+                            ),
+                        )
+                        for col_name, rows in self.written_rows.items()
+                    },
+                )
+            )
+        for col_name, float_rows in self.float_rows.items():
+            if float_rows.any() or np.isnan(self.columns[col_name]).any():
+                float_rows[:] = True
+        self.written_rows = {}
+        if not self.stage_columns:
+            return
+        self.column_order += list(self.stage_columns)
+        if not all(rows.all() for rows in self.stage_columns.values()):
+            self.column_order.sort()
+        self.stage_columns = {}
+
+    def column(self, col_name: str) -> np.ndarray:
+        """
+        :param col_name: Name of the column.
+        :return: The values of the column, not to be changed by the caller. Categorical columns are returned as
+                a Categorical, so that domains can be looked up by code.
+        """
+        if col_name in self.columns:
+            return self.columns[col_name]
+        values = self.dataframe[col_name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values.array
+        return values.to_numpy()
+
+    def dates(self, col_name: str) -> np.ndarray:
+        """
+        :param col_name: Name of the column.
+        :return: The values of the column as datetime64[ns].
+        """
+        return _datetime64_array(self.column(col_name))
+
+    def numbers(self, col_name: str) -> np.ndarray:
+        """
+        :param col_name: Name of the column.
+        :return: The values of the column as float64, nan where not numeric.
+        """
+        values = self.column(col_name)
+        if values.dtype == "float64":
+            return values
+        return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(
+            dtype="float64", na_value=np.nan
+        )
+
+    def number_block(self, col_names: List) -> np.ndarray:
+        """
+        :param col_names: Names of the columns.
+        :return: The values of the columns as a 2-D float64 array with one column per name, nan where not numeric.
+        """
+        if not col_names:
+            return np.empty((len(self), 0))
+        unchanged = not any(col_name in self.columns for col_name in col_names)
+        if unchanged and all(
+            self.dataframe[col_name].dtype == "float64" for col_name in col_names
+        ):
+            return self.dataframe[col_names].to_numpy(dtype="float64")
+        return np.column_stack([self.numbers(col_name) for col_name in col_names])
+
+    def isin(self, col_name: str, values: List) -> np.ndarray:
+        """
+        :param col_name: Name of the column.
+        :param values: The values to look for.
+        :return: Boolean mask of the rows holding one of the values, False where null.
+        """
+        return pd.Series(self.column(col_name)).isin(values).to_numpy()
+
+    def set_column(
+        self,
+        col_name: str,
+        values: np.ndarray,
+        rows: np.ndarray,
+        integers: Union[bool, np.ndarray] = False,
+    ):
+        """
+        Writes values to the given rows of a column. As with the row by row engine, a new column is only created if
+        at least one row is written to and the other rows of a new column are null.
+
+        :param col_name: Name of the column.
+        :param values: Values for every row, only those in rows are written.
+        :param rows: Boolean mask of the rows to be written.
+        :param integers: True, or a boolean mask of the rows, where the values are whole numbers that the row by row
+                engine holds as ints. A new or int64 column holding only such values and no nulls is output as int64.
+        """
+        if not rows.any():
+            return
+        values = np.asarray(values)
+        if col_name not in self:
+            self.stage_columns[col_name] = np.zeros(len(self), dtype=bool)
+            if values.dtype.kind in "biuf":
+                self.float_rows[col_name] = np.zeros(len(self), dtype=bool)
+        elif (
+            col_name not in self.columns
+            and self.dataframe[col_name].dtype.kind in "biu"
+        ):
+            self.float_rows[col_name] = np.zeros(len(self), dtype=bool)
+        if col_name in self.stage_columns:
+            self.stage_columns[col_name] |= rows
+        if col_name in self.written_rows:
+            self.written_rows[col_name] |= rows
+        else:
+            self.written_rows[col_name] = rows.copy()
+        if col_name in self.float_rows:
+            self.float_rows[col_name][rows] = ~np.broadcast_to(integers, len(self))[
+                rows
+            ]
+
+        if col_name in self.columns:
+            column = self.columns[col_name]
+        elif col_name in self.dataframe.columns:
+            if values.dtype.kind == "M":
+                column = self.dates(col_name).copy()
+            else:
+                column = self.dataframe[col_name].to_numpy(copy=True)
+        else:
+            column = _null_array(values.dtype, len(self))
+
+        if column.dtype.kind in "biu" and values.dtype.kind == "f":
+            column = column.astype("float64")
+        elif column.dtype.kind not in "fMO":
+            column = column.astype(object)
+
+        column[rows] = values[rows]
+        self.columns[col_name] = column
+
+    def set_columns(self, col_names: List, block: np.ndarray, rows: np.ndarray):
+        """
+        Writes a 2-D block of float64 values to the given rows of several columns, as set_column does for one.
+
+        :param col_names: Names of the columns.
+        :param block: Values for every row, with one column per name, only those in rows are written.
+        :param rows: Boolean mask of the rows to be written.
+        """
+        if not rows.any():
+            return
+        if any(col_name in self for col_name in col_names):
+            for position, col_name in enumerate(col_names):
+                self.set_column(col_name, block[:, position], rows)
+            return
+
+        # New columns are held as the columns of one Fortran ordered block, so none of them is copied.
+        columns = np.full(block.shape, np.nan, order="F")
+        columns[rows] = block[rows]
+        for position, col_name in enumerate(col_names):
+            self.columns[col_name] = columns[:, position]
+            self.stage_columns[col_name] = rows.copy()
+            self.written_rows[col_name] = rows.copy()
+
+    def flag(self, rows: np.ndarray, error_code_number: int):
+        """
+        Column-wise equivalent of _apply_error_flag. The outputs of the rows are nullified where the error code
+        requires it.
+
+        :param rows: Boolean mask of the rows to receive the error code.
+        :param error_code_number: The number of the error code, e.g. 3 for E03.
+        """
+        if not rows.any():
+            return
+        self.error_codes[rows] = error_code_number
+        error_code = _ERROR_CODES_BY_NUMBER[error_code_number]
+
+        for col_name in error_code.zeroed_columns:
+            if col_name in self:
+                self.set_column(col_name, np.zeros(len(self)), rows, integers=True)
+
+        for col_name in error_code.nulled_columns(self.target_columns):
+            if col_name in self:
+                self.set_column(col_name, np.full(len(self), np.nan), rows)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        :return: A new dataframe holding the data supplied with the changed columns replaced, new columns added and
+                the error codes written to the error flag column, with the column order and dtypes of the row by row
+                engine. Only the new columns in output_columns are added, if it was supplied.
+        """
+        self._end_stage()
+        output_dataframe = self.dataframe.copy(deep=False)
+        column_order = self.column_order
+        if self.output_columns is not None:
+            column_order = [
+                col_name
+                for col_name in column_order
+                if col_name in self.dataframe.columns
+                or col_name in self.output_columns
+                or col_name == self.da_error_flag_col
+            ]
+        new_columns = {}
+        for col_name, values in self.columns.items():
+            if col_name not in column_order:
+                continue
+            if (
+                col_name in self.float_rows
+                and not self.float_rows[col_name].any()
+                and not np.isnan(values).any()
+            ):
+                values = values.astype("int64")
+            if col_name in output_dataframe.columns:
+                output_dataframe[col_name] = values
+            else:
+                new_columns[col_name] = values
+
+        # New columns are appended in one go, rather than inserted one at a time.
+        if new_columns:
+            output_dataframe = pd.concat(
+                [
+                    output_dataframe,
+                    pd.DataFrame(new_columns, index=output_dataframe.index),
+                ],
+                axis=1,
+            )
+
+        if self.flag_values is not None or not self.active.all():
+            if self.flag_values is None:
+                flags = np.full(len(self), np.nan, dtype=object)
+            else:
+                flags = self.flag_values.copy()
+            flagged = ~self.active
+            codes = np.asarray([code.code for code in ErrorCode], dtype=object)
+            flags[flagged] = codes[self.error_codes[flagged].data]
+            output_dataframe[self.da_error_flag_col] = flags
+            if self.da_error_flag_col not in column_order:
+                column_order.append(self.da_error_flag_col)
+
+        return _inferred_dtypes(output_dataframe.reindex(columns=column_order))
+
+
+def _period_signature_columns(
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
+) -> List:
+    """
+    The parameters are as described for date_adjustment.
+
+    :return: The names of the columns making up the period signature of a row, the domain column first.
+    """
+    return [
+        domain_col,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+    ]
+
+
+class _PeriodSignatures:
+    """
+    The rows of a _ColumnarState without an error code, grouped by period signature: the domain, the returned and
+    expected periods and the options that the primary wrangler, midpoint and secondary wrangler stages depend on.
+    Many contributors share the default period, so those stages are run on a state holding one row per signature,
+    with their results broadcast back to the rows of the full state after each stage.
+
+    With a PeriodCache, look_up finds the signatures held in the cache, and only the others are run through the
+    stages. broadcast replays the cached results of the signatures found along with the results of those run, and
+    store adds the results of the signatures run to the cache.
+    """
+
+    def __init__(self, state: _ColumnarState, signature_columns: List):
+        """
+        :param state: The full state, updated in place by broadcast.
+        :param signature_columns: Names of the columns making up the period signature, the domain column first.
+        """
+        self.state = state
+        self.rows = state.active
+        positions = np.flatnonzero(self.rows)
+        signatures = pd.DataFrame(
+            {col: state.column(col)[positions] for col in signature_columns}
+        )
+        self.inverse = np.zeros(len(state), dtype=np.intp)
+        self.inverse[positions] = signatures.groupby(
+            signature_columns, dropna=False, observed=True, sort=False
+        ).ngroup()
+        first_rows = np.unique(self.inverse[positions], return_index=True)[1]
+        self.signatures = signatures.take(first_rows).reset_index(drop=True)
+
+        self.period_cache = None
+        self.keys = []
+        self.stored = False
+        # The results of the signatures found in the cache: the writes of each stage, the error code numbers (-1
+        # for none) and the stages that gave them.
+        self.cached_writes = {}
+        self.cached_error_codes = np.array([], dtype="int64")
+        self.cached_error_stages = np.array([], dtype=object)
+        self._run_signatures(
+            np.arange(len(self.signatures)), np.array([], dtype=np.intp)
+        )
+
+    def _run_signatures(self, uncached: np.ndarray, hits: np.ndarray):
+        """
+        :param uncached: The positions of the signatures to be run through the stages.
+        :param hits: The positions of the signatures found in the cache.
+        """
+        self.uncached = uncached
+        self.hits = hits
+        # The position of each row of the full state among the signatures run through the stages, and among those
+        # found in the cache, -1 where it is not one of them.
+        self.period_rows = self._row_positions(uncached)
+        self.hit_rows = self._row_positions(hits)
+        self.periods = _ColumnarState(
+            self.signatures.take(uncached).reset_index(drop=True),
+            self.state.da_error_flag_col,
+            [],
+        )
+        self.periods.stage_log = []
+        # The number of the last stage of the state of the signatures started before the current period level stage.
+        self.first_stage_number = 0
+        # The writes of each period level stage run, and the stage that gave each signature its error code.
+        self.stage_writes = []
+        self.error_stages = np.full(len(uncached), None, dtype=object)
+
+    def _row_positions(self, signature_positions: np.ndarray) -> np.ndarray:
+        """
+        :param signature_positions: The positions of some of the signatures.
+        :return: The position of the signature of each row of the full state among them, -1 where it is not one of
+                them or the row had an error code when the signatures were grouped.
+        """
+        positions = np.full(len(self.signatures), -1, dtype=np.intp)
+        positions[signature_positions] = np.arange(len(signature_positions))
+        return np.where(self.rows, positions[self.inverse], -1)
+
+    def unflagged(self) -> int:
+        """
+        :return: The number of signatures without an error code, those the next stage will process.
+        """
+        return int(self.periods.active.sum())
+
+    def look_up(
+        self, period_cache: "PeriodCache", weights_index: "_TradingWeightsIndex"
+    ):
+        """
+        Looks the signatures up in a cache. Only those not found are then run through the stages.
+
+        :param period_cache: Cache of the results of earlier runs, also used by store.
+        :param weights_index: Index of the trading day weight reference data.
+        """
+        self.period_cache = period_cache
+        self.keys = _period_cache_keys(self.signatures, weights_index)
+        results = period_cache.get(self.keys)
+        # Each result names the layout of its writes, held as an entry of its own (see store).
+        layouts = period_cache.get(sorted({result[0] for result in results.values()}))
+        found = np.array(
+            [key in results and results[key][0] in layouts for key in self.keys],
+            dtype=bool,
+        )
+        self._run_signatures(np.flatnonzero(~found), np.flatnonzero(found))
+
+        results = [results[self.keys[signature]] for signature in self.hits]
+        by_layout = {}
+        for position, result in enumerate(results):
+            by_layout.setdefault(result[0], []).append(position)
+        self.cached_error_codes = np.array(
+            [result[1] for result in results], dtype="int64"
+        )
+        self.cached_error_stages = np.array(
+            [layouts[result[0]]["error"] for result in results], dtype=object
+        )
+
+        # The values of each write are gathered across the layouts by stage, number within the stage and column.
+        gathered = {}
+        for layout_name, positions in by_layout.items():
+            layout_values = list(zip(*[results[position] for position in positions]))
+            for write, values in zip(layouts[layout_name]["writes"], layout_values[2:]):
+                stage, stage_number, col_name, kind, integer = write
+                stage_writes = gathered.setdefault(stage, {}).setdefault(
+                    stage_number, {}
+                )
+                stage_writes.setdefault(col_name, []).append(
+                    (positions, kind, values, integer)
+                )
+        for stage, numbered_writes in gathered.items():
+            for stage_number, stage_writes in numbered_writes.items():
+                for col_name, writes in stage_writes.items():
+                    rows = np.zeros(len(self.hits), dtype=bool)
+                    column_integers = np.zeros(len(self.hits), dtype=bool)
+                    positions, kinds, values = [], [], []
+                    for write_positions, kind, write_values, integer in writes:
+                        rows[write_positions] = True
+                        column_integers[write_positions] = integer
+                        positions += write_positions
+                        kinds += [kind] * len(write_positions)
+                        values += write_values
+                    values = _values_from_json(tuple(kinds), tuple(values))
+                    column = _null_array(values.dtype, len(self.hits))
+                    column[positions] = values
+                    stage_writes[col_name] = (rows, column, column_integers)
+        self.cached_writes = gathered
+
+    def broadcast(self, stage: str):
+        """
+        Replays the period level stage just run on the signatures on the rows of the full state, along with the
+        writes of the same stage held in the cache for the signatures found in it, and gives the rows the error codes
+        of their signatures. Each row is written to in the same stages as its signature, with the same values held as
+        ints, so the output has the column order and dtypes of a run on the full state.
+
+        :param stage: The name of the period level stage, e.g. "midpoint".
+        """
+        self.periods.start_stage()
+        stage_writes = {
+            stage_number - self.first_stage_number: writes
+            for stage_number, writes in self.periods.stage_log
+        }
+        self.periods.stage_log = []
+        self.first_stage_number = self.periods.stages_started
+        self.stage_writes += [
+            (stage, stage_number, writes)
+            for stage_number, writes in stage_writes.items()
+        ]
+        cached_writes = self.cached_writes.get(stage, {})
+        for stage_number in sorted(set(stage_writes) | set(cached_writes)):
+            self.state.start_stage()
+            self._replay(stage_writes.get(stage_number, {}), self.period_rows)
+            self._replay(cached_writes.get(stage_number, {}), self.hit_rows)
+
+        # The outputs of the rows given an error code were already nullified in the stages replayed.
+        flagged = ~np.ma.getmaskarray(self.periods.error_codes)
+        self.error_stages[flagged & pd.isna(self.error_stages)] = stage
+        error_codes = np.full(len(self.state), -1, dtype="int64")
+        computed = self.period_rows >= 0
+        error_codes[computed] = self.periods.error_codes.filled(-1)[
+            self.period_rows[computed]
+        ]
+        cached = self.hit_rows >= 0
+        cached_flags = (self.cached_error_stages == stage) & (
+            self.cached_error_codes >= 0
+        )
+        error_codes[cached] = np.where(cached_flags, self.cached_error_codes, -1)[
+            self.hit_rows[cached]
+        ]
+        flagged = (error_codes >= 0) & self.state.active
+        self.state.error_codes[flagged] = error_codes[flagged]
+
+    def _replay(self, stage_writes: dict, row_positions: np.ndarray):
+        """
+        :param stage_writes: The rows written to in one stage by column name, with the values of the column and
+                whether they are held as ints, for some of the signatures.
+        :param row_positions: The position of the signature of each row of the full state among those signatures, -1
+                where it is not one of them.
+        """
+        included = row_positions >= 0
+        row_positions = np.maximum(row_positions, 0)
+        for col_name, (rows, values, integers) in stage_writes.items():
+            self.state.set_column(
+                col_name,
+                values[row_positions],
+                included & rows[row_positions],
+                np.broadcast_to(integers, len(rows))[row_positions],
+            )
+
+    def store(self):
+        """
+        Adds the results of the signatures run through the stages to the cache, if there is one. Only the first
+        call does anything, so it can be called wherever the stages may have finished.
+
+        Signatures given the same writes, held as ints alike and given an error code in the same stage, share a
+        layout, added as an entry of its own, so that the entry of each signature only holds its layout, error code
+        number and the values written.
+        """
+        if self.period_cache is None or self.stored:
+            return
+        self.stored = True
+        if not len(self.uncached):
+            return
+        error_codes = self.periods.error_codes.filled(-1)
+        writes = [
+            (
+                stage,
+                stage_number,
+                col_name,
+                rows,
+                values,
+                np.broadcast_to(integers, len(rows)),
+            )
+            for stage, stage_number, stage_writes in self.stage_writes
+            for col_name, (rows, values, integers) in stage_writes.items()
+        ]
+        layout_codes = np.column_stack(
+            [pd.factorize(pd.Series(self.error_stages, dtype=object))[0]]
+            + [np.where(rows, 1 + integers, 0) for *_, rows, values, integers in writes]
+        )
+        layout_codes = np.unique(layout_codes, axis=0, return_inverse=True)[1]
+        order = np.argsort(layout_codes.reshape(-1), kind="stable")
+        boundaries = np.flatnonzero(np.diff(layout_codes.reshape(-1)[order])) + 1
+
+        results = {}
+        for positions in np.split(order, boundaries):
+            first = positions[0]
+            layout_writes = [write for write in writes if write[3][first]]
+            layout = {
+                "error": self.error_stages[first],
+                "writes": [
+                    [
+                        stage,
+                        stage_number,
+                        col_name,
+                        values.dtype.kind,
+                        bool(integers[first]),
+                    ]
+                    for stage, stage_number, col_name, rows, values, integers in layout_writes
+                ],
+            }
+            layout_name = (
+                "layout " + hashlib.sha256(json.dumps(layout).encode()).hexdigest()
+            )
+            results[layout_name] = layout
+            columns = [_json_values(write[4][positions]) for write in layout_writes]
+            for position, error_code, *values in zip(
+                positions, error_codes[positions].tolist(), *columns
+            ):
+                results[self.keys[self.uncached[position]]] = [
+                    layout_name,
+                    error_code,
+                    *values,
+                ]
+        self.period_cache.put(results)
+
+
+def _period_cache_keys(
+    signatures: pd.DataFrame, weights_index: "_TradingWeightsIndex"
+) -> List[str]:
+    """
+    :param signatures: One row per period signature, the domain column first.
+    :param weights_index: Index of the trading day weight reference data.
+    :return: The PeriodCache key of each signature, a 128 bit hash of the signature and the trading weights and
+            trading periods of its domain, as a hex string.
+    """
+    # The hashes of pandas are only stable within a version of pandas, so the version is hashed too.
+    hashed = signatures.assign(
+        domain_hash=weights_index.domain_hashes(signatures.iloc[:, 0].array),
+        version=str(_PERIOD_CACHE_VERSION) + " " + pd.__version__,
+    )
+    halves = [
+        pd.util.hash_pandas_object(hashed, index=False, hash_key=hash_key).to_numpy()
+        for hash_key in ["period signature", "period cache key"]
+    ]
+    return [f"{first:016x}{second:016x}" for first, second in zip(*halves)]
+
+
+def _json_values(values: Union[np.ndarray, pd.Series]) -> List:
+    """
+    :param values: The values of a column.
+    :return: The values as JSON serializable Python values, with dates as nanoseconds since the epoch and nulls as
+            None.
+    """
+    values = np.asarray(values)
+    nulls = pd.isna(values)
+    if values.dtype.kind == "M":
+        values = values.astype("int64")
+    values = values.astype(object)
+    values[nulls] = None
+    return [
+        value.item() if isinstance(value, np.generic) else value for value in values
+    ]
+
+
+def _values_from_json(kinds: tuple, values: tuple) -> np.ndarray:
+    """
+    :param kinds: The dtype kind of the column each value was taken from.
+    :param values: Values from _json_values.
+    :return: The values as an array of the dtype they were taken from, where they were all taken from one kind, with
+            nulls as nan, or NaT for dates.
+    """
+    kind_set = set(kinds)
+    if kind_set == {"M"}:
+        return np.asarray(
+            [np.iinfo("int64").min if value is None else value for value in values],
+            dtype="int64",
+        ).view("datetime64[ns]")
+    if kind_set <= {"b", "i", "u", "f"} and None not in values:
+        return np.asarray(values, dtype="float64" if "f" in kind_set else None)
+    if kind_set <= {"b", "i", "u", "f"}:
+        return np.asarray(
+            [np.nan if value is None else value for value in values], dtype="float64"
+        )
+    return np.asarray(
+        [
+            (
+                np.nan
+                if value is None
+                else np.datetime64(value, "ns") if kind == "M" else value
+            )
+            for kind, value in zip(kinds, values)
+        ],
+        dtype=object,
+    )
+
+
+def _date_adjustment_vectorized(
+    input_dataframe: pd.DataFrame,
+    weights_index: "_TradingWeightsIndex",
     target_columns: List,
+    average_weekly_questions_list: List,
     contributor_returned_start_date_col: str,
     contributor_returned_end_date_col: str,
     expected_start_date_col: str,
     expected_end_date_col: str,
     domain_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
     equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    use_calendar_days_col: str,
     da_error_flag_col: str,
-    trading_domain_col: str,
-    trading_date_col: str,
-    trading_weights_col: str,
+    dtype_dict: dict,
+    stage_recorder: "_StageRecorder" = None,
+    period_cache: PeriodCache = None,
+    output_columns: List = None,
 ) -> pd.DataFrame:
     """
-    Prepares the data for further processing by the midpoint method if required.
+    Column-wise equivalent of the sub-functions called by date_adjustment, run on validated input data.
 
-    :param df_stage_one: The dataframe containing the data as processed to this point.
-    :param trading_weights: The trading day weight reference data required for processing.
-    :param target_columns: The names of the columns in the input dataframe to be date_adjusted.
+    :param input_dataframe: The dataframe containing the data to be processed plus processing options.
+    :param weights_index: Index of the trading day weight reference data, including trading periods.
+    :param target_columns: The names of the columns in input_dataframe to be date_adjusted.
+    :param average_weekly_questions_list: The names of the columns to be processed by the average weekly method.
     :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
     :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
     :param expected_start_date_col: Name of the column holding the expected period start date in input_dataframe.
     :param expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
     :param domain_col: Name of the column holding the Domain in input_dataframe.
+    :param short_period_parameter_col: Name of the column holding the "short period parameter" in input_dataframe.
+    :param long_period_parameter_col: Name of the column holding the "long period parameter" in input_dataframe.
     :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
+    :param set_to_mid_point_col: Name of the column holding the "Set to mid-point" option in input_dataframe.
+    :param use_calendar_days_col: Name of the column holding the "use calendar days" option in input_dataframe.
     :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
-    :param trading_date_col: Name of the column holding the dates in trading_weights.
-    :param trading_weights_col: Name of the column holding the weights in trading_weights.
-    :param trading_domain_col: Name of the column holding the domain in trading_weights.
+    :param dtype_dict: The dtypes of the input columns, set again after the missing value check as the row by row
+            engine does.
 
-    :raises TypeError: If the input dataframe is not a DataFrame.
-    :raises TypeError: If the trading weights reference data is not a DataFrame.
-    :raises TypeError: If the target columns parameter is not a List.
-    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe or the
-            trading weights dataframe as appropriate.
-    :raises KeyError: If columns referenced in target_columns parameter cannot be found in the input dataframe.
-
-    :return: A dataframe holding data and structure ready to be passed into the midpoint method sub-function.
+    :param stage_recorder: Records each stage run, if supplied.
+    :param period_cache: Cache of the period level results of earlier runs, looked up and added to if supplied.
+    :param output_columns: The columns added by the method to include in the output, None for all of them. The
+            others are held as arrays while needed and never added to the output.
 
+    :return: The input data with the method output appended as extra columns as necessary.
     """
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    this_place = sys._getframe().f_code.co_name
-
-    # Basic validation checks
-    # noinspection PyProtectedMember
-    _basic_input_validation(
-        this_place,
-        input_dataframe=df_stage_one,
-        trading_weights=trading_weights,
-        target_columns=target_columns,
-    )
-
-    # Validate required columns are in input dataframe
-    required_columns = [
-        contributor_returned_start_date_col,
-        contributor_returned_end_date_col,
-        da_error_flag_col,
-        equal_weighted_col,
-        expected_start_date_col,
-        expected_end_date_col,
-    ]
-    for col_name in target_columns:
-        required_columns.append(col_name)
-    _required_column_validation(
-        this_place, "df_stage_one", df_stage_one, required_columns
+    if stage_recorder is None:
+        stage_recorder = _StageRecorder(None, da_error_flag_col)
+    state = _ColumnarState(
+        input_dataframe, da_error_flag_col, target_columns, output_columns
     )
 
-    # Validate required columns are in trading_weights dataframe
-    required_columns = [trading_weights_col, trading_date_col, trading_domain_col]
-    _required_column_validation(
-        this_place, "trading_weights", trading_weights, required_columns
-    )
+    stage_recorder.start(state)
+    missing_values = _missing_value_columns(state, target_columns)
+    stage_recorder.stop("missing_value", state, missing_values=missing_values)
 
-    working_dataframe = df_stage_one.copy()
+    # If all rows error flagged, output dataframe as is.
+    if state.all_flagged():
+        return _set_dtypes(state.to_dataframe(), dtype_dict, target_columns)
+
+    # The period level stages are run once per period signature, on the rows that survived the missing value stage.
+    periods = _PeriodSignatures(
+        state,
+        _period_signature_columns(
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+        ),
+    )
 
-    # Rule 3.1 & 3.2
+    # Signatures found in the cache are not run through the period level stages.
+    if period_cache is not None:
+        stage_recorder.start(state)
+        periods.look_up(period_cache, weights_index)
+        stage_recorder.stop("period_cache", state, len(periods.hits))
+
+    stage_recorder.start(state)
+    signatures = periods.unflagged()
+    if signatures:
+        _primary_wrangler_columns(
+            periods.periods,
+            weights_index,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            equal_weighted_col,
+        )
+    periods.broadcast("primary_wrangler")
+    stage_recorder.stop("primary_wrangler", state, signatures)
+
+    if state.all_flagged():
+        periods.store()
+        return state.to_dataframe()
+
+    stage_recorder.start(state)
+    signatures = periods.unflagged()
+    if signatures:
+        _midpoint_columns(
+            periods.periods,
+            weights_index,
+            domain_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            set_to_mid_point_col,
+            equal_weighted_col,
+            use_calendar_days_col,
+        )
+    periods.broadcast("midpoint")
+    stage_recorder.stop("midpoint", state, signatures)
+
+    if state.all_flagged():
+        periods.store()
+        return state.to_dataframe()
+
+    # The rows given an error code so far lack a number of days in the actual returned period, so the row by row
+    # engine holds the sums of weights that equal weighted rows copy from it as floats. That depends on all the rows
+    # rather than the period signature, so the signatures are run as if there were none, and it is applied after.
+    stage_recorder.start(state)
+    days_complete = state.active.all()
+    equal_weighted = state.active & state.isin(equal_weighted_col, ["Y"])
+    signatures = periods.unflagged()
+    if signatures:
+        _secondary_wrangler_columns(
+            periods.periods,
+            weights_index,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            days_complete=True,
+        )
+    periods.broadcast("secondary_wrangler")
+    if not days_complete:
+        state.set_column(
+            "sum_of_trading_day_weights_over_actual_returned_period",
+            state.numbers("sum_of_trading_day_weights_over_actual_returned_period"),
+            equal_weighted,
+        )
+    stage_recorder.stop("secondary_wrangler", state, signatures)
+    periods.store()
 
-    def fix_dates(row):
-        #  Ensure we have the EPS and EPE dates and they are valid.
-        if pd.isnull(row[expected_start_date_col]):
-            row = _apply_error_flag(row, "E14", da_error_flag_col, target_columns)
-            return row
-        if pd.isnull(row[expected_end_date_col]):
-            row = _apply_error_flag(row, "E15", da_error_flag_col, target_columns)
-            return row
+    if state.all_flagged():
+        return state.to_dataframe()
 
-        # Fix NaT start date
-        if pd.isna(row[contributor_returned_start_date_col]):
-            row[contributor_returned_start_date_col] = row[expected_start_date_col]
-            row[contributor_returned_start_date_col] = pd.to_datetime(
-                row[contributor_returned_start_date_col],
-                format="%Y%m%d",
-                errors="coerce",
-            )
+    stage_recorder.start(state)
+    _date_adjustment_columns(state, target_columns)
+    stage_recorder.stop("date_adjustment", state)
 
-        # Fix NaT end date
-        if pd.isna(row[contributor_returned_end_date_col]):
-            row[contributor_returned_end_date_col] = row[expected_end_date_col]
-            row[contributor_returned_end_date_col] = pd.to_datetime(
-                row[contributor_returned_end_date_col], format="%Y%m%d", errors="coerce"
-            )
+    if state.all_flagged():
+        return state.to_dataframe()
 
-        return row
+    stage_recorder.start(state)
+    _average_weekly_columns(state, average_weekly_questions_list)
+    stage_recorder.stop("average_weekly", state)
 
-    working_dataframe = _run_apply(working_dataframe, fix_dates, da_error_flag_col)
+    return state.to_dataframe()
 
-    # Rule 3.3, 3.4, 3.5, 3.6, 3.7
 
-    def preliminary_stages(row):
-        # Set defaults
-        row["sum_of_trading_day_weights_over_contributors_returned_period"] = 0
-        row["number_of_days_in_contributors_returned_period"] = 0
+def _missing_value_columns(state: _ColumnarState, target_columns: List) -> dict:
+    """
+    Column-wise equivalent of missing_value_subfunction.
 
-        # Calculate actual or flags.
-        if (
-            row[contributor_returned_end_date_col]
-            < row[contributor_returned_start_date_col]
-        ):
-            row = _apply_error_flag(row, "E02", da_error_flag_col, target_columns)
-            return row
-        else:
-            row["number_of_days_in_contributors_returned_period"] = (
-                row[contributor_returned_end_date_col]
-                - row[contributor_returned_start_date_col]
-            ).days + 1
+    :param state: The data being processed, updated in place.
+    :param target_columns: The names of the columns to be date_adjusted.
+    :return: The number of rows missing a value in each target column, by column, as for _missing_value_flags.
+    """
+    state.reset_error_flags()
+    state.start_stage()
+    missing_values = {}
+    for col in target_columns:
+        values = pd.Series(state.column(col))
+        blank = (values.astype(object) == ".").to_numpy()
+        missing = values.isna().to_numpy() | blank
+        state.set_column(col, np.full(len(state), np.nan), blank)
+        state.flag(missing, 1)
+        missing_values[col] = int(missing.sum())
+    return missing_values
+
+
+def _primary_wrangler_columns(
+    state: _ColumnarState,
+    weights_index: "_TradingWeightsIndex",
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    equal_weighted_col: str,
+):
+    """
+    Column-wise equivalent of the fix_dates and preliminary_stages row functions of primary_wrangler_subfunction.
 
-            if row[equal_weighted_col] == "Y":
-                row["sum_of_trading_day_weights_over_contributors_returned_period"] = (
-                    row["number_of_days_in_contributors_returned_period"]
-                )
+    :param state: The data being processed, updated in place.
+    :param weights_index: Index of the trading day weight reference data.
+    :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param expected_start_date_col: Name of the column holding the expected period start date.
+    :param expected_end_date_col: Name of the column holding the expected period end date.
+    :param domain_col: Name of the column holding the Domain.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option.
+    """
+    state.start_stage()
+    active = state.active
 
-            else:
-                flagged = 0
-                error_code_number = 0
-                mask = (
-                    (
-                        trading_weights[trading_date_col]
-                        >= row[contributor_returned_start_date_col]
-                    )
-                    & (
-                        trading_weights[trading_date_col]
-                        <= row[contributor_returned_end_date_col]
-                    )
-                    & (trading_weights[trading_domain_col] == row[domain_col])
-                )
+    # Rule 3.1 & 3.2
+    missing_start = active & np.isnat(state.dates(expected_start_date_col))
+    state.flag(missing_start, 14)
+    active &= ~missing_start
 
-                filtered_weights = trading_weights.loc[mask]
+    missing_end = active & np.isnat(state.dates(expected_end_date_col))
+    state.flag(missing_end, 15)
+    active &= ~missing_end
 
-                if (
-                    len(filtered_weights.index)
-                    != row["number_of_days_in_contributors_returned_period"]
-                ):
-                    flagged = 1
-                    error_code_number = 3
-                else:
-                    for _idx, record in filtered_weights.iterrows():
-                        if isinstance(record[trading_weights_col], str):
-                            if not record[trading_weights_col].strip():
-                                flagged = 1
-                                error_code_number = 4
-                            else:
-                                if float(record[trading_weights_col]) < 0:
-                                    flagged = 1
-                                    error_code_number = 5
-                        else:
-                            if pd.isnull(record[trading_weights_col]):
-                                flagged = 1
-                                error_code_number = 4
-                            if record[trading_weights_col] < 0:
-                                flagged = 1
-                                error_code_number = 5
-                if flagged:
-                    row = _apply_error_flag(
-                        row,
-                        "E0" + str(error_code_number),
-                        da_error_flag_col,
-                        target_columns,
-                    )
-                else:
-                    row[
-                        "sum_of_trading_day_weights_over_contributors_returned_period"
-                    ] = filtered_weights[trading_weights_col].sum()
-            return row
+    for returned_col, expected_col in [
+        (contributor_returned_start_date_col, expected_start_date_col),
+        (contributor_returned_end_date_col, expected_end_date_col),
+    ]:
+        blank_dates = active & np.isnat(state.dates(returned_col))
+        state.set_column(returned_col, state.dates(expected_col), blank_dates)
 
-    df_stage_two = _run_apply(working_dataframe, preliminary_stages, da_error_flag_col)
+    # As with _run_apply, no columns are added if every row is already flagged.
+    if not active.any():
+        return
 
-    return df_stage_two
+    # Rule 3.3, 3.4, 3.5, 3.6, 3.7
+    start_dates = state.dates(contributor_returned_start_date_col)
+    end_dates = state.dates(contributor_returned_end_date_col)
+
+    end_before_start = active & (end_dates < start_dates)
+    valid_period = active & ~end_before_start
+
+    days_in_period = np.zeros(len(state), dtype="int64")
+    days_in_period[valid_period] = (
+        end_dates[valid_period] - start_dates[valid_period]
+    ) // np.timedelta64(1, "D") + 1
+
+    sum_of_weights = np.zeros(len(state))
+    equal_weighted = valid_period & state.isin(equal_weighted_col, ["Y"])
+    sum_of_weights[equal_weighted] = days_in_period[equal_weighted]
+
+    weighted = valid_period & ~equal_weighted
+    error_code_numbers = np.zeros(len(state), dtype="int8")
+    if weighted.any():
+        record_count, weight_total, weight_error = weights_index.period_weights(
+            state.column(domain_col)[weighted],
+            start_dates[weighted],
+            end_dates[weighted],
+            days_in_period[weighted],
+        )
+        error_code_numbers[weighted] = np.where(
+            record_count != days_in_period[weighted], 3, weight_error
+        )
+        sum_of_weights[weighted] = weight_total
 
+    # The row by row engine sums weights held as floats to a float, all other values are ints.
+    state.set_column(
+        "sum_of_trading_day_weights_over_contributors_returned_period",
+        sum_of_weights,
+        active,
+        integers=weights_index.integer_weights
+        | ~(weighted & (error_code_numbers == 0)),
+    )
+    state.set_column(
+        "number_of_days_in_contributors_returned_period",
+        days_in_period.astype("float64"),
+        active,
+        integers=True,
+    )
 
-# -------------------------------------------------------------------------------------------------------------
-# SECTION: MIDPOINT SUB-FUNCTION
-# -------------------------------------------------------------------------------------------------------------
+    state.flag(end_before_start, 2)
+    for error_code_number in [3, 4, 5]:
+        state.flag(error_code_numbers == error_code_number, error_code_number)
 
 
-def midpoint_subfunction(
-    df_stage_two: pd.DataFrame,
-    trading_weights: pd.DataFrame,
-    target_columns: List,
+def _midpoint_columns(
+    state: _ColumnarState,
+    weights_index: "_TradingWeightsIndex",
     domain_col: str,
     expected_start_date_col: str,
     expected_end_date_col: str,
@@ -698,202 +4639,359 @@ def midpoint_subfunction(
     set_to_mid_point_col: str,
     equal_weighted_col: str,
     use_calendar_days_col: str,
-    trading_date_col: str,
-    trading_period_start_col: str,
-    trading_period_end_col: str,
-    trading_weights_col: str,
-    trading_domain_col: str,
-    da_error_flag_col: str,
-) -> pd.DataFrame:
+):
     """
-    Applies the midpoint method to the input data.
+    Column-wise equivalent of midpoint_subfunction.
 
-    :param  df_stage_two: The dataframe containing the data as processed to this point.
-    :param  trading_weights: The trading day weight reference data required for processing.
-    :param  target_columns: The names of the columns in the input dataframe to be date_adjusted.
-    :param  domain_col: Name of the column holding the Domain in input_dataframe.
-    :param  set_to_mid_point_col: Name of the column holding the set to midpoint parameter.
-    :param  use_calendar_days_col: Name of the column holding the "use calendar days" option in input_dataframe.
-    :param  equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
-    :param  contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
-    :param  contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
-    :param  expected_start_date_col: Name of the column holding the expected period start date in input_dataframe.
-    :param  expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
-    :param  da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
-    :param  trading_date_col: Name of the column holding the dates in trading_weights.
-    :param  trading_weights_col: Name of the column holding the weights in the trading_weights DataFrame.
-    :param  trading_domain_col: Name of the column holding the domain in the trading_weights DataFrame.
-    :param  trading_period_start_col: Name of the column holding the trading period start date in the trading_weights
-            DataFrame.
-    :param  trading_period_end_col: Name of the column holding the trading period end date in the trading_weights
-            DataFrame.
+    :param state: The data being processed, updated in place.
+    :param weights_index: Index of the trading day weight reference data, including trading periods.
+    :param domain_col: Name of the column holding the Domain.
+    :param expected_start_date_col: Name of the column holding the expected period start date.
+    :param expected_end_date_col: Name of the column holding the expected period end date.
+    :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param set_to_mid_point_col: Name of the column holding the set to midpoint parameter.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option.
+    :param use_calendar_days_col: Name of the column holding the "use calendar days" option.
+    """
+    state.start_stage()
+    active = state.active
+    midpoint_rows = active & state.isin(set_to_mid_point_col, ["Y", "YT"])
+
+    # Flowchart 7a
+    equal_weighted = midpoint_rows & state.isin(equal_weighted_col, ["Y"])
+    state.set_column(
+        set_to_mid_point_col, np.full(len(state), "Y", dtype=object), equal_weighted
+    )
 
-    :raises TypeError: If the input dataframe is not a DataFrame.
-    :raises TypeError: If the target columns parameter is not a List.
-    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe.
-    :raises KeyError: If columns referenced in target_columns parameter cannot be found in the input dataframe.
+    # Flowchart 7b, 7c: Set CRPS to earliest date >= CRPS and CRPE to the latest date <= CRPE with non-zero
+    # weight in same domain, error if there is no such date.
+    trimmed = midpoint_rows & ~equal_weighted
+    domains = state.column(domain_col)
+    for returned_col, find_positive_date in [
+        (contributor_returned_start_date_col, weights_index.next_positive_date),
+        (contributor_returned_end_date_col, weights_index.previous_positive_date),
+    ]:
+        if not trimmed.any():
+            break
+        positive_dates = np.full(len(state), np.datetime64("NaT"), "datetime64[ns]")
+        positive_dates[trimmed] = find_positive_date(
+            domains[trimmed], state.dates(returned_col)[trimmed]
+        )
+        not_found = trimmed & np.isnat(positive_dates)
+        state.set_column(returned_col, positive_dates, trimmed & ~not_found)
+        state.flag(not_found, 12)
+        trimmed &= ~not_found
+        midpoint_rows &= ~not_found
+
+    active = state.active
+    if not active.any():
+        return
+
+    # Calculate midpoint  (Flowchart #8)
+    start_dates = state.dates(contributor_returned_start_date_col)
+    end_dates = state.dates(contributor_returned_end_date_col)
+    midpoint_dates = np.full(len(state), np.datetime64("NaT"), "datetime64[ns]")
+    date_diff = (
+        end_dates[midpoint_rows] - start_dates[midpoint_rows]
+    ) // np.timedelta64(1, "D") + 1
+    # Subtracting 1 from additional days as methodology count the the start date as day one.
+    additional_days = (date_diff + 1) // 2
+    midpoint_dates[midpoint_rows] = start_dates[midpoint_rows] + (
+        additional_days - 1
+    ) * np.timedelta64(1, "D")
+    state.set_column("midpoint_date", midpoint_dates, midpoint_rows)
+
+    # Flowchart #10a
+    changed = midpoint_rows & ~(
+        (state.dates(expected_start_date_col) <= midpoint_dates)
+        & (midpoint_dates <= state.dates(expected_end_date_col))
+    )
+    change_flags = np.where(changed, "C", "").astype(object)
+    state.set_column("date_change_in_return_period_flag", change_flags, midpoint_rows)
+
+    # Flowchart #9
+    expected_period = active & ~changed
+    actual_period = {
+        "actual_period_start_date": np.where(
+            expected_period,
+            state.dates(expected_start_date_col),
+            np.datetime64("NaT"),
+        ),
+        "actual_period_end_date": np.where(
+            expected_period, state.dates(expected_end_date_col), np.datetime64("NaT")
+        ),
+    }
 
-    :return: A dataframe holding data with the midpoint method applied.
+    # Flowchart #10b
+    calendar_month = changed & state.isin(use_calendar_days_col, ["Y"])
+    midpoint_months = midpoint_dates.astype("datetime64[M]")
+    actual_period["actual_period_start_date"][calendar_month] = midpoint_months[
+        calendar_month
+    ]
+    actual_period["actual_period_end_date"][calendar_month] = (
+        midpoint_months[calendar_month] + 1
+    ).astype("datetime64[D]") - 1
 
+    for col_name, period_dates in actual_period.items():
+        state.set_column(col_name, period_dates, expected_period | calendar_month)
+
+    # Flowchart #10c
+    _trading_period_columns(state, weights_index, changed & ~calendar_month, domain_col)
+
+
+def _trading_period_columns(
+    state: _ColumnarState,
+    weights_index: "_TradingWeightsIndex",
+    use_trading_period: np.ndarray,
+    domain_col: str,
+):
     """
+    Sets the actual period start and end dates to the trading period holding the midpoint date (flowchart #10c),
+    joining all rows onto the trading weights index at once.
 
-    # Basic validation checks
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    this_place = sys._getframe().f_code.co_name
-    _basic_input_validation(
-        this_place, input_dataframe=df_stage_two, target_columns=target_columns
-    )
+    :param state: The data being processed, updated in place.
+    :param weights_index: Index of the trading day weight reference data, including trading periods.
+    :param use_trading_period: Boolean mask of the rows to be set from the trading period of their midpoint date.
+    :param domain_col: Name of the column holding the Domain.
+    """
+    if not use_trading_period.any():
+        return
 
-    # Validate required columns are in df_stage_two dataframe
-    required_columns = [
-        domain_col,
-        expected_start_date_col,
-        expected_end_date_col,
-        contributor_returned_start_date_col,
-        contributor_returned_end_date_col,
-        set_to_mid_point_col,
-        equal_weighted_col,
-        use_calendar_days_col,
-        da_error_flag_col,
-    ]
-    _required_column_validation(
-        this_place, "df_stage_two", df_stage_two, required_columns
+    period_starts, period_ends, multiplicity = weights_index.trading_periods(
+        state.column(domain_col)[use_trading_period],
+        state.dates("midpoint_date")[use_trading_period],
     )
 
-    working_dataframe = df_stage_two.copy()
+    # Use midpoint date trading period dates. (Not on flowchart, added in testing.)
+    found = np.zeros(len(state), dtype=bool)
+    found[use_trading_period] = multiplicity == 1
+    for col_name, period_dates in [
+        ("actual_period_start_date", period_starts),
+        ("actual_period_end_date", period_ends),
+    ]:
+        values = np.full(len(state), np.datetime64("NaT"), "datetime64[ns]")
+        values[use_trading_period] = period_dates
+        state.set_column(col_name, values, found)
+
+    # Error if it doesnt exist (or theres a duplicate row). This is normally picked up by E06 but in the case
+    # where a record had the wrong trading period date, there will be one missing, and one extra, which spoofs
+    # the tests for E06.
+    state.flag(use_trading_period & ~found, 13)
+
+
+def _secondary_wrangler_columns(
+    state: _ColumnarState,
+    weights_index: "_TradingWeightsIndex",
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    days_complete: bool = None,
+):
+    """
+    Column-wise equivalent of secondary_wrangler_subfunction.
 
-    def mid_point_process(row):
-        # Rule 3.3, flow chart 11,9: If midpoint not Y or YT, set defaults of APx = EPx.
-        if row[set_to_mid_point_col] in ["Y", "YT"]:
-            if row[equal_weighted_col] == "Y":  # Flowchart 7a
-                row[set_to_mid_point_col] = "Y"
-            else:  # Flowchart 7b
-                # Set CRPS to earliest date >= CRPS with non-zero weight in same domain.
-                non_zero_after_crps = trading_weights[
-                    (trading_weights[trading_weights_col] > 0)
-                    & (
-                        trading_weights[trading_date_col]
-                        >= row[contributor_returned_start_date_col]
-                    )
-                    & (trading_weights[trading_domain_col] == row[domain_col])
-                ].sort_values(by=trading_date_col, ascending=True)
+    :param state: The data being processed, updated in place.
+    :param weights_index: Index of the trading day weight reference data.
+    :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param expected_start_date_col: Name of the column holding the expected period start date.
+    :param expected_end_date_col: Name of the column holding the expected period end date.
+    :param domain_col: Name of the column holding the Domain.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option.
+    :param set_to_mid_point_col: Name of the column holding the "Set to mid-point" option.
+    :param short_period_parameter_col: Name of the column holding the "short period parameter".
+    :param long_period_parameter_col: Name of the column holding the "long period parameter".
+    :param days_complete: Passed to _weights_n_columns.
+    """
+    state.start_stage()
+    active = state.active
 
-                # set CRPS, error if reference df is empty.
-                if len(non_zero_after_crps) > 0:  # Flowchart 7c
-                    min_date_index = non_zero_after_crps[trading_date_col].idxmin()
-                    row[contributor_returned_start_date_col] = non_zero_after_crps.at[
-                        min_date_index, trading_date_col
-                    ]
-                else:
-                    row = _apply_error_flag(
-                        row, "E12", da_error_flag_col, target_columns
-                    )
-                    return row
+    # Rule 3.3, flow chart 12a: If midpoint not YT, set N to APE - APN,
+    #   else 12b: set N to trimmed APE - APN.
+    period_starts = state.dates("actual_period_start_date")
+    period_ends = state.dates("actual_period_end_date")
+    trimmed = active & state.isin(set_to_mid_point_col, ["YT"])
+    if trimmed.any():
+        domains = state.column(domain_col)[trimmed]
+        period_starts = period_starts.copy()
+        period_ends = period_ends.copy()
+        period_starts[trimmed] = weights_index.next_positive_date(
+            domains, period_starts[trimmed]
+        )
+        period_ends[trimmed] = weights_index.previous_positive_date(
+            domains, period_ends[trimmed]
+        )
+    state.set_column(
+        "number_of_days_in_actual_returned_period",
+        _days_between(period_starts, period_ends) + 1,
+        active,
+        integers=True,
+    )
 
-                # CRPE = latest period <= CRPE with non-zero weight
-                non_zero_before_crpe = trading_weights[
-                    (trading_weights[trading_weights_col] > 0)
-                    & (
-                        trading_weights[trading_date_col]
-                        <= row[contributor_returned_end_date_col]
-                    )
-                    & (trading_weights[trading_domain_col] == row[domain_col])
-                ].sort_values(by=trading_date_col, ascending=True)
+    # Rule 5.4,5.5, flow chart 19:
+    state.start_stage()
+    returned_days = state.numbers("number_of_days_in_contributors_returned_period")
+    short_period = np.trunc(state.numbers(short_period_parameter_col))
+    long_period = np.trunc(state.numbers(long_period_parameter_col))
+    length_flags = np.full(len(state), np.nan, dtype=object)
+    length_flags[returned_days < short_period] = "S"
+    length_flags[returned_days > long_period] = "L"
+    length_flags[short_period >= long_period] = "SL"
+    state.set_column(
+        "date_adjustment_length_flag",
+        length_flags,
+        active & pd.notna(length_flags),
+    )
 
-                # set CRPE, error if reference df is empty.
-                if len(non_zero_before_crpe) > 0:  # Not on flowchart, added in testing.
-                    max_date_index = non_zero_before_crpe[trading_date_col].idxmax()
-                    row[contributor_returned_end_date_col] = non_zero_before_crpe.at[
-                        max_date_index, trading_date_col
-                    ]
-                else:
-                    row = _apply_error_flag(
-                        row, "E12", da_error_flag_col, target_columns
-                    )
-                    return row
+    _weights_n_columns(
+        state, weights_index, domain_col, equal_weighted_col, days_complete
+    )
 
-            # Calculate midpoint  (Flowchart #8)
-            date_diff = (
-                row[contributor_returned_end_date_col]
-                - row[contributor_returned_start_date_col]
-            ).days + 1
+    active = state.active
+    latest_start = np.maximum(
+        state.dates(expected_start_date_col),
+        state.dates(contributor_returned_start_date_col),
+    )
+    earliest_end = np.minimum(
+        state.dates(expected_end_date_col),
+        state.dates(contributor_returned_end_date_col),
+    )
+    span = np.maximum(0, _days_between(latest_start, earliest_end) + 1)
+    state.flag(active & state.isin(set_to_mid_point_col, ["N"]) & (span < 1), 9)
 
-            additional_days = int(
-                (date_diff / 2) if date_diff % 2 == 0 else ((date_diff + 1) / 2)
-            )
 
-            # Subtracting 1 from additional days as methodology count the the start date
-            # as day one. (ie they add 20 to 10 and get 29! :)
-            midpoint_date = row[contributor_returned_start_date_col] + timedelta(
-                days=(additional_days - 1)
-            )
+def _weights_n_columns(
+    state: _ColumnarState,
+    weights_index: "_TradingWeightsIndex",
+    domain_col: str,
+    equal_weighted_col: str,
+    days_complete: bool = None,
+):
+    """
+    Column-wise equivalent of the create_weights_n row function of secondary_wrangler_subfunction.
+
+    :param state: The data being processed, updated in place.
+    :param weights_index: Index of the trading day weight reference data.
+    :param domain_col: Name of the column holding the Domain.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option.
+    :param days_complete: Whether every row of the data has a number of days in the actual returned period. If not
+            given, found from the rows of state.
+    """
+    state.start_stage()
+    active = state.active
+    if not active.any():
+        return
+
+    days_in_period = state.numbers("number_of_days_in_actual_returned_period")
+    sum_of_weights = np.zeros(len(state))
+
+    equal_weighted = active & state.isin(equal_weighted_col, ["Y"])
+    sum_of_weights[equal_weighted] = days_in_period[equal_weighted]
+
+    weighted = active & ~equal_weighted
+    error_code_numbers = np.zeros(len(state), dtype="int8")
+    if weighted.any():
+        record_count, weight_total, weight_error = weights_index.period_weights(
+            state.column(domain_col)[weighted],
+            state.dates("actual_period_start_date")[weighted],
+            state.dates("actual_period_end_date")[weighted],
+            days_in_period[weighted],
+        )
+        # Weight m error numbers 4 and 5 become weight n error numbers 7 and 8.
+        error_code_numbers[weighted] = np.where(
+            record_count != days_in_period[weighted],
+            6,
+            np.where(weight_error == 0, 0, weight_error + 3),
+        )
+        sum_of_weights[weighted] = np.where(
+            error_code_numbers[weighted] == 0, weight_total, 0.0
+        )
 
-            row["midpoint_date"] = midpoint_date
-            row["date_change_in_return_period_flag"] = ""
+    # As for weight m, except that equal weighted rows copy the number of days from a column that the row by row
+    # engine holds as floats if any row lacks it.
+    if days_complete is None:
+        days_complete = not np.isnan(days_in_period).any()
+    state.set_column(
+        "sum_of_trading_day_weights_over_actual_returned_period",
+        sum_of_weights,
+        active,
+        integers=np.where(
+            equal_weighted,
+            days_complete,
+            weights_index.integer_weights | (error_code_numbers != 0),
+        ),
+    )
+    for error_code_number in [6, 7, 8]:
+        state.flag(error_code_numbers == error_code_number, error_code_number)
 
-            # Use midpoint date value
-            if not (
-                row[expected_start_date_col]
-                <= midpoint_date
-                <= row[expected_end_date_col]
-            ):
-                # Flowchart #10a
-                row["date_change_in_return_period_flag"] = "C"
-                if row[use_calendar_days_col] == "Y":
-                    # Flowchart #10b
-                    first_day = 1
-                    last_day = monthrange(midpoint_date.year, midpoint_date.month)[1]
-                    row["actual_period_start_date"] = pd.Timestamp(
-                        year=midpoint_date.year,
-                        month=midpoint_date.month,
-                        day=first_day,
-                    )
-                    row["actual_period_end_date"] = pd.Timestamp(
-                        year=midpoint_date.year, month=midpoint_date.month, day=last_day
-                    )
-                else:
-                    # Flowchart #10c
-                    midpoint_data = trading_weights[
-                        (trading_weights[trading_date_col] == midpoint_date)
-                        & (trading_weights[trading_domain_col] == row[domain_col])
-                    ]
-                    # Use midpoint date trading period dates.
-                    if len(midpoint_data) == 1:  # Not on flowchart, added in testing.
-                        row["actual_period_start_date"] = midpoint_data[
-                            trading_period_start_col
-                        ].values[0]
-                        row["actual_period_end_date"] = midpoint_data[
-                            trading_period_end_col
-                        ].values[0]
 
-                    # Error if it doesnt exist (or theres a duplicate row). This is
-                    # normally picked up by E06 but in the case where a record had the
-                    # wrong trading period date, there will be one missing, and one
-                    # extra, which spoofs the tests for E06.
-                    else:
-                        row = _apply_error_flag(
-                            row, "E13", da_error_flag_col, target_columns
-                        )
-                        return row
-                return row  # From flowchart position 10b or 10c
+def _date_adjustment_columns(state: _ColumnarState, target_columns: List):
+    """
+    Column-wise equivalent of date_adjustment_subfunction.
 
-        # Flowchart #9
-        row["actual_period_start_date"] = row[expected_start_date_col]
-        row["actual_period_end_date"] = row[expected_end_date_col]
-        return row  # From flowchart position 9
+    :param state: The data being processed, updated in place.
+    :param target_columns: The names of the columns to be date_adjusted.
+    """
+    state.start_stage()
+    active = state.active
 
-    df_stage_three = _run_apply(working_dataframe, mid_point_process, da_error_flag_col)
+    # SPP83 - AC 3
+    weights_m = state.numbers(
+        "sum_of_trading_day_weights_over_contributors_returned_period"
+    )
+    zero_weights_m = active & (weights_m == 0)
+    state.flag(zero_weights_m, 10)
+    active &= ~zero_weights_m
+
+    # SPP83 - AC 2
+    weights_n = state.numbers("sum_of_trading_day_weights_over_actual_returned_period")
+    zero_weights_n = active & (weights_n == 0)
+    state.flag(zero_weights_n, 11)
+    active &= ~zero_weights_n
+
+    # SPP83 - AC 3: The ratio of each row is broadcast across all its target columns.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = weights_n / weights_m
+        state.set_columns(
+            ["date_adjusted_" + col for col in target_columns],
+            state.number_block(target_columns) * ratio[:, np.newaxis],
+            active,
+        )
 
-    return df_stage_three
 
+def _average_weekly_columns(state: _ColumnarState, average_weekly_questions_list: List):
+    """
+    Column-wise equivalent of average_weekly_subfunction.
 
-# -------------------------------------------------------------------------------------------------------------
-# SECTION: SECONDARY WRANGLER SUB-FUNCTION
-# -------------------------------------------------------------------------------------------------------------
+    :param state: The data being processed, updated in place.
+    :param average_weekly_questions_list: The names of the columns to be processed by the average weekly method.
+    """
+    state.start_stage()
+    active = state.active
+    days_in_period = state.numbers("number_of_days_in_actual_returned_period")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        date_adjusted = state.number_block(
+            ["date_adjusted_" + base_col for base_col in average_weekly_questions_list]
+        )
+        state.set_columns(
+            [
+                "average_weekly_" + base_col
+                for base_col in average_weekly_questions_list
+            ],
+            (7 * date_adjusted) / days_in_period[:, np.newaxis],
+            active,
+        )
 
 
-def secondary_wrangler_subfunction(
-    df_stage_three: pd.DataFrame,
+def _primary_wrangler_vectorized(
+    working_dataframe: pd.DataFrame,
     trading_weights: pd.DataFrame,
     target_columns: List,
     contributor_returned_start_date_col: str,
@@ -902,18 +5000,16 @@ def secondary_wrangler_subfunction(
     expected_end_date_col: str,
     domain_col: str,
     equal_weighted_col: str,
-    set_to_mid_point_col: str,
-    short_period_parameter_col: str,
-    long_period_parameter_col: str,
     da_error_flag_col: str,
-    trading_date_col: str,
     trading_domain_col: str,
+    trading_date_col: str,
     trading_weights_col: str,
+    weights_index: "_TradingWeightsIndex" = None,
 ) -> pd.DataFrame:
     """
-    Prepares the data for further processing by the date adjustment and average weekly methods as required.
+    Runs _primary_wrangler_columns on a dataframe, for primary_wrangler_subfunction.
 
-    :param df_stage_three: The dataframe containing the data as processed to this point.
+    :param working_dataframe: The working copy of the data as processed to this point.
     :param trading_weights: The trading day weight reference data required for processing.
     :param target_columns: The names of the columns in the input dataframe to be date_adjusted.
     :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
@@ -922,316 +5018,209 @@ def secondary_wrangler_subfunction(
     :param expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
     :param domain_col: Name of the column holding the Domain in input_dataframe.
     :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
-    :param short_period_parameter_col: Name of the column holding the "short period parameter" in input_dataframe.
-    :param long_period_parameter_col: Name of the column holding the "long period parameter" in input_dataframe.
-    :param set_to_mid_point_col: Name of the column holding the "Set to mid-point" option in input_dataframe.
     :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
+    :param trading_domain_col: Name of the column holding the domain in trading_weights.
     :param trading_date_col: Name of the column holding the dates in trading_weights.
     :param trading_weights_col: Name of the column holding the weights in trading_weights.
-    :param trading_domain_col: Name of the column holding the domain in trading_weights.
-
-    :raises TypeError: If the input dataframe is not a DataFrame; If the trading weights reference data is not a
-            DataFrame; If the target columns parameter is not a List.
-    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe or the
-            trading weights dataframe as appropriate; If columns referenced in target_columns parameter cannot be
-            found in the input dataframe.
-
-    :return: A dataframe holding data and structure ready to be passed into the midpoint method sub-function.
+    :param weights_index: Index of trading_weights, built here if not supplied.
 
+    :return: The working dataframe with the primary wrangler applied.
     """
-    # Basic validation
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    this_place = sys._getframe().f_code.co_name
-    _basic_input_validation(
-        this_place,
-        input_dataframe=df_stage_three,
-        trading_weights=trading_weights,
-        target_columns=target_columns,
-    )
-
-    # Validate required columns in input_dataframe
-    required_columns = [
+    if weights_index is None:
+        weights_index = _TradingWeightsIndex(
+            trading_weights, trading_domain_col, trading_date_col, trading_weights_col
+        )
+    state = _ColumnarState(working_dataframe, da_error_flag_col, target_columns)
+    _primary_wrangler_columns(
+        state,
+        weights_index,
         contributor_returned_start_date_col,
         contributor_returned_end_date_col,
         expected_start_date_col,
         expected_end_date_col,
-        set_to_mid_point_col,
-        short_period_parameter_col,
-        long_period_parameter_col,
-        da_error_flag_col,
         domain_col,
-    ]
-    _required_column_validation(
-        this_place, "df_stage_three", df_stage_three, required_columns
-    )
-
-    # Validate required columns are in trading_weights dataframe
-    required_columns = [trading_weights_col, trading_date_col, trading_domain_col]
-    _required_column_validation(
-        this_place, "trading_weights", trading_weights, required_columns
-    )
-
-    working_df_1 = df_stage_three.copy()
-
-    # Rule 3.3, flow chart 12a: If midpoint not YT, set N to APE - APN,
-    #   else 12b: set N to trimmed APE - APN.
-    def mid_point_not_equal_yt(row):
-        if row[set_to_mid_point_col] != "YT":
-            row["number_of_days_in_actual_returned_period"] = (
-                row["actual_period_end_date"] - (row["actual_period_start_date"])
-            ).days + 1
-        else:
-            # Set APS to earliest date >= APS with non-zero weight in same domain.
-            non_zero_after_aps = trading_weights[
-                (trading_weights[trading_weights_col] > 0)
-                & (trading_weights[trading_date_col] >= row["actual_period_start_date"])
-                & (trading_weights[trading_domain_col] == row[domain_col])
-            ].sort_values(by=trading_date_col, ascending=True)
-
-            # set APS as weights will always exist due to earlier checks.
-            min_date_index = non_zero_after_aps[trading_date_col].idxmin()
-            aps = non_zero_after_aps.at[min_date_index, trading_date_col]
-
-            # APE = latest period <= APE with non-zero weight
-            non_zero_before_ape = trading_weights[
-                (trading_weights[trading_weights_col] > 0)
-                & (trading_weights[trading_date_col] <= row["actual_period_end_date"])
-                & (trading_weights[trading_domain_col] == row[domain_col])
-            ].sort_values(by=trading_date_col, ascending=True)
-
-            # set APE as weights will always exist due to earlier checks.
-            max_date_index = non_zero_before_ape[trading_date_col].idxmax()
-            ape = non_zero_before_ape.at[max_date_index, trading_date_col]
-
-            # Set N using trimmed APS and APE.
-            row["number_of_days_in_actual_returned_period"] = (ape - aps).days + 1
-
-        return row
-
-    working_dataframe_2 = _run_apply(
-        working_df_1, mid_point_not_equal_yt, da_error_flag_col
-    )
-
-    # Rule 5.4,5.5, flow chart 19:
-    def short_and_long_parameter_validation(row):
-        # 5.4 If less than short period parameter, mark length flag as 'S'
-        if row["number_of_days_in_contributors_returned_period"] < int(
-            row[short_period_parameter_col]
-        ):
-            row["date_adjustment_length_flag"] = "S"
-        # 5.5 If greater than Long period parameter, mark length flag as 'L'
-        if row["number_of_days_in_contributors_returned_period"] > int(
-            row[long_period_parameter_col]
-        ):
-            row["date_adjustment_length_flag"] = "L"
-        # 5.4,5.5 If params wrong way round, output 'SL' to flag.
-        if int(row[short_period_parameter_col]) >= int(row[long_period_parameter_col]):
-            row["date_adjustment_length_flag"] = "SL"
-        return row
-
-    working_dataframe_3 = _run_apply(
-        working_dataframe_2, short_and_long_parameter_validation, da_error_flag_col
+        equal_weighted_col,
     )
+    return state.to_dataframe()
 
-    def create_weights_n(row):
-        if row[equal_weighted_col] == "Y":
-            row["sum_of_trading_day_weights_over_actual_returned_period"] = row[
-                "number_of_days_in_actual_returned_period"
-            ]
-        else:
-            flagged = 0
-            error_code_number = 0
-            mask = (
-                (trading_weights[trading_date_col] >= row["actual_period_start_date"])
-                & (trading_weights[trading_date_col] <= row["actual_period_end_date"])
-                & (trading_weights[trading_domain_col] == row[domain_col])
-            )
-            filtered_weights = trading_weights.loc[mask]
-
-            if (
-                len(filtered_weights.index)
-                != row["number_of_days_in_actual_returned_period"]
-            ):
-                flagged = 1
-                error_code_number = 6
-            else:
-                for _idx, record in filtered_weights.iterrows():
-                    if isinstance(record[trading_weights_col], str):
-                        if not record[trading_weights_col].strip():
-                            flagged = 1
-                            error_code_number = 7
-                        else:
-                            if float(record[trading_weights_col]) < 0:
-                                flagged = 1
-                                error_code_number = 8
-                    else:
-                        if pd.isnull(record[trading_weights_col]):
-                            flagged = 1
-                            error_code_number = 7
-                        if record[trading_weights_col] < 0:
-                            flagged = 1
-                            error_code_number = 8
-            if flagged:
-                row["sum_of_trading_day_weights_over_actual_returned_period"] = 0
-                row = _apply_error_flag(
-                    row,
-                    "E0" + str(error_code_number),
-                    da_error_flag_col,
-                    target_columns,
-                )
-
-            else:
-                row["sum_of_trading_day_weights_over_actual_returned_period"] = (
-                    filtered_weights[trading_weights_col].sum()
-                )
-        return row
-
-    working_dataframe_4 = _run_apply(
-        working_dataframe_3, create_weights_n, da_error_flag_col
-    )
 
-    def span_overlap_less_than_one_day(row):
-        latest_start = max(
-            row[expected_start_date_col], row[contributor_returned_start_date_col]
-        )
-        earliest_end = min(
-            row[expected_end_date_col], row[contributor_returned_end_date_col]
-        )
-        delta = (earliest_end - latest_start).days + 1
-        span = max(0, delta)
+def _midpoint_vectorized(
+    working_dataframe: pd.DataFrame,
+    weights_index: "_TradingWeightsIndex",
+    target_columns: List,
+    domain_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    set_to_mid_point_col: str,
+    equal_weighted_col: str,
+    use_calendar_days_col: str,
+    da_error_flag_col: str,
+) -> pd.DataFrame:
+    """
+    Runs _midpoint_columns on a dataframe, for midpoint_subfunction.
 
-        if row[set_to_mid_point_col] == "N":
-            if span < 1:
-                row = _apply_error_flag(row, "E09", da_error_flag_col, target_columns)
-        return row
+    :param working_dataframe: The working copy of the data as processed to this point.
+    :param weights_index: Index of the trading day weight reference data, including trading periods.
+    :param target_columns: The names of the columns in the input dataframe to be date_adjusted.
+    :param domain_col: Name of the column holding the Domain in input_dataframe.
+    :param expected_start_date_col: Name of the column holding the expected period start date in input_dataframe.
+    :param expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
+    :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param set_to_mid_point_col: Name of the column holding the set to midpoint parameter.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
+    :param use_calendar_days_col: Name of the column holding the "use calendar days" option in input_dataframe.
+    :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
 
-    df_stage_four = _run_apply(
-        working_dataframe_4, span_overlap_less_than_one_day, da_error_flag_col
+    :return: The working dataframe with the midpoint method applied.
+    """
+    state = _ColumnarState(working_dataframe, da_error_flag_col, target_columns)
+    _midpoint_columns(
+        state,
+        weights_index,
+        domain_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        set_to_mid_point_col,
+        equal_weighted_col,
+        use_calendar_days_col,
     )
-
-    return df_stage_four
-
-
-# -------------------------------------------------------------------------------------------------------------
-# SECTION: DATE ADJUSTMENT SUB-FUNCTION
-# -------------------------------------------------------------------------------------------------------------
+    return state.to_dataframe()
 
 
-def date_adjustment_subfunction(
-    df_stage_four: pd.DataFrame, target_columns: List, da_error_flag_col: str
+def _secondary_wrangler_vectorized(
+    working_dataframe: pd.DataFrame,
+    weights_index: "_TradingWeightsIndex",
+    target_columns: List,
+    contributor_returned_start_date_col: str,
+    contributor_returned_end_date_col: str,
+    expected_start_date_col: str,
+    expected_end_date_col: str,
+    domain_col: str,
+    equal_weighted_col: str,
+    set_to_mid_point_col: str,
+    short_period_parameter_col: str,
+    long_period_parameter_col: str,
+    da_error_flag_col: str,
 ) -> pd.DataFrame:
     """
-    Prepares the data for further processing by the date adjustment and average weekly methods as required.
+    Runs _secondary_wrangler_columns on a dataframe, for secondary_wrangler_subfunction.
 
-    :param df_stage_four: The dataframe containing the data as processed to this point.
+    :param working_dataframe: The working copy of the data as processed to this point.
+    :param weights_index: Index of the trading day weight reference data.
     :param target_columns: The names of the columns in the input dataframe to be date_adjusted.
+    :param contributor_returned_start_date_col: Name of the column holding the contributors returned period start date.
+    :param contributor_returned_end_date_col: Name of the column holding the contributors returned period end date.
+    :param expected_start_date_col: Name of the column holding the expected period start date in input_dataframe.
+    :param expected_end_date_col: Name of the column holding the expected period end date in input_dataframe.
+    :param domain_col: Name of the column holding the Domain in input_dataframe.
+    :param equal_weighted_col: Name of the column holding the "Set to equal weighted" option in input_dataframe.
+    :param set_to_mid_point_col: Name of the column holding the "Set to mid-point" option in input_dataframe.
+    :param short_period_parameter_col: Name of the column holding the "short period parameter" in input_dataframe.
+    :param long_period_parameter_col: Name of the column holding the "long period parameter" in input_dataframe.
     :param da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
 
-    :raises TypeError: If the input dataframe is not a DataFrame; If the target columns parameter is not a List.
-    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe; If
-            columns referenced in target_columns parameter cannot be found in the input dataframe.
-
-    :return: A dataframe holding data with the date adjustment method applied.
-
+    :return: The working dataframe with the secondary wrangler applied.
     """
-
-    # Basic validation
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    this_place = sys._getframe().f_code.co_name
-    _basic_input_validation(
-        this_place, input_dataframe=df_stage_four, target_columns=target_columns
-    )
-
-    # Validate required columns in input_dataframe
-    required_columns = [
-        "sum_of_trading_day_weights_over_contributors_returned_period",
-        "sum_of_trading_day_weights_over_actual_returned_period",
-    ]
-    _required_column_validation(
-        this_place, "df_stage_four", df_stage_four, required_columns
+    state = _ColumnarState(working_dataframe, da_error_flag_col, target_columns)
+    _secondary_wrangler_columns(
+        state,
+        weights_index,
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
     )
-
-    def da_method(row):
-        # SPP83 - AC 3
-        if row["sum_of_trading_day_weights_over_contributors_returned_period"] == 0:
-            row = _apply_error_flag(row, "E10", da_error_flag_col, target_columns)
-            return row
-
-        # SPP83 - AC 2
-        if row["sum_of_trading_day_weights_over_actual_returned_period"] == 0:
-            row = _apply_error_flag(row, "E11", da_error_flag_col, target_columns)
-            return row
-
-        # SPP83 - AC 3
-        for col in target_columns:
-            da_col_name = "date_adjusted_" + col
-            row[da_col_name] = row[col] * (
-                row["sum_of_trading_day_weights_over_actual_returned_period"]
-                / row["sum_of_trading_day_weights_over_contributors_returned_period"]
-            )
-        return row
-
-    df_stage_five = _run_apply(df_stage_four, da_method, da_error_flag_col)
-
-    return df_stage_five
-
-
-# -------------------------------------------------------------------------------------------------------------
-# SECTION: AVERAGE WEEKLY SUB-FUNCTION
-# -------------------------------------------------------------------------------------------------------------
+    return state.to_dataframe()
 
 
-def average_weekly_subfunction(
-    df_stage_five: pd.DataFrame,
-    average_weekly_questions_list: List,
-    da_error_flag_col: str,
-) -> pd.DataFrame:
+def _datetime64_array(dates) -> np.ndarray:
     """
-    Applies the average weekly method to the input data.
+    :param dates: Array-like of dates, which may include NaT.
+    :return: The dates as a datetime64[ns] array.
+    """
+    if isinstance(dates, np.ndarray) and dates.dtype == "datetime64[ns]":
+        return dates
+    return pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]")
 
-    :param  df_stage_five: The dataframe containing the data as processed to this point.
-    :param  average_weekly_questions_list: The names of the columns in the input dataframe to be processed by the
-            average weekly method.
-    :param  da_error_flag_col: Name of the column that the user wishes the error flag column to be called in the output.
 
-    :raises TypeError: If the input dataframe is not a DataFrame; If the average weekly questions list parameter is
-            not a List.
-    :raises KeyError: If required columns referenced in the parameters cannot be found in the input dataframe; If
-            columns referenced in average_weekly_questions_list parameter cannot be found in the input dataframe.
+def _days_between(start_dates: np.ndarray, end_dates: np.ndarray) -> np.ndarray:
+    """
+    :param start_dates: datetime64 dates.
+    :param end_dates: datetime64 dates.
+    :return: The whole number of days from each start date to each end date as floats, nan where either is NaT.
+    """
+    return np.floor((end_dates - start_dates) / np.timedelta64(1, "D"))
 
-    :return: A dataframe holding data with the average weekly method applied.
 
+def _null_array(dtype: np.dtype, length: int) -> np.ndarray:
     """
+    :param dtype: The dtype of the values to be held.
+    :param length: The length of the array.
+    :return: An array of nulls able to hold values of dtype (NaT for dates, nan for numbers, otherwise nan objects).
+    """
+    if dtype.kind == "M":
+        return np.full(length, np.datetime64("NaT"), "datetime64[ns]")
+    if dtype.kind in "biuf":
+        return np.full(length, np.nan)
+    return np.full(length, np.nan, dtype=object)
 
-    # Basic validation
-    # noinspection PyProtectedMember,PyUnresolvedReferences
-    this_place = sys._getframe().f_code.co_name
-    _basic_input_validation(
-        this_place,
-        input_dataframe=df_stage_five,
-        target_columns=average_weekly_questions_list,
-    )
 
-    # Validate required columns in input_dataframe
-    required_columns = average_weekly_questions_list.copy()
-    _required_column_validation(
-        this_place, "df_stage_five", df_stage_five, required_columns
-    )
+def _inferred_dtypes(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    :param dataframe: The dataframe to be changed in place.
+    :return: The dataframe with each column not of a numpy number or date dtype given the dtype DataFrame.apply infers
+            from its values, so that, for example, strings become object, a column of nulls becomes float64 and a
+            date column holding only NaT becomes object.
+    """
+    for col_name in dataframe.columns:
+        dtype = dataframe[col_name].dtype
+        if not (isinstance(dtype, np.dtype) and dtype.kind in "biufcmM") or (
+            dtype.kind == "M" and dataframe[col_name].isna().all()
+        ):
+            dataframe[col_name] = dataframe[col_name].astype(object).infer_objects()
+    return dataframe
 
-    # Apply average weekly to average_weekly_questions_list, if any.
 
-    def set_average_weekly(row):
-        for base_col in average_weekly_questions_list:
-            source_col = "date_adjusted_" + base_col
-            new_col = "average_weekly_" + base_col
-            row[new_col] = (7 * row[source_col]) / row[
-                "number_of_days_in_actual_returned_period"
-            ]
-        return row
+def _trading_weight_values(weights: pd.Series) -> tuple:
+    """
+    Converts trading weights to floats, classifying each weight in the same way as the row by row method.
 
-    df_stage_six = _run_apply(df_stage_five, set_average_weekly, da_error_flag_col)
+    :param weights: The trading weights, which may hold numbers or strings.
 
-    return df_stage_six
+    :return: Arrays holding the float weight values (nan if null, blank or unparsable), an error code number for
+            each weight (0 if valid, 4 if null or blank, 5 if negative) and whether each weight is a string that
+            cannot be converted to a number.
+    """
+    weight_values = np.full(len(weights), np.nan)
+    weight_errors = np.zeros(len(weights), dtype="int8")
+    unparsable = np.zeros(len(weights), dtype=bool)
+    for position, weight in enumerate(weights.to_numpy(dtype=object)):
+        if isinstance(weight, str):
+            if not weight.strip():
+                weight_errors[position] = 4
+                continue
+            try:
+                weight = float(weight)
+            except ValueError:
+                unparsable[position] = True
+                continue
+        elif pd.isnull(weight):
+            weight_errors[position] = 4
+            continue
+        weight_values[position] = weight
+        if weight < 0:
+            weight_errors[position] = 5
+    return weight_values, weight_errors, unparsable
 
 
 # -------------------------------------------------------------------------------------------------------------
@@ -1295,11 +5284,10 @@ def _basic_input_validation(
 
     # Validate trading_weights is a dataframe
     if trading_weights is not None:
-        if not isinstance(trading_weights, pd.DataFrame):
+        if not isinstance(trading_weights, (pd.DataFrame, TradingWeights)):
             msg = 'Param "trading_weights" for function ' + this_place + " "
-            msg += (
-                "should be of type DataFrame, not " + str(type(trading_weights)) + "."
-            )
+            msg += "should be of type DataFrame or TradingWeights, not "
+            msg += str(type(trading_weights)) + "."
             raise TypeError(msg)
 
     return "OK"
@@ -1367,6 +5355,107 @@ def _required_column_validation(
     return "OK"
 
 
+def _engine_validation(this_place: str, engine: str) -> str:
+    """
+    :param this_place:
+    :param engine:
+
+    :raises ValueError
+
+    :returns str
+
+    """
+    if engine not in ["row", "vectorized"]:
+        msg = 'Param "engine" for function ' + this_place + " "
+        msg += 'should be one of "row" or "vectorized", not ' + str(engine) + "."
+        raise ValueError(msg)
+
+    return "OK"
+
+
+def _n_jobs_validation(this_place: str, n_jobs: int) -> str:
+    """
+    :param this_place:
+    :param n_jobs:
+
+    :raises ValueError
+
+    :returns str
+
+    """
+    if (
+        isinstance(n_jobs, bool)
+        or not isinstance(n_jobs, int)
+        or not (n_jobs >= 1 or n_jobs == -1)
+    ):
+        msg = 'Param "n_jobs" for function ' + this_place + " "
+        msg += "should be a positive integer or -1, not " + str(n_jobs) + "."
+        raise ValueError(msg)
+
+    return "OK"
+
+
+def _period_cache_validation(
+    this_place: str, period_cache: "PeriodCache", engine: str
+) -> str:
+    """
+    :param this_place:
+    :param period_cache:
+    :param engine:
+
+    :raises TypeError
+    :raises ValueError
+
+    :returns str
+
+    """
+    if period_cache is None:
+        return "OK"
+    if not isinstance(period_cache, PeriodCache):
+        msg = 'Param "period_cache" for function ' + this_place + " "
+        msg += "should be a PeriodCache, not " + type(period_cache).__name__ + "."
+        raise TypeError(msg)
+    if engine != "vectorized":
+        msg = 'Param "period_cache" for function ' + this_place + " "
+        msg += 'can only be used with engine="vectorized", the row engine calculates every row.'
+        raise ValueError(msg)
+
+    return "OK"
+
+
+def _output_columns_validation(
+    this_place: str, output_columns: List, target_columns: List
+) -> str:
+    """
+    :param this_place:
+    :param output_columns:
+    :param target_columns:
+
+    :raises TypeError
+    :raises ValueError
+
+    :returns str
+
+    """
+    if output_columns is None:
+        return "OK"
+    if not isinstance(output_columns, list):
+        msg = 'Param "output_columns" for function ' + this_place + " "
+        msg += "should be of type List, not " + str(type(output_columns)) + "."
+        raise TypeError(msg)
+
+    unknown_columns = [
+        col for col in output_columns if col not in _added_columns(target_columns)
+    ]
+    if unknown_columns:
+        msg = 'Param "output_columns" for function ' + this_place + " "
+        msg += "holds columns that are not added by the method: "
+        msg += ", ".join(str(col) for col in unknown_columns) + "."
+        raise ValueError(msg)
+
+    return "OK"
+
+
 def _run_apply(
     input_df: pd.DataFrame, function_to_apply: any, da_error_flag_col: str
 ) -> pd.DataFrame:
@@ -1378,11 +5467,10 @@ def _run_apply(
     :returns DataFrame that results from function application:
     """
 
-    error_code_list = _generate_error_code_list()
     output_df = input_df.apply(
         lambda row: (
             function_to_apply(row)
-            if row[da_error_flag_col] not in error_code_list
+            if not _is_error_code(row[da_error_flag_col])
             else row
         ),
         axis=1,
@@ -1402,36 +5490,24 @@ def _apply_error_flag(
     :rtype Series:
     """
     row_cols = row.index.values
-    error_code_list = _generate_error_code_list()
     # Validate error code.
-    if error_code not in error_code_list:
-        msg = 'Error code "' + str(error_code) + '" not found in error_code_list.'
+    if not _is_error_code(error_code):
+        msg = 'Error code "' + str(error_code) + '" not found in ErrorCode.'
         raise KeyError(msg)
 
     # Set error code into correct column
     row[da_error_flag_col] = error_code
 
-    # Set columns listed in zero_cols to 0 if they exist
-    zero_cols = [
-        "number_of_days_in_contributors_returned_period",
-        "sum_of_trading_day_weights_over_contributors_returned_period",
-        "sum_of_trading_day_weights_over_actual_returned_period",
-    ]
-
-    for col_name in zero_cols:
+    # Set columns zeroed by the error code to 0 if they exist
+    for col_name in ErrorCode[error_code].zeroed_columns:
         if col_name in row_cols:
             row[col_name] = 0
 
-    # Set columns listed in target_columns to nan
-    for col in target_columns:
-        # NB: We nullify output data if it exists.
-        #     The users need to refer to the data in the target column itself.
-        temp_name_1 = "date_adjusted_" + col
-        if temp_name_1 in row_cols:
-            row[temp_name_1] = np.nan
-        temp_name_2 = "average_weekly_" + col
-        if temp_name_2 in row_cols:
-            row[temp_name_2] = np.nan
+    # NB: We nullify output data if it exists.
+    #     The users need to refer to the data in the target column itself.
+    for col_name in ErrorCode[error_code].nulled_columns(target_columns):
+        if col_name in row_cols:
+            row[col_name] = np.nan
     return row
 
 
@@ -1439,57 +5515,224 @@ def _generate_error_code_list() -> List:
     """
     :return: List
     """
-    error_code_list = []
-    for x in range(0, 16):
-        error_code_list.append("E" + str(x).zfill(2))
-    return error_code_list
+    return [error_code.code for error_code in ErrorCode]
 
 
-def _set_dtypes(df, dtype_dict, target_columns=tuple()):
+def _is_error_code(value: any) -> bool:
     """
-    :param df:
-    :param dtype_dict:
-    :param target_columns:
-    :rtype: DataFrame
+    :param value: A value from the error flag column.
+    :return: True if the value is one of the error codes.
     """
+    try:
+        return value in _ERROR_CODES
+    except TypeError:
+        # Unhashable values cannot be error codes.
+        return False
 
-    if not isinstance(dtype_dict, dict):
-        raise TypeError("dtype_dict is not a dict so _set_dtypes function cannot run.")
 
-    # Check dtypes and change where necessary
-    col_names = df.columns.tolist()
+class _DtypeSchema:
+    """
+    The dtypes the columns of a date_adjustment input or trading weights dataframe are coerced to, compiled from a
+    dtype dict into one conversion per column so that a dataframe can be coerced in a single pass.
 
-    key = "?"
-    try:
-        for key, val in dtype_dict.items():
-            if key in col_names:
-                if df[key].dtype != val:
-                    if val == "datetime64[ns]":
-                        df[key] = pd.to_datetime(
-                            df[key], format="%Y%m%d", errors="coerce"
-                        )
-                    elif val in ["int64", "float64"]:
-                        df[key] = pd.to_numeric(df[key], errors="coerce")
-                    else:
-                        df = df.astype({key: val})
-    except ValueError as err:
-        raise ValueError("Could not process " + str(key) + ", " + str(err))
+    Columns that already have the required dtype are skipped, so coercing a dataframe a second time is cheap.
+    """
 
-    try:
-        for key, val in dtype_dict.items():
-            if key in col_names:
-                if key in dtype_dict["domain_col_list"]:
-                    df[key] = df[key].astype("string")
-    except ValueError as err:
-        raise ValueError("Could not stringify " + str(key) + ", " + str(err))
+    # Kinds of conversion, by the dtype they produce.
+    _DATETIME = "datetime"
+    _NUMERIC = "numeric"
+    _STRING = "string"
+    _ASTYPE = "astype"
+
+    def __init__(self, dtype_dict: dict, target_columns=tuple()):
+        """
+        :param dtype_dict: The dtype of each column by name, with the names of the domain columns, which are
+                converted to strings, under "domain_col_list".
+        :param target_columns: The names of the columns to be converted to float64.
+
+        :raises TypeError: If dtype_dict is not a dict.
+        """
+        if not isinstance(dtype_dict, dict):
+            raise TypeError(
+                "dtype_dict is not a dict so _set_dtypes function cannot run."
+            )
 
-    col = "?"
-    try:
+        domain_col_list = dtype_dict.get("domain_col_list", [])
+        self.conversions = {}
+        for key, val in dtype_dict.items():
+            if key == "domain_col_list":
+                continue
+            if key in domain_col_list:
+                self.conversions[key] = (self._STRING, "string")
+            elif val == "datetime64[ns]":
+                self.conversions[key] = (self._DATETIME, val)
+            elif val in ["int64", "float64"]:
+                self.conversions[key] = (self._NUMERIC, val)
+            else:
+                self.conversions[key] = (self._ASTYPE, val)
         for col in target_columns:
-            if col in col_names:
-                if df[col].dtype != "float64":
-                    df[col] = pd.to_numeric(df[col], errors="coerce")
-    except ValueError as err:
-        raise ValueError("Could not process " + str(col) + ", " + str(err))
+            self.conversions.setdefault(col, (self._NUMERIC, "float64"))
+
+    def coerce(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        :param df: The dataframe to coerce, which has its columns replaced where they need converting.
+
+        :raises ValueError: If a column cannot be converted.
+
+        :return: The dataframe with the schema dtypes set on the columns of it in the schema.
+        """
+        for col in df.columns.intersection(list(self.conversions)):
+            kind, dtype = self.conversions[col]
+            values = df[col]
+            if values.dtype == dtype:
+                continue
+            try:
+                if kind == self._DATETIME:
+                    df[col] = _parse_dates(values)
+                elif kind == self._NUMERIC:
+                    df[col] = pd.to_numeric(values, errors="coerce")
+                else:
+                    df[col] = values.astype(dtype)
+            except ValueError as err:
+                verb = "stringify " if kind == self._STRING else "process "
+                raise ValueError("Could not " + verb + str(col) + ", " + str(err))
+        return df
+
 
-    return df
+class _DateParseCache:
+    """
+    Memo of parsed YYYYMMDD dates keyed by raw value. The dates in the inputs are drawn from a small set of
+    distinct values, so each is parsed once however many rows and calls it appears in.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        """
+        :param maxsize: The most distinct values to hold, values beyond this are parsed but not held.
+        """
+        self.maxsize = maxsize
+        self.clear()
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters.
+        """
+        self.dates = {}
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> dict:
+        """
+        :return: The number of distinct values found in the cache (hits) and parsed (misses) so far, and the
+                number of values held.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.dates)}
+
+    def parse(self, values: pd.Series) -> pd.Series:
+        """
+        :param values: The dates to parse, as strings or integers, or already parsed.
+        :return: The dates as datetime64[ns], with NaT where a value is missing or not a valid date.
+        """
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return pd.to_datetime(values, errors="coerce")
+
+        codes, uniques = pd.factorize(values)
+        parsed = self._parse_uniques(uniques)
+        # Missing values have code -1, which takes the NaT appended to the end.
+        parsed = np.append(parsed, np.datetime64("NaT", "ns"))
+        return pd.Series(parsed[codes], index=values.index, name=values.name)
+
+    def parse_one(self, value: any) -> pd.Timestamp:
+        """
+        :param value: The date to parse, as a string or integer, or already parsed.
+        :return: The date, NaT if it is missing or not a valid date.
+        """
+        if pd.isna(value):
+            return pd.NaT
+        if isinstance(value, (pd.Timestamp, np.datetime64)):
+            return pd.to_datetime(value)
+        try:
+            return pd.Timestamp(self._parse_uniques([value])[0])
+        except TypeError:
+            # Unhashable values cannot be cached.
+            return pd.to_datetime(value, format="%Y%m%d", errors="coerce")
+
+    def _parse_uniques(self, uniques) -> np.ndarray:
+        """
+        :param uniques: Distinct raw date values, none of them missing.
+        :return: The parsed dates, in the same order.
+        """
+        parsed = np.empty(len(uniques), dtype="datetime64[ns]")
+        missed = []
+        for position, value in enumerate(uniques):
+            date = self.dates.get(value)
+            if date is None:
+                missed.append(position)
+            else:
+                parsed[position] = date
+        self.hits += len(uniques) - len(missed)
+        self.misses += len(missed)
+
+        if missed:
+            missed_values = pd.Series(uniques).take(missed)
+            missed_dates = pd.to_datetime(
+                missed_values, format="%Y%m%d", errors="coerce"
+            ).to_numpy("datetime64[ns]")
+            parsed[missed] = missed_dates
+            room = self.maxsize - len(self.dates)
+            self.dates.update(zip(missed_values.iloc[:room], missed_dates[:room]))
+        return parsed
+
+
+_DATE_PARSE_CACHE = _DateParseCache()
+
+
+def date_parse_cache_info() -> dict:
+    """
+    Counters of the cache used when date_adjustment parses YYYYMMDD dates, for instrumentation. Each process has
+    its own cache, so runs with n_jobs > 1 parse in their worker processes and are not counted here.
+
+    :return: The number of distinct date values found in the cache (hits) and parsed (misses) since it was last
+            cleared, and the number of values held ("size").
+    """
+    return _DATE_PARSE_CACHE.info()
+
+
+def clear_date_parse_cache():
+    """
+    Empties the cache used when date_adjustment parses YYYYMMDD dates and resets its counters.
+    """
+    _DATE_PARSE_CACHE.clear()
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """
+    :param values: The dates to parse, as strings or integers, or already parsed.
+    :return: The dates as datetime64[ns], with NaT where a value is missing or not a valid date.
+    """
+    return _DATE_PARSE_CACHE.parse(values)
+
+
+def _shared_domain_categories(
+    domains: pd.Series, weight_domains: pd.Series
+) -> pd.Series:
+    """
+    :param domains: The domains of the input data.
+    :param weight_domains: The domains of the trading weights, as a categorical.
+    :return: The input domains as a categorical with the categories of the trading weights domains, followed by any
+            domains without trading weights, so that a domain has the same code in both.
+    """
+    weight_categories = weight_domains.cat.categories
+    extra_categories = pd.Index(domains.dropna().unique()).difference(weight_categories)
+    return domains.astype(
+        pd.CategoricalDtype(weight_categories.append(extra_categories))
+    )
+
+
+def _set_dtypes(df, dtype_dict, target_columns=tuple()):
+    """
+    :param df: The dataframe to set the dtypes of.
+    :param dtype_dict: The dtypes to set, as described for _DtypeSchema.
+    :param target_columns: The names of the columns to be converted to float64.
+    :rtype: DataFrame
+    """
+    return _DtypeSchema(dtype_dict, target_columns).coerce(df)
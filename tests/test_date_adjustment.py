@@ -1,22 +1,38 @@
 import calendar as cal
-from unittest import TestCase
+import os
+import pickle
+import tempfile
+from importlib.util import find_spec
+from unittest import TestCase, skipIf
 
 import numpy as np
 import pandas as pd
 
 # noinspection PyProtectedMember
 from sml_small.date_adjustment import (
+    DateAdjustmentStats,
+    ErrorCode,
+    PeriodCache,
+    TradingWeights,
     _convert_question_string_to_list,
     _generate_error_code_list,
     _set_dtypes,
+    _shared_domain_categories,
     average_weekly_subfunction,
+    clear_date_parse_cache,
     date_adjustment,
+    date_adjustment_chunks,
+    date_adjustment_incremental,
     date_adjustment_subfunction,
+    date_parse_cache_info,
     generate_average_weekly_questions,
     midpoint_subfunction,
     missing_value_subfunction,
     primary_wrangler_subfunction,
+    read_date_adjustment_input_parquet,
+    read_trading_weights_parquet,
     secondary_wrangler_subfunction,
+    write_date_adjustment_parquet,
 )
 
 pd.options.mode.chained_assignment = None
@@ -92,6 +108,11 @@ def load_csv(filepath):
     return df
 
 
+def assert_engines_match(row_output, vectorized_output):
+    # Both engines must give the same columns, in the same order, with the same dtypes.
+    pd.testing.assert_frame_equal(row_output, vectorized_output)
+
+
 fxt = "fixtures/date_adjustment"
 trading_weights = load_csv(f"{fxt}/da_trading_weights_data.csv")
 
@@ -1018,209 +1039,54 @@ class TestDateAdjustment(TestCase):
             err_msg = "Error code " + str(code) + " not tested by data."
             assert code in error_list, err_msg
 
-
-# ---------------------------------------------------------------------------------------
-# TESTS: GENERATE AVERAGE WEEKLY QUESTION LIST SUB-FUNCTION
-# ---------------------------------------------------------------------------------------
-
-
-class TestGenerateAverageWeeklyQuestions(TestCase):
-    # --- Test fails with type error if no input. ---
-
-    # noinspection PyArgumentList
-    def test_failure_on_no_input(self):
-        with self.assertRaises(TypeError):
-            generate_average_weekly_questions()
-
-    # --- Test type validation on the input strings ---
-
-    # noinspection PyMethodMayBeStatic
-    def test_validate_average_weekly_param(self):
-        empty_df = pd.DataFrame.empty
-        for test_param in ["X", 20, {"Q20": 20}, ["Not a string"], empty_df]:
-            ret_val = generate_average_weekly_questions(test_param, target_columns)
-            assert ret_val == "ERROR: invalid average_weekly parameter contents."
-
-    # --- Test type validation on the target column lists(s) ---
-
-    # noinspection PyMethodMayBeStatic
-    def test_validate_target_columns_param(self):
-        with self.assertRaises(TypeError):
-            # noinspection PyTypeChecker
-            generate_average_weekly_questions("A", "Not a list")
-
-    # --- Test if output is a List ---
-
-    # noinspection PyMethodMayBeStatic
-    def test_output_is_list(self):
-        ret_val = generate_average_weekly_questions("A", target_columns)
-        assert isinstance(ret_val, list)
-
-    # --- Test if output contents is as expected ---
-
-    # noinspection PyMethodMayBeStatic
-    def test_output_for_A(self):
-        ret_val = generate_average_weekly_questions("A", target_columns)
-        assert ret_val == target_columns
-
-    # noinspection PyMethodMayBeStatic
-    def test_output_for_N(self):
-        ret_val = generate_average_weekly_questions("N", target_columns)
-        assert ret_val == []
-
-    # noinspection PyMethodMayBeStatic
-    def test_output_for_question_strings(self):
-        check_list = []
-        df_loc = f"{fxt}/"
-        df_loc += "da_validate_average_weekly_param_subfunction.csv"
-        aw_param_test_df = load_csv(df_loc)
-        for index, row in aw_param_test_df.iterrows():
-            test_string = row["test_input"]
-            ret_val = generate_average_weekly_questions(test_string, target_columns)
-            if row["expected_output"] == "ERROR":
-                check_list.append("A")
-                assert ret_val[:5] == "ERROR"
-            if row["expected_output"] != "ERROR":
-                expected_output = _convert_question_string_to_list(
-                    row["expected_output"]
+    def test_unparsable_weight_in_unused_domain(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        unused_weight = trading_weights.iloc[[0]].copy()
+        unused_weight[trading_domain_col] = "not_an_input_domain"
+        unused_weight[trading_weights_col] = "n/a"
+        test_weights = pd.concat([trading_weights, unused_weight], ignore_index=True)
+
+        ret_vals = []
+        for weights in [trading_weights, test_weights]:
+            ret_vals.append(
+                date_adjustment(
+                    load_csv(df_loc),
+                    weights,
+                    target_columns,
+                    contributor_returned_start_date_col,
+                    contributor_returned_end_date_col,
+                    expected_start_date_col,
+                    expected_end_date_col,
+                    domain_col,
+                    short_period_parameter_col,
+                    long_period_parameter_col,
+                    equal_weighted_col,
+                    set_to_mid_point_col,
+                    use_calendar_days_col,
+                    average_weekly_col,
+                    da_error_flag_col,
+                    trading_date_col,
+                    trading_weights_col,
+                    trading_domain_col,
+                    trading_period_start_col,
+                    trading_period_end_col,
+                    ignore_multi_aw_param_error,
                 )
-                check_list.append("B")
-                assert ret_val == expected_output
-        if "A" not in check_list:
-            msg = 'No test was performed for the "ERROR" branch. Check test data.'
-            raise AssertionError(msg)
-        if "B" not in check_list:
-            msg = (
-                "No test was performed for the expected output branch. Check test data."
-            )
-            raise AssertionError(msg)
-
-
-# ---------------------------------------------------------------------------------------
-# TESTS: MISSING VALUE SUB-FUNCTION
-# ---------------------------------------------------------------------------------------
-
-
-class MissingValueSubfunction(TestCase):
-    # --- Test fails with type error if no input ---
-
-    # noinspection PyArgumentList
-    def test_failure_on_no_input(self):
-        with self.assertRaises(TypeError):
-            missing_value_subfunction()
-
-    # --- Test type validation on the input dataframe(s) ---
-    def test_validate_input_dataframe_type(self):
-        with self.assertRaises(TypeError):
-            # noinspection PyTypeChecker
-            missing_value_subfunction(
-                ["Not_A_Dataframe"], target_columns, da_error_flag_col
             )
+        pd.testing.assert_frame_equal(ret_vals[0], ret_vals[1])
 
-    # --- Test type validation on the target column list(s) ---
-
-    def test_validate_target_columns_type(self):
-        with self.assertRaises(TypeError):
-            df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
+    def test_flagged_rows_keep_their_position(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        ret_vals = {}
+        for shuffle in [False, True]:
             test_dataframe = load_csv(df_loc)
-            # noinspection PyTypeChecker
-            missing_value_subfunction(test_dataframe, "Not a list", da_error_flag_col)
-
-    # --- Test if cols missing from input dataframe(s) ---
-
-    def test_validate_required_cols_in_input_dataframe(self):
-        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
-        test_dataframe = load_csv(df_loc)
-        bad_dataframe = test_dataframe.drop(columns=target_columns[1])
-        with self.assertRaises(KeyError):
-            missing_value_subfunction(bad_dataframe, target_columns, da_error_flag_col)
-
-    # --- Test if output is a dataframe ---
-
-    # noinspection PyMethodMayBeStatic
-    def test_output_is_dataframe(self):
-        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
-        test_dataframe = load_csv(df_loc)
-        ret_val = missing_value_subfunction(
-            test_dataframe, target_columns, da_error_flag_col
-        )
-        assert isinstance(ret_val, type(pd.DataFrame()))
-
-    # --- Test if output contents is as expected, both new columns and data content ---
-
-    # noinspection PyMethodMayBeStatic
-    def test_error_flag_column_exist(self):
-        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
-        test_dataframe = load_csv(df_loc)
-        ret_val = missing_value_subfunction(
-            test_dataframe, target_columns, da_error_flag_col
-        )
-        assert da_error_flag_col in ret_val.columns
-
-    # noinspection PyMethodMayBeStatic
-    def test_nothing_filtered(self):
-        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
-        test_dataframe = load_csv(df_loc)
-        ret_val = missing_value_subfunction(
-            test_dataframe, target_columns, da_error_flag_col
-        )
-        assert len(ret_val) == len(
-            test_dataframe
-        ), "should have the same amount of rows that went in"
-
-    # --- Test any other error based outputs ---
-
-    # noinspection PyMethodMayBeStatic
-    def test_error_flag_set_correctly_where_appropriate(self):
-        check_list = []
-        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
-        test_dataframe = load_csv(df_loc)
-        ret_val = missing_value_subfunction(
-            test_dataframe, target_columns, da_error_flag_col
-        )
-        for _idx, row in ret_val.iterrows():
-            flagged = 0
-            for col_name in target_columns:
-                if np.isnan(float(row[col_name])):
-                    flagged = 1
-            if flagged:
-                check_list.append("A")
-                assert (
-                    row[da_error_flag_col] == "E01"
-                ), "error flag should be set to E01"
-            else:
-                check_list.append("B")
-                assert np.isnan(
-                    row[da_error_flag_col]
-                ), "error flag should be blank (nan)."
-        if "A" not in check_list:
-            msg = "No test was performed for the E flag branch. Check test data."
-            raise AssertionError(msg)
-        if "B" not in check_list:
-            msg = "No test was performed for the E flag branch. Check test data."
-            raise AssertionError(msg)
-
-
-# ---------------------------------------------------------------------------------------
-# TESTS: PRIMARY WRANGLER SUB-FUNCTION
-# ---------------------------------------------------------------------------------------
-
-
-class TestPrimaryWranglerSubfunction(TestCase):
-    # --- Test fails with type error if no input ---
-
-    # noinspection PyArgumentList
-    def test_failure_on_no_input(self):
-        with self.assertRaises(TypeError):
-            primary_wrangler_subfunction()
-
-    # --- Test type validation on the input dataframe(s) ---
-
-    def test_validate_input_dataframe_type(self):
-        with self.assertRaises(TypeError):
-            # noinspection PyTypeChecker
-            primary_wrangler_subfunction(
-                ["Not_A_Dataframe"],
+            if shuffle:
+                # The first row is kept first, as it holds the average weekly parameter.
+                test_dataframe = test_dataframe.iloc[
+                    [0] + list(range(len(test_dataframe) - 1, 0, -1))
+                ]
+            ret_vals[shuffle] = date_adjustment(
+                test_dataframe,
                 trading_weights,
                 target_columns,
                 contributor_returned_start_date_col,
@@ -1228,53 +1094,1499 @@ class TestPrimaryWranglerSubfunction(TestCase):
                 expected_start_date_col,
                 expected_end_date_col,
                 domain_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
                 equal_weighted_col,
+                set_to_mid_point_col,
+                use_calendar_days_col,
+                average_weekly_col,
                 da_error_flag_col,
-                trading_domain_col,
                 trading_date_col,
                 trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+                ignore_multi_aw_param_error,
             )
+            assert list(ret_vals[shuffle].index) == list(test_dataframe.index)
+        assert_engines_match(ret_vals[False], ret_vals[True].loc[ret_vals[False].index])
 
-    def test_validate_trading_weights_type(self):
-        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
-        test_dataframe = load_csv(df_loc)
-        with self.assertRaises(TypeError):
-            # noinspection PyTypeChecker
-            primary_wrangler_subfunction(
+
+class TestDateAdjustmentVectorized(TestCase):
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+            test_dataframe = load_csv(df_loc)
+            date_adjustment(
                 test_dataframe,
-                ["Not_A_Dataframe"],
+                trading_weights,
                 target_columns,
                 contributor_returned_start_date_col,
                 contributor_returned_end_date_col,
                 expected_start_date_col,
                 expected_end_date_col,
                 domain_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
                 equal_weighted_col,
+                set_to_mid_point_col,
+                use_calendar_days_col,
+                average_weekly_col,
                 da_error_flag_col,
-                trading_domain_col,
                 trading_date_col,
                 trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+                ignore_multi_aw_param_error,
+                engine="not_an_engine",
             )
 
-    # --- Test type validation on the target column lists(s) ---
-
-    def test_dataframe(self):
-        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
-        test_dataframe = load_csv(df_loc)
-        with self.assertRaises(TypeError):
-            # noinspection PyTypeChecker
-            primary_wrangler_subfunction(
+    def test_vectorized_matches_row_engine(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            test_dataframe = load_csv(df_loc)
+            ret_vals[engine] = date_adjustment(
                 test_dataframe,
                 trading_weights,
-                "Not a list",
+                target_columns,
                 contributor_returned_start_date_col,
                 contributor_returned_end_date_col,
                 expected_start_date_col,
                 expected_end_date_col,
                 domain_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
                 equal_weighted_col,
+                set_to_mid_point_col,
+                use_calendar_days_col,
+                average_weekly_col,
                 da_error_flag_col,
-                trading_domain_col,
+                trading_date_col,
+                trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+                ignore_multi_aw_param_error,
+                engine=engine,
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+
+    def test_vectorized_matches_row_engine_on_uat_data(self):
+        for uat_number in [2, 3]:
+            ret_vals = {}
+            for engine in ["row", "vectorized"]:
+                test_dataframe = load_csv(f"{fxt}/da_uat_{uat_number}_data.csv")
+                test_weights = load_csv(f"{fxt}/da_uat_{uat_number}_weights.csv")
+                ret_vals[engine] = date_adjustment(
+                    input_dataframe=test_dataframe,
+                    trading_weights=test_weights,
+                    target_columns=["Q20"],
+                    contributor_returned_start_date_col="Contributor's returned Start date",
+                    contributor_returned_end_date_col="Contributor's returned End Date",
+                    expected_start_date_col="Expected start date",
+                    expected_end_date_col="Expected End date",
+                    domain_col="Domain input",
+                    short_period_parameter_col="Short period parameter",
+                    long_period_parameter_col="Long period parameter",
+                    equal_weighted_col="Equal weighted",
+                    set_to_mid_point_col="Mid-point",
+                    use_calendar_days_col="Calendar days",
+                    average_weekly_col="Average weekly",
+                    da_error_flag_col="Date Adjustment error",
+                    trading_date_col="date",
+                    trading_weights_col="weight",
+                    trading_domain_col="domain",
+                    trading_period_start_col="start",
+                    trading_period_end_col="end",
+                    engine=engine,
+                )
+            assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+
+    def test_vectorized_output_dtypes_match_row_engine(self):
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            test_dataframe = load_csv(f"{fxt}/da_uat_2_data.csv")
+            test_weights = load_csv(f"{fxt}/da_uat_2_weights.csv")
+            ret_vals[engine] = date_adjustment(
+                input_dataframe=test_dataframe,
+                trading_weights=test_weights,
+                target_columns=["Q20"],
+                contributor_returned_start_date_col="Contributor's returned Start date",
+                contributor_returned_end_date_col="Contributor's returned End Date",
+                expected_start_date_col="Expected start date",
+                expected_end_date_col="Expected End date",
+                domain_col="Domain input",
+                short_period_parameter_col="Short period parameter",
+                long_period_parameter_col="Long period parameter",
+                equal_weighted_col="Equal weighted",
+                set_to_mid_point_col="Mid-point",
+                use_calendar_days_col="Calendar days",
+                average_weekly_col="Average weekly",
+                da_error_flag_col="Date Adjustment error",
+                trading_date_col="date",
+                trading_weights_col="weight",
+                trading_domain_col="domain",
+                trading_period_start_col="start",
+                trading_period_end_col="end",
+                engine=engine,
+            )
+        expected_dtypes = {
+            "Q20": "int64",
+            "Date Adjustment error": "float64",
+            "number_of_days_in_contributors_returned_period": "int64",
+            "number_of_days_in_actual_returned_period": "int64",
+            "sum_of_trading_day_weights_over_contributors_returned_period": "float64",
+            "date_adjusted_Q20": "float64",
+        }
+        for engine, output in ret_vals.items():
+            for col_name, dtype in expected_dtypes.items():
+                assert output[col_name].dtype == dtype, (engine, col_name)
+        assert list(ret_vals["vectorized"].columns) == list(ret_vals["row"].columns)
+        pd.testing.assert_series_equal(
+            ret_vals["vectorized"].dtypes, ret_vals["row"].dtypes
+        )
+
+    def test_all_error_codes_generated_as_expected(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = date_adjustment(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine="vectorized",
+        )
+        error_list = ret_val[da_error_flag_col].to_list()
+        for code in error_codes_list[1:]:
+            err_msg = "Error code " + str(code) + " not tested by data."
+            assert code in error_list, err_msg
+
+    def test_vectorized_returns_early_when_all_rows_flagged(self):
+        test_dataframe = load_csv(f"{fxt}/da_uat_1_data.csv")
+        test_weights = load_csv(f"{fxt}/da_uat_1_weights.csv")
+        ret_val = date_adjustment(
+            input_dataframe=test_dataframe,
+            trading_weights=test_weights,
+            target_columns=["Q20"],
+            contributor_returned_start_date_col="Contributor's returned Start date",
+            contributor_returned_end_date_col="Contributor's returned End Date",
+            expected_start_date_col="Expected start date",
+            expected_end_date_col="Expected End date",
+            domain_col="Domain input",
+            short_period_parameter_col="Short period parameter",
+            long_period_parameter_col="Long period parameter",
+            equal_weighted_col="Equal weighted",
+            set_to_mid_point_col="Mid-point",
+            use_calendar_days_col="Calendar days",
+            average_weekly_col="Average weekly",
+            da_error_flag_col="Date Adjustment error",
+            trading_date_col="date",
+            trading_weights_col="weight",
+            trading_domain_col="domain",
+            trading_period_start_col="start",
+            trading_period_end_col="end",
+            engine="vectorized",
+        )
+        assert ret_val["Date Adjustment error"].isin(["E14", "E15"]).all()
+        assert wcr_col not in ret_val.columns
+        assert dcr_col not in ret_val.columns
+
+    def test_vectorized_does_not_change_input_dataframe(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        test_dataframe = load_csv(df_loc)
+        input_copy = test_dataframe.copy()
+        date_adjustment(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine="vectorized",
+        )
+        pd.testing.assert_frame_equal(test_dataframe, input_copy)
+
+
+class TestDateAdjustmentChunks(TestCase):
+    def test_invalid_trading_weights_type(self):
+        with self.assertRaises(TypeError):
+            date_adjustment_chunks(
+                [],
+                "not_a_dataframe",
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
+                equal_weighted_col,
+                set_to_mid_point_col,
+                use_calendar_days_col,
+                average_weekly_col,
+                da_error_flag_col,
+                trading_date_col,
+                trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+            )
+
+    def test_chunks_match_whole_dataframe(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        for engine in ["row", "vectorized"]:
+            expected = date_adjustment(
+                load_csv(df_loc),
+                trading_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
+                equal_weighted_col,
+                set_to_mid_point_col,
+                use_calendar_days_col,
+                average_weekly_col,
+                da_error_flag_col,
+                trading_date_col,
+                trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+                ignore_multi_aw_param_error,
+                engine=engine,
+            )
+            test_dataframe = load_csv(df_loc)
+            chunks = [
+                test_dataframe.iloc[start : start + 10]
+                for start in range(0, len(test_dataframe), 10)
+            ]
+            ret_vals = list(
+                date_adjustment_chunks(
+                    chunks,
+                    trading_weights,
+                    target_columns,
+                    contributor_returned_start_date_col,
+                    contributor_returned_end_date_col,
+                    expected_start_date_col,
+                    expected_end_date_col,
+                    domain_col,
+                    short_period_parameter_col,
+                    long_period_parameter_col,
+                    equal_weighted_col,
+                    set_to_mid_point_col,
+                    use_calendar_days_col,
+                    average_weekly_col,
+                    da_error_flag_col,
+                    trading_date_col,
+                    trading_weights_col,
+                    trading_domain_col,
+                    trading_period_start_col,
+                    trading_period_end_col,
+                    ignore_multi_aw_param_error,
+                    engine=engine,
+                )
+            )
+            assert len(ret_vals) == len(chunks)
+            for chunk, ret_val in zip(chunks, ret_vals):
+                assert list(ret_val.index) == list(chunk.index)
+                # As for any dataframe, whether a column of whole numbers is int64 depends on the rows in the chunk.
+                pd.testing.assert_frame_equal(
+                    expected.loc[ret_val.index, ret_val.columns],
+                    ret_val,
+                    check_dtype=False,
+                )
+
+    def test_parameter_changed_between_chunks(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        test_dataframe = load_csv(df_loc)
+        test_dataframe[average_weekly_col] = "A"
+        test_dataframe[equal_weighted_col] = "N"
+        test_dataframe[set_to_mid_point_col] = "N"
+        test_dataframe.loc[test_dataframe.index[20:], set_to_mid_point_col] = "Y"
+        chunks = [test_dataframe.iloc[:20], test_dataframe.iloc[20:]]
+        ret_vals = date_adjustment_chunks(
+            chunks,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+        )
+        assert len(next(ret_vals).index) == 20
+        with self.assertRaises(ValueError):
+            next(ret_vals)
+
+
+class TestDateAdjustmentIncremental(TestCase):
+    reference_col = "enterprise_reference_number"
+
+    def run_incremental(self, previous_output, changed_dataframe, engine="row"):
+        return date_adjustment_incremental(
+            previous_output,
+            changed_dataframe,
+            self.reference_col,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine=engine,
+        )
+
+    def run_date_adjustment(self, test_dataframe, engine="row"):
+        return date_adjustment(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine=engine,
+        )
+
+    def test_incremental_matches_full_run(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        for engine in ["row", "vectorized"]:
+            first_returns = pd.read_csv(df_loc).iloc[:-3]
+            previous_output = self.run_date_adjustment(first_returns.copy(), engine)
+
+            # Two returns are corrected and the last three arrive late.
+            all_returns = pd.read_csv(df_loc)
+            corrected = all_returns.index[[5, 10]]
+            all_returns.loc[corrected, target_columns[0]] *= 2
+            changed_dataframe = all_returns.loc[
+                corrected.append(all_returns.index[-3:])
+            ]
+
+            ret_val = self.run_incremental(previous_output, changed_dataframe, engine)
+            expected = self.run_date_adjustment(all_returns, engine)
+            assert list(ret_val.index) == list(expected.index)
+            assert_engines_match(expected, ret_val)
+
+    def test_changed_average_weekly_parameter(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        previous_output = self.run_date_adjustment(pd.read_csv(df_loc).iloc[:-3])
+        changed_dataframe = pd.read_csv(df_loc).iloc[-3:]
+        changed_dataframe[average_weekly_col] = "Q20"
+        ret_val = self.run_incremental(previous_output, changed_dataframe)
+        assert (ret_val[da_error_flag_col].iloc[-3:] == "E00").all()
+        assert_engines_match(
+            previous_output, ret_val.iloc[:-3][previous_output.columns]
+        )
+
+    def test_invalid_references(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        previous_output = self.run_date_adjustment(pd.read_csv(df_loc))
+        duplicated = pd.read_csv(df_loc).iloc[[1, 1]]
+        with self.assertRaises(ValueError):
+            self.run_incremental(previous_output, duplicated)
+        with self.assertRaises(KeyError):
+            self.run_incremental(
+                previous_output.drop(columns=self.reference_col),
+                pd.read_csv(df_loc).iloc[[1]],
+            )
+
+
+class TestDateAdjustmentParallel(TestCase):
+    def test_invalid_n_jobs(self):
+        for n_jobs in [0, -2, 1.5, "2"]:
+            with self.assertRaises(ValueError):
+                date_adjustment(
+                    load_csv(f"{fxt}/da_date_adjustment_method_input.csv"),
+                    trading_weights,
+                    target_columns,
+                    contributor_returned_start_date_col,
+                    contributor_returned_end_date_col,
+                    expected_start_date_col,
+                    expected_end_date_col,
+                    domain_col,
+                    short_period_parameter_col,
+                    long_period_parameter_col,
+                    equal_weighted_col,
+                    set_to_mid_point_col,
+                    use_calendar_days_col,
+                    average_weekly_col,
+                    da_error_flag_col,
+                    trading_date_col,
+                    trading_weights_col,
+                    trading_domain_col,
+                    trading_period_start_col,
+                    trading_period_end_col,
+                    ignore_multi_aw_param_error,
+                    n_jobs=n_jobs,
+                )
+
+    def test_parallel_matches_single_process(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        for engine in ["row", "vectorized"]:
+            ret_vals = {}
+            for n_jobs in [1, 3]:
+                ret_vals[n_jobs] = date_adjustment(
+                    load_csv(df_loc),
+                    trading_weights,
+                    target_columns,
+                    contributor_returned_start_date_col,
+                    contributor_returned_end_date_col,
+                    expected_start_date_col,
+                    expected_end_date_col,
+                    domain_col,
+                    short_period_parameter_col,
+                    long_period_parameter_col,
+                    equal_weighted_col,
+                    set_to_mid_point_col,
+                    use_calendar_days_col,
+                    average_weekly_col,
+                    da_error_flag_col,
+                    trading_date_col,
+                    trading_weights_col,
+                    trading_domain_col,
+                    trading_period_start_col,
+                    trading_period_end_col,
+                    ignore_multi_aw_param_error,
+                    engine=engine,
+                    n_jobs=n_jobs,
+                )
+            assert list(ret_vals[3].index) == list(ret_vals[1].index)
+            assert_engines_match(ret_vals[1], ret_vals[3])
+
+
+class TestDateAdjustmentStats(TestCase):
+    stages = [
+        "missing_value",
+        "primary_wrangler",
+        "midpoint",
+        "secondary_wrangler",
+        "date_adjustment",
+        "average_weekly",
+    ]
+
+    def run_date_adjustment(self, engine, n_jobs=1, test_dataframe=None):
+        if test_dataframe is None:
+            test_dataframe = load_csv(f"{fxt}/da_date_adjustment_method_input.csv")
+        stats = DateAdjustmentStats()
+        ret_val = date_adjustment(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine=engine,
+            n_jobs=n_jobs,
+            instrumentation=stats,
+        )
+        return ret_val, stats
+
+    def test_stage_records(self):
+        for engine in ["row", "vectorized"]:
+            ret_val, stats = self.run_date_adjustment(engine)
+            assert [record.stage for record in stats.records] == self.stages
+            assert stats.records[0].rows_in == len(ret_val)
+            for record, next_record in zip(stats.records, stats.records[1:]):
+                assert next_record.rows_in == record.rows_out
+            for record in stats.records:
+                assert record.seconds >= 0
+                assert record.rows_in - record.rows_out == sum(
+                    record.error_codes.values()
+                )
+
+            summary = stats.summary()
+            assert list(summary.index) == self.stages
+            expected_codes = ret_val[da_error_flag_col].value_counts()
+            for code in _generate_error_code_list():
+                assert summary.get(code, pd.Series([0])).sum() == expected_codes.get(
+                    code, 0
+                )
+            assert summary.loc["missing_value", "E01"] == 1
+            assert summary.loc["midpoint", "E12"] == 1
+
+    def test_parallel_stage_records(self):
+        for engine in ["row", "vectorized"]:
+            single_summary = self.run_date_adjustment(engine)[1].summary()
+            _, stats = self.run_date_adjustment(engine, n_jobs=3)
+            assert len(stats.records) > len(self.stages)
+            summary = stats.summary()
+            pd.testing.assert_frame_equal(
+                summary.drop(columns="seconds"),
+                single_summary.drop(columns="seconds"),
+                check_like=True,
+            )
+
+    def test_missing_values(self):
+        test_dataframe = load_csv(f"{fxt}/da_date_adjustment_method_input.csv")
+        expected = {
+            col: int((test_dataframe[col].isna() | (test_dataframe[col] == ".")).sum())
+            for col in target_columns
+        }
+        assert sum(expected.values()) > 0
+        for engine in ["row", "vectorized"]:
+            for n_jobs in [1, 3]:
+                _, stats = self.run_date_adjustment(engine, n_jobs=n_jobs)
+                for record in stats.records:
+                    if record.stage == "missing_value":
+                        assert set(record.missing_values) == set(target_columns)
+                    else:
+                        assert record.missing_values is None
+                missing_values = stats.missing_values()
+                assert list(missing_values.index) == target_columns
+                assert missing_values.to_dict() == expected
+
+    def test_period_signatures(self):
+        single_summary = self.run_date_adjustment("vectorized")[1].summary()
+        assert "signatures" not in self.run_date_adjustment("row")[1].summary()
+
+        # Each period signature is repeated three times, so is only processed once for three rows.
+        test_dataframe = load_csv(f"{fxt}/da_date_adjustment_method_input.csv")
+        repeated_dataframe = pd.concat([test_dataframe] * 3, ignore_index=True)
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            ret_vals[engine], stats = self.run_date_adjustment(
+                engine, test_dataframe=repeated_dataframe.copy()
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+
+        summary = stats.summary()
+        period_stages = ["primary_wrangler", "midpoint", "secondary_wrangler"]
+        assert summary["signatures"].notna().tolist() == [
+            stage in period_stages for stage in self.stages
+        ]
+        for stage in period_stages:
+            assert (
+                summary.loc[stage, "signatures"]
+                == single_summary.loc[stage, "signatures"]
+            )
+            assert (
+                summary.loc[stage, "rows_in"]
+                == 3 * single_summary.loc[stage, "rows_in"]
+            )
+            assert np.isclose(
+                summary.loc[stage, "dedup_ratio"],
+                3 * single_summary.loc[stage, "dedup_ratio"],
+            )
+
+
+class TestDomainCategories(TestCase):
+    def run_date_adjustment(self, test_dataframe, engine):
+        return date_adjustment(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine=engine,
+        )
+
+    def test_domains_share_trading_weights_codes(self):
+        compiled_weights = TradingWeights(
+            trading_weights,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+        )
+        weight_domains = compiled_weights.dataframe[trading_domain_col]
+        weight_categories = weight_domains.cat.categories
+        domains = pd.Series(list(weight_categories) + ["999", None], dtype="string")
+        ret_val = _shared_domain_categories(domains, weight_domains)
+        categories = ret_val.cat.categories
+        assert categories[: len(weight_categories)].equals(weight_categories)
+        # Domains without trading weights follow those of the trading weights.
+        assert categories[len(weight_categories) :].tolist() == ["999"]
+        assert ret_val.cat.codes.tolist() == list(range(len(categories))) + [-1]
+        assert compiled_weights.index.domain_codes(ret_val.array).tolist() == list(
+            range(len(weight_categories))
+        ) + [-1, -1]
+
+    def test_output_dtypes_unchanged(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        for engine in ["row", "vectorized"]:
+            test_dataframe = load_csv(df_loc)
+            test_dataframe.loc[test_dataframe.index[-1], domain_col] = "999"
+            ret_val = self.run_date_adjustment(test_dataframe, engine)
+            # The domain and option columns are categoricals only within the method.
+            for col in [
+                domain_col,
+                equal_weighted_col,
+                set_to_mid_point_col,
+                use_calendar_days_col,
+            ]:
+                assert ret_val[col].dtype == "object"
+            assert ret_val.loc[ret_val.index[-1], domain_col] == "999"
+
+    def test_categorical_input_matches_string_input(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        for engine in ["row", "vectorized"]:
+            categorical_input = load_csv(df_loc)
+            for col in [domain_col, equal_weighted_col, set_to_mid_point_col]:
+                categorical_input[col] = categorical_input[col].astype("category")
+            pd.testing.assert_frame_equal(
+                self.run_date_adjustment(load_csv(df_loc), engine),
+                self.run_date_adjustment(categorical_input, engine),
+            )
+
+
+class TestTradingWeights(TestCase):
+    def test_invalid_trading_weights_type(self):
+        with self.assertRaises(TypeError):
+            TradingWeights(
+                "Not a DataFrame",
+                trading_date_col,
+                trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+            )
+
+    def test_missing_trading_weights_column(self):
+        with self.assertRaises(KeyError):
+            TradingWeights(
+                trading_weights,
+                trading_date_col,
+                trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                "Not a column",
+            )
+
+    def test_matches_dataframe(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        compiled_weights = TradingWeights(
+            trading_weights,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+        )
+        # The same object serves every run, including after a pickle round trip.
+        unpickled_weights = pickle.loads(pickle.dumps(compiled_weights))
+        for engine in ["row", "vectorized"]:
+            ret_vals = []
+            for weights in [trading_weights, compiled_weights, unpickled_weights]:
+                ret_vals.append(
+                    date_adjustment(
+                        load_csv(df_loc),
+                        weights,
+                        target_columns,
+                        contributor_returned_start_date_col,
+                        contributor_returned_end_date_col,
+                        expected_start_date_col,
+                        expected_end_date_col,
+                        domain_col,
+                        short_period_parameter_col,
+                        long_period_parameter_col,
+                        equal_weighted_col,
+                        set_to_mid_point_col,
+                        use_calendar_days_col,
+                        average_weekly_col,
+                        da_error_flag_col,
+                        trading_date_col,
+                        trading_weights_col,
+                        trading_domain_col,
+                        trading_period_start_col,
+                        trading_period_end_col,
+                        ignore_multi_aw_param_error,
+                        engine=engine,
+                    )
+                )
+            assert_engines_match(ret_vals[0], ret_vals[1])
+            assert_engines_match(ret_vals[0], ret_vals[2])
+
+    def test_column_name_mismatch(self):
+        compiled_weights = TradingWeights(
+            trading_weights.rename(columns={trading_weights_col: "trading_weight"}),
+            trading_date_col,
+            "trading_weight",
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+        )
+        with self.assertRaises(ValueError):
+            date_adjustment(
+                load_csv(f"{fxt}/da_date_adjustment_method_input.csv"),
+                compiled_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
+                equal_weighted_col,
+                set_to_mid_point_col,
+                use_calendar_days_col,
+                average_weekly_col,
+                da_error_flag_col,
+                trading_date_col,
+                trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+                ignore_multi_aw_param_error,
+            )
+
+
+class TestPeriodCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = PeriodCache(os.path.join(self.directory.name, "periods.sqlite"))
+        self.addCleanup(self.cache.close)
+
+    def run_date_adjustment(
+        self, test_weights=trading_weights, test_input=None, **kwargs
+    ):
+        if test_input is None:
+            test_input = load_csv(f"{fxt}/da_date_adjustment_method_input.csv")
+        stats = DateAdjustmentStats()
+        ret_val = date_adjustment(
+            test_input,
+            test_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            instrumentation=stats,
+            **{"engine": "vectorized", **kwargs},
+        )
+        return ret_val, stats.summary()
+
+    def test_cached_results_match(self):
+        expected_output = self.run_date_adjustment()[0]
+        first_output, first_summary = self.run_date_adjustment(period_cache=self.cache)
+        assert first_summary.loc["period_cache", "signatures"] == 0
+        signatures = first_summary.loc["primary_wrangler", "signatures"]
+        assert signatures > 0
+
+        second_output, second_summary = self.run_date_adjustment(
+            period_cache=self.cache
+        )
+        assert second_summary.loc["period_cache", "signatures"] == signatures
+        for stage in ["primary_wrangler", "midpoint", "secondary_wrangler"]:
+            assert second_summary.loc[stage, "signatures"] == 0
+        assert_engines_match(expected_output, first_output)
+        assert_engines_match(expected_output, second_output)
+
+    def test_results_cached_by_other_runs_match(self):
+        # Whether sums of weights are output as ints depends on the other rows, here those of the full input.
+        self.run_date_adjustment(period_cache=self.cache)
+        test_input = load_csv(f"{fxt}/da_date_adjustment_method_input.csv")
+        test_input = test_input[test_input[equal_weighted_col] == "Y"]
+        assert len(test_input)
+        for position in range(len(test_input)):
+            row_input = test_input.iloc[[position]].reset_index(drop=True)
+            ret_val, summary = self.run_date_adjustment(
+                test_input=row_input, period_cache=self.cache
+            )
+            assert summary.loc["period_cache", "signatures"] == 1
+            assert_engines_match(
+                self.run_date_adjustment(test_input=row_input)[0], ret_val
+            )
+
+    def test_cached_results_match_in_parallel(self):
+        expected_output = self.run_date_adjustment()[0]
+        first_summary = self.run_date_adjustment(period_cache=self.cache, n_jobs=2)[1]
+        ret_val, summary = self.run_date_adjustment(period_cache=self.cache, n_jobs=2)
+        assert (
+            summary.loc["period_cache", "signatures"]
+            == first_summary.loc["primary_wrangler", "signatures"]
+        )
+        assert_engines_match(expected_output, ret_val)
+
+    def test_changed_trading_weights_not_found(self):
+        signatures = self.run_date_adjustment(period_cache=self.cache)[1].loc[
+            "primary_wrangler", "signatures"
+        ]
+
+        # Only the signatures of the domain whose weights changed are run again.
+        test_weights = trading_weights.copy()
+        test_domains = test_weights[trading_domain_col].astype(str)
+        changed_domain = test_domains.iloc[0]
+        changed_rows = test_domains == changed_domain
+        test_weights.loc[changed_rows, trading_weights_col] = (
+            pd.to_numeric(test_weights.loc[changed_rows, trading_weights_col]) * 2
+        )
+        summary = self.run_date_adjustment(test_weights, period_cache=self.cache)[1]
+        assert 0 < summary.loc["period_cache", "signatures"] < signatures
+        assert (
+            summary.loc["period_cache", "signatures"]
+            + summary.loc["primary_wrangler", "signatures"]
+            == signatures
+        )
+
+    def test_least_recently_used_evicted(self):
+        cache = PeriodCache(self.cache.path, max_entries=3)
+        self.addCleanup(cache.close)
+        self.run_date_adjustment(period_cache=cache)
+        assert len(cache) == 3
+        cache.clear()
+        assert len(cache) == 0
+
+        # Entries are only evicted once there are more than max_entries, the least recently used first.
+        cache.put({"a": 1, "b": 2})
+        cache.put({"c": 3})
+        assert len(cache) == 3
+        assert cache.get(["a", "b"]) == {"a": 1, "b": 2}
+        cache.put({"d": 4})
+        assert cache.get(["a", "b", "c", "d"]) == {"a": 1, "b": 2, "d": 4}
+
+    def test_many_keys_found(self):
+        results = {str(key): [key] for key in range(1200)}
+        self.cache.put(results)
+        assert self.cache.get(list(results) + ["missing"]) == results
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(TypeError):
+            self.run_date_adjustment(period_cache=self.cache.path)
+        with self.assertRaises(ValueError):
+            self.run_date_adjustment(period_cache=self.cache, engine="row")
+        for max_entries in [0, 1.5, True]:
+            with self.assertRaises(ValueError):
+                PeriodCache(self.cache.path, max_entries=max_entries)
+
+
+# noinspection PyTypeChecker
+class TestOutputColumns(TestCase):
+    output_columns = [
+        "date_adjusted_" + target_columns[0],
+        "date_adjustment_length_flag",
+        "sum_of_trading_day_weights_over_actual_returned_period",
+    ]
+
+    def run_date_adjustment(self, engine, **kwargs):
+        return date_adjustment(
+            load_csv(f"{fxt}/da_date_adjustment_method_input.csv"),
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+            engine=engine,
+            **kwargs,
+        )
+
+    def test_only_requested_columns_added(self):
+        input_columns = list(
+            load_csv(f"{fxt}/da_date_adjustment_method_input.csv").columns
+        )
+        for n_jobs in [1, 2]:
+            ret_vals = {}
+            for engine in ["row", "vectorized"]:
+                expected_output = self.run_date_adjustment(engine, n_jobs=n_jobs)
+                ret_vals[engine] = self.run_date_adjustment(
+                    engine, n_jobs=n_jobs, output_columns=self.output_columns
+                )
+                assert set(ret_vals[engine].columns) == set(
+                    input_columns + [da_error_flag_col] + self.output_columns
+                )
+                assert_engines_match(
+                    expected_output[ret_vals[engine].columns], ret_vals[engine]
+                )
+            assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+
+    def test_no_columns_added(self):
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            ret_vals[engine] = self.run_date_adjustment(engine, output_columns=[])
+            expected_output = self.run_date_adjustment(engine)
+            assert da_error_flag_col in ret_vals[engine].columns
+            assert not any(
+                col.startswith("date_adjusted_") for col in ret_vals[engine].columns
+            )
+            assert_engines_match(
+                expected_output[ret_vals[engine].columns], ret_vals[engine]
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+
+    def test_validate_output_columns(self):
+        with self.assertRaises(TypeError):
+            self.run_date_adjustment("vectorized", output_columns="midpoint_date")
+        with self.assertRaises(ValueError):
+            self.run_date_adjustment(
+                "vectorized", output_columns=["midpoint_date", "not_a_column"]
+            )
+
+
+@skipIf(find_spec("pyarrow") is None, "pyarrow is not installed")
+class TestParquet(TestCase):
+    input_columns = [
+        contributor_returned_start_date_col,
+        contributor_returned_end_date_col,
+        expected_start_date_col,
+        expected_end_date_col,
+        domain_col,
+        short_period_parameter_col,
+        long_period_parameter_col,
+        equal_weighted_col,
+        set_to_mid_point_col,
+        use_calendar_days_col,
+        average_weekly_col,
+    ]
+    trading_weights_columns = [
+        trading_date_col,
+        trading_weights_col,
+        trading_domain_col,
+        trading_period_start_col,
+        trading_period_end_col,
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def read_input(self, path, **kwargs):
+        return read_date_adjustment_input_parquet(
+            path, target_columns, *self.input_columns, **kwargs
+        )
+
+    def run_date_adjustment(self, input_dataframe, weights):
+        return date_adjustment(
+            input_dataframe,
+            weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+        )
+
+    def test_read_sets_dtypes(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        # As stored in the CSV, with YYYYMMDD integer dates.
+        pd.read_csv(df_loc).to_parquet(self.path("input.parquet"))
+        ret_val = self.read_input(
+            self.path("input.parquet"), other_columns=["enterprise_reference_number"]
+        )
+
+        assert list(ret_val.columns) == self.input_columns + target_columns + [
+            "enterprise_reference_number"
+        ]
+        for col in self.input_columns[:4]:
+            assert ret_val[col].dtype == "datetime64[ns]"
+        assert ret_val[domain_col].dtype == "string"
+        for col in target_columns:
+            assert ret_val[col].dtype == "float64"
+        pd.testing.assert_frame_equal(
+            ret_val, load_csv(df_loc)[ret_val.columns], check_dtype=False
+        )
+
+    def test_read_timestamps(self):
+        df_loc = f"{fxt}/da_trading_weights_data.csv"
+        stored = load_csv(df_loc)
+        for col in [trading_date_col, trading_period_start_col, trading_period_end_col]:
+            stored[col] = stored[col].astype("datetime64[ms]")
+        stored.to_parquet(self.path("trading_weights.parquet"))
+        ret_val = read_trading_weights_parquet(
+            self.path("trading_weights.parquet"), *self.trading_weights_columns
+        )
+
+        assert list(ret_val.columns) == self.trading_weights_columns
+        assert ret_val[trading_date_col].dtype == "datetime64[ns]"
+        pd.testing.assert_frame_equal(
+            ret_val, trading_weights[self.trading_weights_columns]
+        )
+
+    def test_date_adjustment_from_parquet(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        pd.read_csv(df_loc).to_parquet(self.path("input.parquet"))
+        pd.read_csv(f"{fxt}/da_trading_weights_data.csv").to_parquet(
+            self.path("trading_weights.parquet")
+        )
+        ret_val = self.run_date_adjustment(
+            self.read_input(self.path("input.parquet")),
+            read_trading_weights_parquet(
+                self.path("trading_weights.parquet"), *self.trading_weights_columns
+            ),
+        )
+        # The reader gives the targets as float64, which is the only dtype they can differ in.
+        expected = self.run_date_adjustment(
+            load_csv(df_loc)[self.input_columns + target_columns].astype(
+                dict.fromkeys(target_columns, "float64")
+            ),
+            trading_weights,
+        )
+        pd.testing.assert_frame_equal(expected, ret_val)
+
+    def test_write_dictionary_encodes_flags(self):
+        import pyarrow.parquet as pq
+
+        output = self.run_date_adjustment(
+            load_csv(f"{fxt}/da_date_adjustment_method_input.csv"), trading_weights
+        )
+        write_date_adjustment_parquet(
+            output, self.path("output.parquet"), da_error_flag_col
+        )
+
+        schema = pq.read_schema(self.path("output.parquet"))
+        for col in [
+            da_error_flag_col,
+            "date_change_in_return_period_flag",
+            "date_adjustment_length_flag",
+        ]:
+            assert str(schema.field(col).type).startswith("dictionary")
+        assert not str(schema.field(domain_col).type).startswith("dictionary")
+
+        ret_val = pd.read_parquet(self.path("output.parquet"))
+        assert ret_val[da_error_flag_col].dtype == "category"
+        pd.testing.assert_series_equal(
+            ret_val[da_error_flag_col].astype(object), output[da_error_flag_col]
+        )
+
+
+@skipIf(find_spec("pyarrow") is not None, "pyarrow is installed")
+class TestParquetWithoutPyarrow(TestCase):
+    def test_import_error(self):
+        with self.assertRaises(ImportError):
+            read_trading_weights_parquet(
+                "trading_weights.parquet",
+                trading_date_col,
+                trading_weights_col,
+                trading_domain_col,
+                trading_period_start_col,
+                trading_period_end_col,
+            )
+
+
+# ---------------------------------------------------------------------------------------
+# TESTS: GENERATE AVERAGE WEEKLY QUESTION LIST SUB-FUNCTION
+# ---------------------------------------------------------------------------------------
+
+
+class TestGenerateAverageWeeklyQuestions(TestCase):
+    # --- Test fails with type error if no input. ---
+
+    # noinspection PyArgumentList
+    def test_failure_on_no_input(self):
+        with self.assertRaises(TypeError):
+            generate_average_weekly_questions()
+
+    # --- Test type validation on the input strings ---
+
+    # noinspection PyMethodMayBeStatic
+    def test_validate_average_weekly_param(self):
+        empty_df = pd.DataFrame.empty
+        for test_param in ["X", 20, {"Q20": 20}, ["Not a string"], empty_df]:
+            ret_val = generate_average_weekly_questions(test_param, target_columns)
+            assert ret_val == "ERROR: invalid average_weekly parameter contents."
+
+    # --- Test type validation on the target column lists(s) ---
+
+    # noinspection PyMethodMayBeStatic
+    def test_validate_target_columns_param(self):
+        with self.assertRaises(TypeError):
+            # noinspection PyTypeChecker
+            generate_average_weekly_questions("A", "Not a list")
+
+    # --- Test if output is a List ---
+
+    # noinspection PyMethodMayBeStatic
+    def test_output_is_list(self):
+        ret_val = generate_average_weekly_questions("A", target_columns)
+        assert isinstance(ret_val, list)
+
+    # --- Test if output contents is as expected ---
+
+    # noinspection PyMethodMayBeStatic
+    def test_output_for_A(self):
+        ret_val = generate_average_weekly_questions("A", target_columns)
+        assert ret_val == target_columns
+
+    # noinspection PyMethodMayBeStatic
+    def test_output_for_N(self):
+        ret_val = generate_average_weekly_questions("N", target_columns)
+        assert ret_val == []
+
+    # noinspection PyMethodMayBeStatic
+    def test_output_for_question_strings(self):
+        check_list = []
+        df_loc = f"{fxt}/"
+        df_loc += "da_validate_average_weekly_param_subfunction.csv"
+        aw_param_test_df = load_csv(df_loc)
+        for index, row in aw_param_test_df.iterrows():
+            test_string = row["test_input"]
+            ret_val = generate_average_weekly_questions(test_string, target_columns)
+            if row["expected_output"] == "ERROR":
+                check_list.append("A")
+                assert ret_val[:5] == "ERROR"
+            if row["expected_output"] != "ERROR":
+                expected_output = _convert_question_string_to_list(
+                    row["expected_output"]
+                )
+                check_list.append("B")
+                assert ret_val == expected_output
+        if "A" not in check_list:
+            msg = 'No test was performed for the "ERROR" branch. Check test data.'
+            raise AssertionError(msg)
+        if "B" not in check_list:
+            msg = (
+                "No test was performed for the expected output branch. Check test data."
+            )
+            raise AssertionError(msg)
+
+
+# ---------------------------------------------------------------------------------------
+# TESTS: MISSING VALUE SUB-FUNCTION
+# ---------------------------------------------------------------------------------------
+
+
+class MissingValueSubfunction(TestCase):
+    # --- Test fails with type error if no input ---
+
+    # noinspection PyArgumentList
+    def test_failure_on_no_input(self):
+        with self.assertRaises(TypeError):
+            missing_value_subfunction()
+
+    # --- Test type validation on the input dataframe(s) ---
+    def test_validate_input_dataframe_type(self):
+        with self.assertRaises(TypeError):
+            # noinspection PyTypeChecker
+            missing_value_subfunction(
+                ["Not_A_Dataframe"], target_columns, da_error_flag_col
+            )
+
+    # --- Test type validation on the target column list(s) ---
+
+    def test_validate_target_columns_type(self):
+        with self.assertRaises(TypeError):
+            df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
+            test_dataframe = load_csv(df_loc)
+            # noinspection PyTypeChecker
+            missing_value_subfunction(test_dataframe, "Not a list", da_error_flag_col)
+
+    # --- Test if cols missing from input dataframe(s) ---
+
+    def test_validate_required_cols_in_input_dataframe(self):
+        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        bad_dataframe = test_dataframe.drop(columns=target_columns[1])
+        with self.assertRaises(KeyError):
+            missing_value_subfunction(bad_dataframe, target_columns, da_error_flag_col)
+
+    # --- Test if output is a dataframe ---
+
+    # noinspection PyMethodMayBeStatic
+    def test_output_is_dataframe(self):
+        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = missing_value_subfunction(
+            test_dataframe, target_columns, da_error_flag_col
+        )
+        assert isinstance(ret_val, type(pd.DataFrame()))
+
+    # --- Test if output contents is as expected, both new columns and data content ---
+
+    # noinspection PyMethodMayBeStatic
+    def test_error_flag_column_exist(self):
+        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = missing_value_subfunction(
+            test_dataframe, target_columns, da_error_flag_col
+        )
+        assert da_error_flag_col in ret_val.columns
+
+    # noinspection PyMethodMayBeStatic
+    def test_nothing_filtered(self):
+        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = missing_value_subfunction(
+            test_dataframe, target_columns, da_error_flag_col
+        )
+        assert len(ret_val) == len(
+            test_dataframe
+        ), "should have the same amount of rows that went in"
+
+    # --- Test any other error based outputs ---
+
+    # noinspection PyMethodMayBeStatic
+    def test_error_flag_set_correctly_where_appropriate(self):
+        check_list = []
+        df_loc = f"{fxt}/da_missing_value_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = missing_value_subfunction(
+            test_dataframe, target_columns, da_error_flag_col
+        )
+        for _idx, row in ret_val.iterrows():
+            flagged = 0
+            for col_name in target_columns:
+                if np.isnan(float(row[col_name])):
+                    flagged = 1
+            if flagged:
+                check_list.append("A")
+                assert (
+                    row[da_error_flag_col] == "E01"
+                ), "error flag should be set to E01"
+            else:
+                check_list.append("B")
+                assert np.isnan(
+                    row[da_error_flag_col]
+                ), "error flag should be blank (nan)."
+        if "A" not in check_list:
+            msg = "No test was performed for the E flag branch. Check test data."
+            raise AssertionError(msg)
+        if "B" not in check_list:
+            msg = "No test was performed for the E flag branch. Check test data."
+            raise AssertionError(msg)
+
+    # noinspection PyMethodMayBeStatic
+    def test_output_dtypes_unchanged(self):
+        # The dtypes given by passing every row through DataFrame.apply, as the check always has.
+        numbers = pd.DataFrame({"Q20": [1.0, np.nan], "count": [1, 2]})
+        ret_val = missing_value_subfunction(numbers, ["Q20"], da_error_flag_col)
+        assert list(ret_val.dtypes) == ["float64", "float64", "object"]
+
+        mixed = numbers.assign(
+            option=pd.Categorical(["Y", "N"]),
+            Q21=pd.array([3, None], dtype="Int64"),
+        )
+        ret_val = missing_value_subfunction(mixed, ["Q20", "Q21"], da_error_flag_col)
+        assert list(ret_val.dtypes) == [
+            "float64",
+            "int64",
+            "object",
+            "float64",
+            "object",
+        ]
+        assert list(ret_val[da_error_flag_col]) == [np.nan, "E01"]
+
+
+# ---------------------------------------------------------------------------------------
+# TESTS: PRIMARY WRANGLER SUB-FUNCTION
+# ---------------------------------------------------------------------------------------
+
+
+class TestPrimaryWranglerSubfunction(TestCase):
+    # --- Test fails with type error if no input ---
+
+    # noinspection PyArgumentList
+    def test_failure_on_no_input(self):
+        with self.assertRaises(TypeError):
+            primary_wrangler_subfunction()
+
+    # --- Test type validation on the input dataframe(s) ---
+
+    def test_validate_input_dataframe_type(self):
+        with self.assertRaises(TypeError):
+            # noinspection PyTypeChecker
+            primary_wrangler_subfunction(
+                ["Not_A_Dataframe"],
+                trading_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                da_error_flag_col,
+                trading_domain_col,
+                trading_date_col,
+                trading_weights_col,
+            )
+
+    def test_validate_trading_weights_type(self):
+        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        with self.assertRaises(TypeError):
+            # noinspection PyTypeChecker
+            primary_wrangler_subfunction(
+                test_dataframe,
+                ["Not_A_Dataframe"],
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                da_error_flag_col,
+                trading_domain_col,
+                trading_date_col,
+                trading_weights_col,
+            )
+
+    # --- Test type validation on the target column lists(s) ---
+
+    def test_dataframe(self):
+        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        with self.assertRaises(TypeError):
+            # noinspection PyTypeChecker
+            primary_wrangler_subfunction(
+                test_dataframe,
+                trading_weights,
+                "Not a list",
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                da_error_flag_col,
+                trading_domain_col,
                 trading_date_col,
                 trading_weights_col,
             )
@@ -1738,6 +3050,172 @@ class TestPrimaryWranglerSubfunction(TestCase):
             raise AssertionError(filter_err)
 
 
+class TestPrimaryWranglerSubfunctionVectorized(TestCase):
+    def test_invalid_engine(self):
+        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        with self.assertRaises(ValueError):
+            primary_wrangler_subfunction(
+                test_dataframe,
+                trading_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                da_error_flag_col,
+                trading_domain_col,
+                trading_date_col,
+                trading_weights_col,
+                engine="not_an_engine",
+            )
+
+    def test_vectorized_matches_row_engine(self):
+        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            test_dataframe = load_csv(df_loc)
+            ret_vals[engine] = primary_wrangler_subfunction(
+                test_dataframe,
+                trading_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                da_error_flag_col,
+                trading_domain_col,
+                trading_date_col,
+                trading_weights_col,
+                engine=engine,
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+        for code in ["E02", "E03", "E04", "E05", "E14", "E15"]:
+            assert code in ret_vals["vectorized"][da_error_flag_col].to_list()
+
+    def test_vectorized_matches_row_engine_on_method_data(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            test_dataframe = missing_value_subfunction(
+                load_csv(df_loc), target_columns, da_error_flag_col
+            )
+            ret_vals[engine] = primary_wrangler_subfunction(
+                test_dataframe,
+                trading_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                da_error_flag_col,
+                trading_domain_col,
+                trading_date_col,
+                trading_weights_col,
+                engine=engine,
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+
+    def test_engines_match_on_unsorted_trading_weights(self):
+        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
+
+        def run_primary_wrangler(test_weights, engine):
+            return primary_wrangler_subfunction(
+                load_csv(df_loc),
+                test_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                da_error_flag_col,
+                trading_domain_col,
+                trading_date_col,
+                trading_weights_col,
+                engine=engine,
+            )
+
+        # Give the first and last days of a weighted period a null and a negative weight, then reverse the table
+        # so that the earlier dated invalid weight comes last.
+        ret_val = run_primary_wrangler(trading_weights, "row")
+        row = ret_val[
+            ret_val[da_error_flag_col].isna() & (ret_val[equal_weighted_col] != "Y")
+        ].iloc[0]
+        test_weights = trading_weights.copy()
+        same_domain = test_weights[trading_domain_col].astype(str) == str(
+            row[domain_col]
+        )
+        for date_col, weight in [
+            (contributor_returned_start_date_col, np.nan),
+            (contributor_returned_end_date_col, -1.0),
+        ]:
+            on_date = test_weights[trading_date_col] == row[date_col]
+            test_weights.loc[same_domain & on_date, trading_weights_col] = weight
+        test_weights = test_weights.iloc[::-1].reset_index(drop=True)
+
+        ret_vals = {
+            engine: run_primary_wrangler(test_weights, engine)
+            for engine in ["row", "vectorized"]
+        }
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+        # The code of the last invalid weight in table order is given.
+        assert ret_vals["row"].loc[row.name, da_error_flag_col] == "E04"
+
+    def test_unparsable_weight_fails_when_used(self):
+        df_loc = f"{fxt}/da_primary_wrangler_subfunction_input.csv"
+        test_weights = trading_weights.copy()
+        test_weights[trading_weights_col] = "n/a"
+        for engine in ["row", "vectorized"]:
+            with self.assertRaises(ValueError):
+                primary_wrangler_subfunction(
+                    load_csv(df_loc),
+                    test_weights,
+                    target_columns,
+                    contributor_returned_start_date_col,
+                    contributor_returned_end_date_col,
+                    expected_start_date_col,
+                    expected_end_date_col,
+                    domain_col,
+                    equal_weighted_col,
+                    da_error_flag_col,
+                    trading_domain_col,
+                    trading_date_col,
+                    trading_weights_col,
+                    engine=engine,
+                )
+
+    def test_vectorized_adds_no_columns_when_all_rows_flagged(self):
+        test_dataframe = load_csv(f"{fxt}/da_primary_wrangler_subfunction_input.csv")
+        test_dataframe[expected_start_date_col] = pd.NaT
+        ret_val = primary_wrangler_subfunction(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            equal_weighted_col,
+            da_error_flag_col,
+            trading_domain_col,
+            trading_date_col,
+            trading_weights_col,
+            engine="vectorized",
+        )
+        assert (ret_val[da_error_flag_col] == "E14").all()
+        assert wcr_col not in ret_val.columns
+        assert dcr_col not in ret_val.columns
+
+
 # ---------------------------------------------------------------------------------------
 # SECTION: MIDPOINT SUB-FUNCTION
 # ---------------------------------------------------------------------------------------
@@ -2141,21 +3619,61 @@ class TestMidpointSubfunction(TestCase):
                         <= row[contributor_returned_end_date_col]
                     )
                     & (trading_weights[trading_domain_col] == row[domain_col])
-                ].sort_values(by=trading_date_col, ascending=True)
+                ].sort_values(by=trading_date_col, ascending=True)
+
+                if len(non_zero_before_crpe) == 0:
+                    actually_tested = 1
+                    assert row[da_error_flag_col] == "E12"
+        if not actually_tested:
+            raise AssertionError(filter_err)
+
+    def test_E13(self):
+        actually_tested = 0
+        df_loc = f"{fxt}/da_midpoint_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = midpoint_subfunction(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            domain_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            set_to_mid_point_col,
+            equal_weighted_col,
+            use_calendar_days_col,
+            trading_date_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            trading_weights_col,
+            trading_domain_col,
+            da_error_flag_col,
+        )
+        for _idx, row in ret_val.iterrows():
+            if (
+                row["date_change_in_return_period_flag"] == "C"
+                and row[use_calendar_days_col] == "N"
+            ):
+                midpoint_data = trading_weights[
+                    (trading_weights[trading_date_col] == row["midpoint_date"])
+                    & (trading_weights[trading_domain_col] == row[domain_col])
+                ]
 
-                if len(non_zero_before_crpe) == 0:
+                if len(midpoint_data) != 1:
                     actually_tested = 1
-                    assert row[da_error_flag_col] == "E12"
+                    assert row[da_error_flag_col] == "E13"
         if not actually_tested:
             raise AssertionError(filter_err)
 
-    def test_E13(self):
+    def test_E13_on_duplicated_trading_period_records(self):
         actually_tested = 0
         df_loc = f"{fxt}/da_midpoint_subfunction_input.csv"
         test_dataframe = load_csv(df_loc)
+        duplicated_weights = pd.concat([trading_weights, trading_weights])
         ret_val = midpoint_subfunction(
             test_dataframe,
-            trading_weights,
+            duplicated_weights,
             target_columns,
             domain_col,
             expected_start_date_col,
@@ -2177,14 +3695,10 @@ class TestMidpointSubfunction(TestCase):
                 row["date_change_in_return_period_flag"] == "C"
                 and row[use_calendar_days_col] == "N"
             ):
-                midpoint_data = trading_weights[
-                    (trading_weights[trading_date_col] == row["midpoint_date"])
-                    & (trading_weights[trading_domain_col] == row[domain_col])
-                ]
-
-                if len(midpoint_data) != 1:
-                    actually_tested = 1
-                    assert row[da_error_flag_col] == "E13"
+                actually_tested = 1
+                assert row[da_error_flag_col] == "E13"
+                assert pd.isnull(row["actual_period_start_date"])
+                assert pd.isnull(row["actual_period_end_date"])
         if not actually_tested:
             raise AssertionError(filter_err)
 
@@ -2192,6 +3706,172 @@ class TestMidpointSubfunction(TestCase):
     #       start and end dates are missing.
 
 
+class TestMidpointSubfunctionVectorized(TestCase):
+    def test_invalid_engine(self):
+        df_loc = f"{fxt}/da_midpoint_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        with self.assertRaises(ValueError):
+            midpoint_subfunction(
+                test_dataframe,
+                trading_weights,
+                target_columns,
+                domain_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                set_to_mid_point_col,
+                equal_weighted_col,
+                use_calendar_days_col,
+                trading_date_col,
+                trading_period_start_col,
+                trading_period_end_col,
+                trading_weights_col,
+                trading_domain_col,
+                da_error_flag_col,
+                engine="not_an_engine",
+            )
+
+    def test_vectorized_matches_row_engine(self):
+        df_loc = f"{fxt}/da_midpoint_subfunction_input.csv"
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            test_dataframe = load_csv(df_loc)
+            ret_vals[engine] = midpoint_subfunction(
+                test_dataframe,
+                trading_weights,
+                target_columns,
+                domain_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                set_to_mid_point_col,
+                equal_weighted_col,
+                use_calendar_days_col,
+                trading_date_col,
+                trading_period_start_col,
+                trading_period_end_col,
+                trading_weights_col,
+                trading_domain_col,
+                da_error_flag_col,
+                engine=engine,
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+        ret_val = ret_vals["vectorized"]
+        calendar_month = (ret_val["date_change_in_return_period_flag"] == "C") & (
+            ret_val[use_calendar_days_col] == "Y"
+        )
+        assert calendar_month.any(), filter_err
+        for code in ["E12", "E13"]:
+            assert code in ret_val[da_error_flag_col].to_list()
+
+
+class TestSecondaryWranglerSubfunctionVectorized(TestCase):
+    def test_invalid_engine(self):
+        df_loc = f"{fxt}/da_secondary_wrangler_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        with self.assertRaises(ValueError):
+            secondary_wrangler_subfunction(
+                test_dataframe,
+                trading_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                set_to_mid_point_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
+                da_error_flag_col,
+                trading_date_col,
+                trading_domain_col,
+                trading_weights_col,
+                engine="not_an_engine",
+            )
+
+    def test_vectorized_matches_row_engine(self):
+        df_loc = f"{fxt}/da_secondary_wrangler_subfunction_input.csv"
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            test_dataframe = load_csv(df_loc)
+            ret_vals[engine] = secondary_wrangler_subfunction(
+                test_dataframe,
+                trading_weights,
+                target_columns,
+                contributor_returned_start_date_col,
+                contributor_returned_end_date_col,
+                expected_start_date_col,
+                expected_end_date_col,
+                domain_col,
+                equal_weighted_col,
+                set_to_mid_point_col,
+                short_period_parameter_col,
+                long_period_parameter_col,
+                da_error_flag_col,
+                trading_date_col,
+                trading_domain_col,
+                trading_weights_col,
+                engine=engine,
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+        for code in ["E06", "E07", "E08", "E09"]:
+            assert code in ret_vals["vectorized"][da_error_flag_col].to_list()
+        length_flags = ret_vals["vectorized"]["date_adjustment_length_flag"].to_list()
+        for flag in ["S", "L", "SL"]:
+            assert flag in length_flags
+        assert "YT" in ret_vals["vectorized"][set_to_mid_point_col].to_list()
+
+    def test_vectorized_weights_n_set_correctly(self):
+        actually_tested = 0
+        df_loc = f"{fxt}/da_secondary_wrangler_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = secondary_wrangler_subfunction(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_domain_col,
+            trading_weights_col,
+            engine="vectorized",
+        )
+        for _idx, row in ret_val.iterrows():
+            if (
+                row[equal_weighted_col] != "Y"
+                and row[da_error_flag_col] not in error_codes_list
+            ):
+                actually_tested = 1
+                mask = (
+                    (
+                        trading_weights[trading_date_col]
+                        >= row["actual_period_start_date"]
+                    )
+                    & (
+                        trading_weights[trading_date_col]
+                        <= row["actual_period_end_date"]
+                    )
+                    & (trading_weights[trading_domain_col] == str((row[domain_col])))
+                )
+                filtered_weights = trading_weights.loc[mask]
+                assert np.isclose(
+                    row[war_col], filtered_weights[trading_weights_col].sum()
+                ), "The n weight should be summed correctly"
+        if not actually_tested:
+            raise AssertionError(filter_err)
+
+
 # ---------------------------------------------------------------------------------------
 # SECTION: SECONDARY WRANGLER SUB-FUNCTION
 # ---------------------------------------------------------------------------------------
@@ -2391,6 +4071,50 @@ class TestSecondaryWranglerSubfunction(TestCase):
         if not actually_tested:
             raise AssertionError(filter_err)
 
+    def test_output_mid_point_equal_yt(self):
+        actually_tested = 0
+        df_loc = f"{fxt}/da_secondary_wrangler_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        test_dataframe[set_to_mid_point_col] = "YT"
+        ret_val = secondary_wrangler_subfunction(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_domain_col,
+            trading_weights_col,
+        )
+        for _idx, row in ret_val.iterrows():
+            if row[da_error_flag_col] not in error_codes_list:
+                actually_tested = 1
+                non_zero_weights = trading_weights[
+                    (trading_weights[trading_weights_col] > 0)
+                    & (trading_weights[trading_domain_col] == str(row[domain_col]))
+                ]
+                non_zero_dates = non_zero_weights[trading_date_col]
+                aps = non_zero_dates[
+                    non_zero_dates >= row["actual_period_start_date"]
+                ].min()
+                ape = non_zero_dates[
+                    non_zero_dates <= row["actual_period_end_date"]
+                ].max()
+                assert row[dar_col] == (ape - aps).days + 1, (
+                    "Days in actual period should be trimmed to the non-zero "
+                    + "trading days when set to midpoint is YT."
+                )
+        if not actually_tested:
+            raise AssertionError(filter_err)
+
     def test_days_in_contributors_return_period_exists(self):
         df_loc = f"{fxt}/da_secondary_wrangler_subfunction_input.csv"
         test_dataframe = load_csv(df_loc)
@@ -2858,6 +4582,31 @@ class TestDateAdjustmentSubfunction(TestCase):
         if not actually_tested:
             raise AssertionError(filter_err)
 
+    def test_vectorized_matches_row_engine(self):
+        df_loc = f"{fxt}/da_date_adjustment_subfunction_input.csv"
+        ret_vals = {}
+        for engine in ["row", "vectorized"]:
+            test_dataframe = load_csv(df_loc)
+            test_dataframe.loc[0, wcr_col] = 0
+            test_dataframe.loc[1, war_col] = 0
+            ret_vals[engine] = date_adjustment_subfunction(
+                test_dataframe, target_columns, da_error_flag_col, engine=engine
+            )
+        assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+        assert ret_vals["vectorized"][da_error_flag_col].iloc[0] == "E10"
+        assert ret_vals["vectorized"][da_error_flag_col].iloc[1] == "E11"
+
+    def test_invalid_engine(self):
+        df_loc = f"{fxt}/da_date_adjustment_subfunction_input.csv"
+        test_dataframe = load_csv(df_loc)
+        with self.assertRaises(ValueError):
+            date_adjustment_subfunction(
+                test_dataframe,
+                target_columns,
+                da_error_flag_col,
+                engine="not_an_engine",
+            )
+
 
 # ---------------------------------------------------------------------------------------
 # SECTION: AVERAGE WEEKLY SUB-FUNCTION
@@ -2969,10 +4718,142 @@ class TestAverageWeeklySubfunction(TestCase):
             else:
                 raise AssertionError(filter_err)
 
+    def test_vectorized_matches_row_engine(self):
+        df_loc = f"{fxt}/da_average_weekly_subfunction_input.csv"
+        for questions in [average_weekly_questions, target_columns, []]:
+            ret_vals = {}
+            for engine in ["row", "vectorized"]:
+                ret_vals[engine] = average_weekly_subfunction(
+                    load_csv(df_loc), questions, da_error_flag_col, engine=engine
+                )
+            assert_engines_match(ret_vals["row"], ret_vals["vectorized"])
+
     # --- Test any other error based outputs ---
     # None at the moment
 
 
+# ---------------------------------------------------------------------------------------
+# TESTS: SET DTYPES
+# ---------------------------------------------------------------------------------------
+
+
+class TestSetDtypes(TestCase):
+    def test_coerces_columns(self):
+        test_dataframe = pd.DataFrame(
+            {
+                expected_start_date_col: ["20191201", None, "not a date", "20191201"],
+                domain_col: [1000, 1000, 2000, 2000],
+                short_period_parameter_col: ["27", "27", "x", "27"],
+                target_columns[0]: ["1.5", "2", None, "3"],
+                "untouched": ["a", "b", "c", "d"],
+            }
+        )
+        ret_val = _set_dtypes(test_dataframe, dtype_dict, target_columns)
+        assert ret_val[expected_start_date_col].tolist() == [
+            pd.Timestamp("2019-12-01"),
+            pd.NaT,
+            pd.NaT,
+            pd.Timestamp("2019-12-01"),
+        ]
+        assert ret_val[domain_col].dtype == "string"
+        assert ret_val[domain_col].tolist() == ["1000", "1000", "2000", "2000"]
+        assert ret_val[short_period_parameter_col].isnull().tolist() == [
+            False,
+            False,
+            True,
+            False,
+        ]
+        assert ret_val[target_columns[0]].dtype == "float64"
+        assert ret_val["untouched"].dtype == object
+
+    def test_columns_with_dtype_set_are_skipped(self):
+        test_dataframe = load_csv(f"{fxt}/da_date_adjustment_method_input.csv")
+        dates = test_dataframe[expected_start_date_col].to_numpy()
+        ret_val = _set_dtypes(test_dataframe, dtype_dict, target_columns)
+        assert np.shares_memory(ret_val[expected_start_date_col].to_numpy(), dates)
+
+    def test_invalid_dtype_dict(self):
+        with self.assertRaises(TypeError):
+            _set_dtypes(pd.DataFrame(), "Not a dict")
+
+    def test_date_parse_cache(self):
+        clear_date_parse_cache()
+        test_dataframe = pd.DataFrame(
+            {
+                expected_start_date_col: ["20191201", "20191202", "20191201", None],
+                expected_end_date_col: ["20191231", "20191201", "20191231", "20191231"],
+            }
+        )
+        ret_val = _set_dtypes(test_dataframe, dtype_dict)
+        # Distinct values are parsed once each, the repeated 20191201 in the second column is a hit.
+        assert date_parse_cache_info() == {"hits": 1, "misses": 3, "size": 3}
+        assert ret_val[expected_end_date_col].tolist() == [
+            pd.Timestamp("2019-12-31"),
+            pd.Timestamp("2019-12-01"),
+            pd.Timestamp("2019-12-31"),
+            pd.Timestamp("2019-12-31"),
+        ]
+        assert pd.isnull(ret_val[expected_start_date_col].iloc[3])
+        clear_date_parse_cache()
+        assert date_parse_cache_info() == {"hits": 0, "misses": 0, "size": 0}
+
+
+# ---------------------------------------------------------------------------------------
+# TESTS: ERROR CODES
+# ---------------------------------------------------------------------------------------
+
+
+class TestErrorCode(TestCase):
+    def test_codes_match_error_code_list(self):
+        assert [error_code.code for error_code in ErrorCode] == error_codes_list
+        for number, error_code in enumerate(ErrorCode):
+            assert error_code.number == number
+            assert error_code.description
+
+    def test_output_codes_map_to_descriptions(self):
+        df_loc = f"{fxt}/da_date_adjustment_method_input.csv"
+        test_dataframe = load_csv(df_loc)
+        ret_val = date_adjustment(
+            test_dataframe,
+            trading_weights,
+            target_columns,
+            contributor_returned_start_date_col,
+            contributor_returned_end_date_col,
+            expected_start_date_col,
+            expected_end_date_col,
+            domain_col,
+            short_period_parameter_col,
+            long_period_parameter_col,
+            equal_weighted_col,
+            set_to_mid_point_col,
+            use_calendar_days_col,
+            average_weekly_col,
+            da_error_flag_col,
+            trading_date_col,
+            trading_weights_col,
+            trading_domain_col,
+            trading_period_start_col,
+            trading_period_end_col,
+            ignore_multi_aw_param_error,
+        )
+        actually_tested = 0
+        for code in ret_val[da_error_flag_col].dropna().unique():
+            actually_tested = 1
+            assert ErrorCode[code].description
+        if not actually_tested:
+            raise AssertionError(filter_err)
+
+    def test_nullified_columns(self):
+        assert ErrorCode.E01.zeroed_columns == []
+        assert ErrorCode.E01.nulled_columns(["Q20"]) == []
+        assert wcr_col in ErrorCode.E03.zeroed_columns
+        assert war_col in ErrorCode.E03.zeroed_columns
+        assert ErrorCode.E03.nulled_columns(["Q20"]) == [
+            "date_adjusted_Q20",
+            "average_weekly_Q20",
+        ]
+
+
 # ---------------------------------------------------------------------------------------
 # UAT ISSUES
 # ---------------------------------------------------------------------------------------